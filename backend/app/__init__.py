@@ -1,20 +1,25 @@
 from flask import Flask, jsonify, request, session
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_socketio import SocketIO
 from config import Config
+from app.replicas import RoutingSession
 import os
 
 # Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 socketio = SocketIO(cors_allowed_origins="*")
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Client address and scheme from X-Forwarded-* set by TRUSTED_PROXIES proxies
+    if app.config.get('TRUSTED_PROXIES'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
     # Disable strict slashes to prevent redirects
     app.url_map.strict_slashes = False
     
@@ -23,9 +28,46 @@ def create_app(config_class=Config):
     if not os.path.exists(upload_folder):
         os.makedirs(upload_folder)
     
+    # orjson-backed JSON responses with reusable encoded fragments (JSON_BACKEND)
+    from app.json_provider import init_json
+    init_json(app)
+    
+    # Pool options and read replica binds (before the engines are created)
+    from app.replicas import configure_engines
+    configure_engines(app)
+    
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    
+    # Flask-Migrate pulls in Alembic, so it is only loaded for flask CLI commands ('flask db ...')
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        from app.cli import init_migrations
+        init_migrations(app)
+    
+    # Runtime metrics at /metrics (registered first so every request is timed)
+    from app.metrics import init_metrics
+    init_metrics(app, socketio)
+    
+    # gzip/brotli responses (COMPRESSION_ENABLED); registered early so its
+    # after_request hook runs after the ones that still change the response
+    from app.compression import init_compression
+    init_compression(app)
+    
+    # Read-only requests go to a replica when DATABASE_REPLICA_URLS is set
+    from app.replicas import init_replica_routing
+    init_replica_routing(app)
+    
+    # Server-side sessions (SESSION_TYPE)
+    from app.sessions import init_session_interface
+    init_session_interface(app)
+    
+    # Rate limits for auth and other configured endpoints (RATE_LIMITS)
+    from app.ratelimit import init_rate_limiter
+    init_rate_limiter(app)
+    
+    # Per-request query counts, timing headers and N+1 warnings
+    from app.query_stats import init_query_stats
+    init_query_stats(app)
     
     # Configure CORS with proper settings for sessions
     CORS(app, 
@@ -33,7 +75,7 @@ def create_app(config_class=Config):
          supports_credentials=True,
          allow_headers=['Content-Type', 'Authorization', 'Access-Control-Allow-Credentials'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-         expose_headers=['Content-Type', 'Authorization'])
+         expose_headers=['Content-Type', 'Authorization', 'Server-Timing', 'X-Query-Count'])
     
     # Add CORS preflight handler
     @app.before_request
@@ -47,7 +89,7 @@ def create_app(config_class=Config):
             return response
     
     # Import models first to register them
-    from app.models import User, Post, Like, Comment, Follow, Message, Note
+    from app.models import User, Post, Like, Comment, Follow, Message, Note, SpotifyTrack, UserSession, RateLimitCounter, BackfillProgress, PostImpressionHourly
     
     # Register blueprints
     from app.routes.auth import auth_bp
@@ -57,6 +99,8 @@ def create_app(config_class=Config):
     from app.routes.messages import messages_bp
     from app.routes.youtube import youtube_bp
     from app.routes.notes import notes_bp
+    from app.routes.search import search_bp
+    from app.routes.admin import admin_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(users_bp, url_prefix='/api')
@@ -65,6 +109,8 @@ def create_app(config_class=Config):
     app.register_blueprint(messages_bp, url_prefix='/api')
     app.register_blueprint(youtube_bp)
     app.register_blueprint(notes_bp)
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api')
     
     # Add health check endpoint
     @app.route('/api/health')
@@ -75,9 +121,27 @@ def create_app(config_class=Config):
             'version': '2.0.0'
         }), 200
     
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # Sampling profiler and per-route cProfile (needs the endpoints registered)
+    from app.profiling import init_profiling
+    init_profiling(app)
+    
+    # Write-behind likes, flushed in bulk and on shutdown (LIKE_WRITE_BEHIND)
+    from app.services.like_buffer import init_like_buffer
+    init_like_buffer(app)
+    
+    # Feed impressions, batched into hourly rollups (IMPRESSIONS_ENABLED)
+    from app.services.impressions import init_impressions
+    init_impressions(app)
+    
+    # CLI: flask init-db, flask seed
+    from app.cli import register_commands
+    register_commands(app)
+    
+    # Schema creation is an explicit step ('flask init-db'); AUTO_CREATE_TABLES
+    # restores creating missing tables at startup for throwaway databases
+    if app.config.get('AUTO_CREATE_TABLES'):
+        with app.app_context():
+            db.create_all()
     
     # Initialize Socket.IO with the app
     socketio.init_app(app, cors_allowed_origins="*")
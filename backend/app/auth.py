@@ -0,0 +1,127 @@
+"""Shared session authentication helpers for all route modules
+
+Routes use login_required and get_current_user_id() as before. The current
+user is resolved at most once per request through get_current_user(),
+which keeps the User in flask.g. Endpoints that only need to know who the
+caller is (existence checks, IDs for like/comment ownership) use
+get_identity(), which serves id/username/is_private from a short-TTL
+process-level cache and skips the primary-key lookup entirely.
+"""
+import hmac
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from functools import wraps
+from flask import g, jsonify, request, session, current_app
+from sqlalchemy import event
+from app import db
+from app.models import User
+
+Identity = namedtuple('Identity', ['id', 'username', 'is_private'])
+
+
+# Login required decorator
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Login required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def is_admin():
+    """
+    True for operators: a matching X-Admin-Token header (ADMIN_TOKEN) or a
+    session user listed in ADMIN_USER_IDS
+    """
+    token = current_app.config.get('ADMIN_TOKEN')
+    supplied = request.headers.get('X-Admin-Token')
+    if token and supplied and hmac.compare_digest(token, supplied):
+        return True
+    return get_current_user_id() in current_app.config.get('ADMIN_USER_IDS', ())
+
+
+# Admin required decorator
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def get_current_user_id():
+    return session.get('user_id')
+
+
+def get_current_user():
+    """The logged-in User for this request, loaded at most once (None if absent)"""
+    if 'current_user' not in g:
+        user_id = get_current_user_id()
+        g.current_user = db.session.get(User, user_id) if user_id else None
+    return g.current_user
+
+
+def get_identity(user_id=None):
+    """
+    Lightweight identity of a user (the current user by default)
+
+    Args:
+        user_id: User ID to look up; defaults to the session user
+
+    Returns:
+        Identity or None if there is no such user
+    """
+    if user_id is None:
+        user_id = get_current_user_id()
+        if user_id is None:
+            return None
+    current = g.get('current_user')
+    if current is not None and current.id == user_id:
+        return Identity(current.id, current.username, current.is_private)
+    return identity_cache.get(user_id)
+
+
+class IdentityCache:
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # user id -> (expires_at, Identity)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        row = db.session.query(User.id, User.username, User.is_private).filter(User.id == user_id).first()
+        if row is None:
+            return None
+
+        identity = Identity(row.id, row.username, bool(row.is_private))
+        ttl = current_app.config.get('IDENTITY_CACHE_TTL', 30)
+        with self._lock:
+            self._entries[user_id] = (now + ttl, identity)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_identity(mapper, connection, user):
+    identity_cache.invalidate(user.id)
@@ -0,0 +1,109 @@
+"""Flask CLI commands: flask init-db, flask check-migrations, flask backfill-status, flask seed"""
+import os
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, select
+from app import db
+
+# Revision matching databases built by db.create_all() before migrations existed
+BASELINE_REVISION = '0001'
+
+
+def init_migrations(app):
+    """Set up Flask-Migrate with the backend/migrations directory"""
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
+
+
+def init_database(log=click.echo):
+    """
+    Bring the database to the latest migration
+
+    Empty databases are built by running every revision. Databases created
+    with db.create_all() have no alembic_version table: they are stamped at
+    the latest revision if they already match the models, otherwise at the
+    baseline, and then upgraded.
+    """
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    from flask_migrate import stamp, upgrade
+    # Outside the flask CLI create_app skips Flask-Migrate
+    init_migrations(current_app)
+
+    tables = set(inspect(db.engine).get_table_names())
+    if tables and 'alembic_version' not in tables:
+        with db.engine.connect() as conn:
+            differences = compare_metadata(MigrationContext.configure(conn), db.metadata)
+        revision = BASELINE_REVISION if differences else 'head'
+        log(f'Existing tables without migration history, stamping {revision}')
+        stamp(revision=revision)
+    upgrade()
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the schema or upgrade it to the latest migration."""
+    init_database()
+
+
+@click.command('check-migrations')
+def check_migrations_command():
+    """Upgrade a scratch pre-migration database and compare it with the models."""
+    import tempfile
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    from flask_migrate import upgrade
+    from config import Config
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as scratch:
+        class CheckConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(scratch, 'baseline.db')
+            DATABASE_REPLICA_URLS = []
+            AUTO_CREATE_TABLES = False
+            IMPRESSIONS_ENABLED = False
+
+        app = create_app(CheckConfig)
+        with app.app_context():
+            init_migrations(app)
+            # The baseline revision is the schema db.create_all() built before
+            # migrations; drop the version table so it looks like one of those
+            upgrade(revision=BASELINE_REVISION)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('DROP TABLE alembic_version')
+            init_database(log=lambda line: None)
+            with db.engine.connect() as conn:
+                context = MigrationContext.configure(conn)
+                differences = compare_metadata(context, db.metadata)
+                revision = context.get_current_revision()
+            db.engine.dispose()
+
+    if differences:
+        for difference in differences:
+            click.echo(f'  {difference}')
+        raise click.ClickException(f'Baseline upgraded to {revision} still differs from the models')
+    click.echo(f'Baseline upgrades cleanly to {revision}')
+
+
+@click.command('backfill-status')
+@with_appcontext
+def backfill_status_command():
+    """Show the progress of online data backfills."""
+    from app.models import BackfillProgress
+    rows = db.session.execute(select(BackfillProgress).order_by(BackfillProgress.started_at)).scalars().all()
+    if not rows:
+        click.echo('No backfills recorded')
+    for row in rows:
+        state = f'finished {row.finished_at:%Y-%m-%d %H:%M}' if row.finished_at else f'at key {row.last_key}'
+        click.echo(f'{row.name:<40} {row.rows_updated:>12,} rows  {state}')
+
+
+def register_commands(app):
+    from app.seed import seed_command
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(check_migrations_command)
+    app.cli.add_command(backfill_status_command)
+    app.cli.add_command(seed_command)
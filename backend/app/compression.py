@@ -0,0 +1,239 @@
+"""Response compression (gzip, and brotli when the brotli package is installed)
+
+An after_request hook compresses responses whose content type is text-like
+(JSON, HTML, CSS, JavaScript, SVG, plain text) once the body reaches
+COMPRESSION_MIN_BYTES. Brotli is preferred when the client accepts both.
+Responses that are already encoded, partial, marked Cache-Control:
+no-transform or sent from files are left alone, and every compressible
+response gets Vary: Accept-Encoding.
+
+Streamed responses are never read into memory. With COMPRESSION_STREAMING
+on they are compressed chunk by chunk, flushing after each chunk so the
+client still gets every part as soon as it is produced; otherwise they are
+sent as they are.
+
+Compressed bodies are cached by a digest of the uncompressed bytes, within
+COMPRESSION_CACHE_BYTES, so a body that is served again (a polled
+conversation, an unchanged profile) is compressed once. Per endpoint the
+compressor counts responses, bytes in and out, compression CPU time and
+cache hits; /metrics reports them with the ratio.
+"""
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from flask import request
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+))
+
+
+def _compressible(mimetype):
+    return mimetype is not None and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+class CompressedBodyCache:
+    """Compressed bodies by (digest, encoding); the oldest go first once max_bytes is reached"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes // 8:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def size(self):
+        return self._size
+
+
+class Compressor:
+    def __init__(self, min_bytes=1024, gzip_level=6, brotli_quality=4, streaming=True, cache_bytes=32 * 1024 * 1024):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.streaming = streaming
+        self.cache = CompressedBodyCache(cache_bytes)
+        self.skipped = {}          # reason -> responses sent uncompressed
+        self._routes = {}          # (endpoint, encoding) -> [responses, bytes in, bytes out, cpu seconds, cache hits]
+        self._lock = threading.Lock()
+
+    def encodings(self):
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def choose_encoding(self, accept_encodings):
+        """Best encoding the client accepts, or None"""
+        best, best_quality = None, 0
+        for encoding in self.encodings():
+            quality = accept_encodings.quality(encoding)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def stats(self):
+        """(endpoint, encoding) -> dict of counts, merged from the per-route totals"""
+        with self._lock:
+            routes = {key: list(values) for key, values in self._routes.items()}
+        return {key: dict(zip(('responses', 'bytes_in', 'bytes_out', 'cpu_seconds', 'cache_hits'), values))
+                for key, values in routes.items()}
+
+    def process(self, response):
+        """Compress response in place when it is worth it; returns response"""
+        if not _compressible(response.mimetype):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        reason = self._skip_reason(response)
+        encoding = None if reason else self.choose_encoding(request.accept_encodings)
+        if reason is None and encoding is None:
+            reason = 'not_accepted'
+        if reason is None and response.is_streamed:
+            if self.streaming:
+                self._compress_stream(response, encoding)
+                return response
+            reason = 'streamed'
+        if reason is None:
+            data = response.get_data()
+            if len(data) < self.min_bytes:
+                reason = 'small'
+            else:
+                self._compress_body(response, data, encoding)
+                return response
+        with self._lock:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        return response
+
+    def _skip_reason(self, response):
+        if response.direct_passthrough:
+            return 'file'
+        if 'Content-Encoding' in response.headers or 'Content-Range' in response.headers:
+            return 'encoded'
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return 'no_body'
+        if 'no-transform' in response.headers.get('Cache-Control', ''):
+            return 'no_transform'
+        if request.method == 'HEAD':
+            return 'no_body'
+        return None
+
+    def _record(self, endpoint, encoding, bytes_in, bytes_out, cpu, cache_hit=False):
+        with self._lock:
+            totals = self._routes.get((endpoint, encoding))
+            if totals is None:
+                totals = self._routes[(endpoint, encoding)] = [0, 0, 0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += bytes_in
+            totals[2] += bytes_out
+            totals[3] += cpu
+            totals[4] += cache_hit
+
+    def _set_headers(self, response, encoding):
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong validator names exact bytes, which differ per encoding
+            response.set_etag(f'{etag}-{encoding}')
+
+    def _compress_body(self, response, data, encoding):
+        started = time.thread_time()
+        key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+        body = self.cache.get(key)
+        cache_hit = body is not None
+        if not cache_hit:
+            body = self.compress(data, encoding)
+            self.cache.put(key, body)
+        self._record(request.endpoint or 'unmatched', encoding, len(data), len(body),
+                     time.thread_time() - started, cache_hit)
+        response.set_data(body)
+        self._set_headers(response, encoding)
+
+    def _compress_stream(self, response, encoding):
+        chunks = response.response
+        endpoint = request.endpoint or 'unmatched'
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            process, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            process, finish = compressor.compress, compressor.flush
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        encoded = response.iter_encoded()
+
+        def generate():
+            bytes_in = bytes_out = 0
+            cpu = 0.0
+            try:
+                for chunk in encoded:
+                    if not chunk:
+                        continue
+                    started = time.thread_time()
+                    out = process(chunk) + flush()
+                    cpu += time.thread_time() - started
+                    bytes_in += len(chunk)
+                    bytes_out += len(out)
+                    yield out
+                started = time.thread_time()
+                out = finish()
+                cpu += time.thread_time() - started
+                bytes_out += len(out)
+                yield out
+            finally:
+                self._record(endpoint, encoding, bytes_in, bytes_out, cpu)
+
+        # Closing the response must still close the original iterable (and
+        # its request context), even if generate() never started
+        response.response = ClosingIterator(generate(), getattr(chunks, 'close', None))
+        response.headers.pop('Content-Length', None)
+        self._set_headers(response, encoding)
+
+
+def init_compression(app):
+    """Compress responses in an after_request hook (COMPRESSION_ENABLED)"""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return None
+    compressor = app.extensions['compressor'] = Compressor(
+        min_bytes=app.config.get('COMPRESSION_MIN_BYTES', 1024),
+        gzip_level=app.config.get('COMPRESSION_GZIP_LEVEL', 6),
+        brotli_quality=app.config.get('COMPRESSION_BROTLI_QUALITY', 4),
+        streaming=app.config.get('COMPRESSION_STREAMING', True),
+        cache_bytes=app.config.get('COMPRESSION_CACHE_BYTES', 32 * 1024 * 1024),
+    )
+    app.after_request(compressor.process)
+    return compressor
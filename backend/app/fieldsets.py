@@ -0,0 +1,40 @@
+"""Sparse fieldsets: ?fields= for user representations
+
+User.to_dict() has three tiers:
+    summary  id, username, profile_pic; every user referenced in a list
+             (feed and comment authors, message participants, followers)
+    profile  summary plus bio, created_at and the follower, following and
+             post counts; another user's profile page
+    private  profile plus email and theme; only the user themself
+The counts cost a query each, so only the profile and private tiers run them.
+
+Clients can name the fields they want instead: fields[user]=id,username
+shapes every user in a response, and on endpoints that return users
+(followers, profiles, /auth/me) plain fields= does the same. The names can
+reach up to the profile tier anywhere, and into private only where the
+endpoint shows the user their own data. The id is always included and
+unknown names are ignored. /users/<username> returns the counts as
+followers_count, following_count and posts_count; either name selects them.
+"""
+from flask import has_request_context, request
+
+
+def requested_fields(resource='user', primary=False):
+    """
+    Field names the client asked for, or None for the tier's defaults
+
+    Args:
+        resource: Reads fields[<resource>]=
+        primary: The endpoint returns this resource, so plain fields= counts too
+
+    Returns:
+        frozenset or None
+    """
+    if not has_request_context():
+        return None
+    raw = request.args.get(f'fields[{resource}]')
+    if raw is None and primary:
+        raw = request.args.get('fields')
+    if raw is None:
+        return None
+    return frozenset(name.strip() for name in raw.split(',') if name.strip())
@@ -0,0 +1,257 @@
+"""Index advisor built on the captured query shapes
+
+query_stats keeps one sample statement, with its parameters, for every
+SELECT shape the process has run. advise() runs the database's EXPLAIN on
+the heaviest shapes and reports:
+  - full table scans, full index scans and sorts that no index serves;
+  - a suggested index for each scanned table. Its columns are the ones the
+    statement compares with '=' or IN, then one range or ORDER BY column;
+  - indexes that none of the explained plans used. This is only as complete
+    as the traffic the process has seen, so check it before dropping any.
+
+SQLite (EXPLAIN QUERY PLAN), MySQL (EXPLAIN) and PostgreSQL
+(EXPLAIN (FORMAT JSON)) plans are understood. Reports are available at
+GET /api/admin/index-advisor and from 'python -m benchmarks --index-advice'.
+"""
+import json
+import re
+from collections import namedtuple
+from sqlalchemy import inspect
+
+PlanStep = namedtuple('PlanStep', ['table', 'access', 'index', 'detail'])
+
+# access values
+SCAN = 'full_scan'
+INDEX_SCAN = 'full_index_scan'
+LOOKUP = 'index_lookup'
+SORT = 'sort'
+
+_Q = r'[`"\[]?'
+_QE = r'[`"\]]?'
+_ALIAS_RE = re.compile(rf'(?:FROM|JOIN)\s+{_Q}(\w+){_QE}\s+(?:AS\s+)?{_Q}(\w+){_QE}', re.IGNORECASE)
+_SQLITE_STEP_RE = re.compile(r'^(SCAN|SEARCH)\s+(\w+)(?:\s+AS\s+(\w+))?(?:\s+USING\s+(?:COVERING\s+)?INDEX\s+(\w+))?(.*)$')
+_RESERVED = {'select', 'where', 'join', 'left', 'inner', 'outer', 'on', 'order', 'group', 'limit', 'union'}
+
+
+def _explain_sqlite(conn, statement, parameters):
+    steps = []
+    for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters):
+        detail = row[-1]
+        match = _SQLITE_STEP_RE.match(detail)
+        if match:
+            verb, table, alias, index, rest = match.groups()
+            if verb == 'SEARCH':
+                access = LOOKUP
+            else:
+                access = INDEX_SCAN if index else SCAN
+            if 'PRIMARY KEY' in rest:
+                index = 'PRIMARY'
+            steps.append(PlanStep(alias or table, access, index, detail))
+        elif detail.startswith('USE TEMP B-TREE'):
+            steps.append(PlanStep(None, SORT, None, detail))
+    return steps
+
+
+def _explain_mysql(conn, statement, parameters):
+    steps = []
+    result = conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+    for row in result.mappings():
+        kind, key, extra = row.get('type'), row.get('key'), row.get('Extra') or ''
+        detail = f"{row.get('table')}: type={kind} key={key} rows={row.get('rows')} {extra}".strip()
+        if row.get('table'):
+            access = SCAN if kind == 'ALL' else INDEX_SCAN if kind == 'index' else LOOKUP
+            steps.append(PlanStep(row['table'], access, key, detail))
+        if 'Using filesort' in extra or 'Using temporary' in extra:
+            steps.append(PlanStep(row.get('table'), SORT, None, detail))
+    return steps
+
+
+def _explain_postgresql(conn, statement, parameters):
+    plan = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    steps = []
+
+    def walk(node):
+        kind = node.get('Node Type', '')
+        table = node.get('Alias') or node.get('Relation Name')
+        detail = f"{kind} {table or ''} {node.get('Index Name') or ''}".strip()
+        if kind == 'Seq Scan':
+            steps.append(PlanStep(table, SCAN, None, detail))
+        elif 'Index' in kind and table:
+            steps.append(PlanStep(table, LOOKUP, node.get('Index Name'), detail))
+        elif kind == 'Bitmap Index Scan':
+            steps.append(PlanStep(None, LOOKUP, node.get('Index Name'), detail))
+        elif kind in ('Sort', 'Incremental Sort'):
+            steps.append(PlanStep(None, SORT, None, detail))
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return steps
+
+
+_EXPLAINERS = {
+    'sqlite': _explain_sqlite,
+    'mysql': _explain_mysql,
+    'postgresql': _explain_postgresql,
+}
+
+
+def _aliases(shape):
+    """alias -> table for 'FROM post AS post_1' style clauses"""
+    aliases = {}
+    for table, alias in _ALIAS_RE.findall(shape):
+        if alias.lower() not in _RESERVED:
+            aliases[alias] = table
+    return aliases
+
+
+def suggest_columns(shape, table_ref):
+    """
+    Columns for an index that would turn a scan of table_ref into a lookup
+
+    Args:
+        shape: Normalized statement
+        table_ref: Table name or alias as it appears in the statement
+
+    Returns:
+        list: Equality columns first, then one range or ORDER BY column
+    """
+    ref = rf'{_Q}{re.escape(table_ref)}{_QE}\.{_Q}(\w+){_QE}'
+    equality, ranged = [], []
+    for column in re.findall(ref + r'\s*(?:=|IN\b|IS\b)', shape, re.IGNORECASE):
+        if column not in equality:
+            equality.append(column)
+    for column in re.findall(ref + r'\s*(?:<|>|BETWEEN\b|LIKE\b)', shape, re.IGNORECASE):
+        if column not in equality and column not in ranged:
+            ranged.append(column)
+    order = re.search(r'ORDER BY\s+' + ref, shape, re.IGNORECASE)
+    if order and order.group(1) not in equality and order.group(1) not in ranged:
+        ranged.append(order.group(1))
+    return equality + ranged[:1]
+
+
+def _existing_indexes(inspector, table, cache):
+    if table not in cache:
+        try:
+            indexes = [(i['name'], i['column_names'], bool(i.get('unique'))) for i in inspector.get_indexes(table)]
+            for constraint in inspector.get_unique_constraints(table):
+                indexes.append((constraint['name'], constraint['column_names'], True))
+            primary = inspector.get_pk_constraint(table).get('constrained_columns') or []
+            if primary:
+                indexes.append(('PRIMARY', primary, True))
+        except Exception:
+            indexes = []
+        cache[table] = indexes
+    return cache[table]
+
+
+def advise(shapes, engine, limit=50):
+    """
+    Explain captured SELECT shapes and collect index advice
+
+    Args:
+        shapes: QueryShape objects (e.g. query_shapes.top())
+        engine: Engine to run EXPLAIN on
+        limit: Most expensive shapes to explain
+
+    Returns:
+        dict: dialect, per-shape plans and problems, missing and unused indexes
+    """
+    explain = _EXPLAINERS.get(engine.dialect.name)
+    if explain is None:
+        raise ValueError(f'EXPLAIN is not supported for {engine.dialect.name}')
+
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    index_cache = {}
+    used = set()
+    missing = {}
+    report = {'dialect': engine.dialect.name, 'shapes': [], 'errors': 0}
+
+    with engine.connect() as conn:
+        for entry in list(shapes)[:limit]:
+            if entry.parameters is None or not entry.statement.lstrip()[:6].upper() == 'SELECT':
+                continue
+            try:
+                steps = explain(conn, entry.statement, entry.parameters)
+            except Exception as e:
+                conn.rollback()
+                report['errors'] += 1
+                report['shapes'].append({'shape': entry.shape, 'error': str(e)})
+                continue
+
+            aliases = _aliases(entry.shape)
+            problems, suggestions = [], []
+            for step in steps:
+                table = aliases.get(step.table, step.table)
+                if step.index:
+                    used.add((table, step.index))
+                if step.access == SORT:
+                    problems.append(f'sort without an index: {step.detail}')
+                elif step.access in (SCAN, INDEX_SCAN) and table in tables:
+                    problems.append(f"{'full scan' if step.access == SCAN else 'full index scan'} of {table}")
+                    columns = suggest_columns(entry.shape, step.table)
+                    existing = [cols for _, cols, _ in _existing_indexes(inspector, table, index_cache)]
+                    if columns and not any(cols[:len(columns)] == columns for cols in existing):
+                        key = (table, tuple(columns))
+                        suggestions.append({'table': table, 'columns': columns})
+                        item = missing.setdefault(key, {'table': table, 'columns': columns, 'shapes': 0, 'calls': 0, 'seconds': 0.0})
+                        item['shapes'] += 1
+                        item['calls'] += entry.count
+                        item['seconds'] += entry.seconds
+
+            report['shapes'].append({
+                'shape': entry.shape,
+                'count': entry.count,
+                'total_ms': round(entry.seconds * 1000, 2),
+                'endpoints': dict(entry.endpoints.most_common(5)),
+                'plan': [step.detail for step in steps],
+                'problems': problems,
+                'suggestions': suggestions,
+            })
+
+    unused = []
+    for table in sorted(tables):
+        if table == 'alembic_version':
+            continue
+        for name, columns, unique in _existing_indexes(inspector, table, index_cache):
+            if unique or name is None or (table, name) in used:
+                continue
+            unused.append({'table': table, 'index': name, 'columns': columns})
+
+    report['missing_indexes'] = sorted(missing.values(), key=lambda m: m['seconds'], reverse=True)
+    for item in report['missing_indexes']:
+        item['seconds'] = round(item['seconds'], 4)
+    report['unused_indexes'] = unused
+    return report
+
+
+def format_report(report):
+    """Plain-text rendering of an advise() report"""
+    lines = [f"Index advisor ({report['dialect']}): {len(report['shapes'])} shapes explained, {report['errors']} failed"]
+    flagged = [s for s in report['shapes'] if s.get('problems')]
+    lines.append('')
+    lines.append(f'Shapes with scans or sorts: {len(flagged)}')
+    for s in flagged:
+        endpoints = ', '.join(s['endpoints']) or '-'
+        lines.append(f"  {s['count']:>6}x {s['total_ms']:>9.1f} ms  [{endpoints}]")
+        lines.append(f"         {s['shape'][:160]}")
+        for problem in s['problems']:
+            lines.append(f'         - {problem}')
+
+    lines.append('')
+    lines.append('Missing indexes:')
+    for m in report['missing_indexes'] or []:
+        lines.append(f"  {m['table']} ({', '.join(m['columns'])})  {m['shapes']} shapes, {m['calls']} calls, {m['seconds'] * 1000:.1f} ms")
+    if not report['missing_indexes']:
+        lines.append('  none')
+
+    lines.append('')
+    lines.append('Indexes no explained plan used:')
+    for u in report['unused_indexes'] or []:
+        lines.append(f"  {u['table']}.{u['index']} ({', '.join(u['columns'])})")
+    if not report['unused_indexes']:
+        lines.append('  none')
+    return '\n'.join(lines)
@@ -0,0 +1,195 @@
+"""JSON encoding for API responses
+
+FastJSONProvider replaces Flask's provider. With JSON_BACKEND 'auto' (the
+default) it encodes with orjson when that is installed and with the standard
+library otherwise; values orjson rejects, such as integers wider than 64
+bits, fall back to the standard library too. The output keeps Flask's
+conventions (sorted keys, HTTP dates for date objects) except that
+non-ASCII text is written as UTF-8 instead of \\u escapes.
+
+JSONFragment is a value that is already encoded. A response that repeats an
+object, like the author of every post in a feed or both users of every
+message, encodes it once with shared_fragment() and copies the bytes after
+that. orjson versions with orjson.Fragment embed fragments directly; other
+encoders write a placeholder that is swapped for the bytes afterwards.
+Fragments only make sense in values handed to jsonify.
+
+FragmentCache keeps fragments of values that never change (a post's
+uploaded image as a data URL) across requests, within a byte budget.
+"""
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from flask import current_app, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# dumps() keyword arguments the orjson path can honour; anything else uses the standard library
+_ORJSON_KWARGS = frozenset(('indent', 'separators', 'sort_keys', 'default'))
+
+
+class JSONFragment:
+    """Encoded JSON for one value"""
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __repr__(self):
+        return f'<JSONFragment {len(self.raw)} bytes>'
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config.get('JSON_BACKEND', 'auto')
+        if backend not in ('auto', 'orjson', 'json'):
+            raise ValueError(f"JSON_BACKEND must be 'auto', 'orjson' or 'json', not {backend!r}")
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError('JSON_BACKEND is orjson but orjson is not installed')
+        self.backend = 'orjson' if orjson is not None and backend != 'json' else 'json'
+        self.fallbacks = 0
+        # Random per process, so user content cannot forge a placeholder
+        self._token = f'__json_fragment_{secrets.token_hex(8)}_'
+        self._placeholder_re = re.compile(rb'"' + re.escape(self._token.encode()) + rb'(\d+)"')
+        self._native_fragment = getattr(orjson, 'Fragment', None)
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def dumps_bytes(self, obj, **kwargs):
+        """Encode obj to UTF-8 JSON bytes"""
+        fragments = []
+        native = None
+        default = kwargs.pop('default', self.default)
+
+        def encode_default(value):
+            if isinstance(value, JSONFragment):
+                if native is not None:
+                    return native(value.raw)
+                fragments.append(value.raw)
+                return f'{self._token}{len(fragments) - 1}'
+            return default(value)
+
+        output = None
+        if self.backend == 'orjson' and kwargs.keys() <= _ORJSON_KWARGS:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            native = self._native_fragment
+            try:
+                output = orjson.dumps(obj, default=encode_default, option=option)
+            except TypeError:
+                # Unsupported value (e.g. an integer over 64 bits); let the standard library decide
+                self.fallbacks += 1
+                fragments.clear()
+                native = None
+        if output is None:
+            output = super().dumps(obj, default=encode_default, **kwargs).encode()
+
+        if fragments:
+            output = self._placeholder_re.sub(lambda m: fragments[int(m.group(1))], output)
+        return output
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def fragment(self, value):
+        """Encode value once for reuse inside later responses"""
+        return JSONFragment(self.dumps_bytes(value, separators=(',', ':')))
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = self.dumps_bytes(obj, indent=2)
+        else:
+            body = self.dumps_bytes(obj, separators=(',', ':'))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def shared_fragment(key, build):
+    """
+    Encoded build() result, computed once per request for each key
+
+    Outside a request, or without FastJSONProvider, this is just build().
+    The first result is reused for the rest of the request, so only share
+    values the request does not change afterwards.
+
+    Args:
+        key: Hashable identity of the value, e.g. ('user', 42)
+        build: Callable returning the value
+
+    Returns:
+        JSONFragment or the built value
+    """
+    provider = current_app.json if has_request_context() else None
+    if not isinstance(provider, FastJSONProvider):
+        return build()
+    cache = g.setdefault('_json_fragments', {})
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment = cache[key] = provider.fragment(build())
+    return fragment
+
+
+class FragmentCache:
+    """Process-wide fragments of immutable values; the oldest go first once max_bytes is reached"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        Cached fragment for key, encoding build() on a miss
+
+        Without FastJSONProvider this is just build().
+        """
+        fragment = self._entries.get(key)
+        if fragment is not None:
+            self.hits += 1
+            return fragment
+
+        provider = current_app.json if current_app else None
+        if not isinstance(provider, FastJSONProvider):
+            return build()
+        self.misses += 1
+        fragment = provider.fragment(build())
+        if len(fragment.raw) <= self.max_bytes // 8:
+            with self._lock:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._size -= len(previous.raw)
+                self._entries[key] = fragment
+                self._size += len(fragment.raw)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted.raw)
+        return fragment
+
+    def size(self):
+        return self._size
+
+
+post_fragments = FragmentCache()
+
+
+def init_json(app):
+    """Install FastJSONProvider as app.json"""
+    post_fragments.max_bytes = app.config.get('JSON_FRAGMENT_CACHE_BYTES', post_fragments.max_bytes)
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    return app.json
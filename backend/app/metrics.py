@@ -0,0 +1,455 @@
+"""Prometheus metrics for HTTP, database, Socket.IO, outbound calls and caches
+
+GET /metrics serves the Prometheus text format. With METRICS_TOKEN set,
+scrapers send it as a bearer token. Without one, only loopback clients and
+operators (see app.auth.is_admin) may read it, because it reveals traffic,
+SQL and upstream timings. Every worker process keeps its own numbers, so
+scrape each worker or run one per host.
+
+Recording is meant to stay on in production. Counters and histograms are
+split into SHARDS shards, each with its own lock, and every thread writes
+to the shard it was assigned on first use. Request threads therefore almost
+never contend, and a scrape merges the shards. Numbers that are already
+kept elsewhere are read only at scrape time by collectors, instead of being
+copied on every event. These include outbound client stats, cache hit
+counters, hasher and indexer queues, and pool sizes.
+"""
+import hmac
+import itertools
+import sys
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import db
+
+SHARDS = 16
+
+# Seconds; tuned for API requests and SQL statements
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_next_shard = itertools.count()
+_local = threading.local()
+
+
+def _shard_index():
+    index = getattr(_local, 'shard', None)
+    if index is None:
+        index = _local.shard = next(_next_shard) % SHARDS
+    return index
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+        return f'{name}{{{label_text}}} {value}'
+    return f'{name} {value}'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = [(threading.Lock(), {}) for _ in range(SHARDS)]
+
+    def _merged(self, merge):
+        totals = {}
+        for lock, values in self._shards:
+            with lock:
+                items = [(labels, list(v) if isinstance(v, list) else v) for labels, v in values.items()]
+            for labels, value in items:
+                totals[labels] = merge(totals[labels], value) if labels in totals else value
+        return totals
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, labels=(), value=1):
+        lock, values = self._shards[_shard_index()]
+        with lock:
+            values[labels] = values.get(labels, 0) + value
+
+    def totals(self):
+        """Label values -> count, merged across shards"""
+        return self._merged(lambda a, b: a + b)
+
+    def _samples(self):
+        for labels, value in sorted(self.totals().items()):
+            yield _format_sample(self.name, zip(self.labelnames, labels), value)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        lock, values = self._shards[_shard_index()]
+        with lock:
+            entry = values.get(labels)
+            if entry is None:
+                # One count per bucket plus +Inf, then the sum
+                entry = values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def _samples(self):
+        merged = self._merged(lambda a, b: [x + y for x, y in zip(a, b)])
+        for labels, entry in sorted(merged.items()):
+            pairs = list(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), entry[:-1]):
+                cumulative += count
+                yield _format_sample(f'{self.name}_bucket', pairs + [('le', bound)], cumulative)
+            yield _format_sample(f'{self.name}_sum', pairs, round(entry[-1], 6))
+            yield _format_sample(f'{self.name}_count', pairs, cumulative)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """
+        Register a scrape-time collector
+
+        fn() yields (name, type, documentation, samples) where samples is a
+        list of (labels dict, value).
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, metric_type, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.extend(_format_sample(name, sorted(labels.items()), value) for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    'http_requests_total', 'HTTP requests by endpoint and status',
+    ('blueprint', 'endpoint', 'method', 'status'))
+http_latency = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ('blueprint', 'endpoint', 'method'))
+db_query_latency = registry.histogram(
+    'db_query_duration_seconds', 'SQL statement execution time', ('operation',))
+db_checkout_latency = registry.histogram(
+    'db_pool_checkout_seconds', 'Time to check a connection out of the pool', ('engine',))
+socketio_events = registry.counter(
+    'socketio_events_total', 'Socket.IO events handled by event name', ('event',))
+socketio_latency = registry.histogram(
+    'socketio_event_duration_seconds', 'Socket.IO handler time by event name', ('event',))
+
+
+# --- HTTP ---------------------------------------------------------------
+
+def _endpoint_labels():
+    if request.url_rule is None:
+        return ('', 'unmatched', request.method)
+    return (request.blueprint or '', request.endpoint, request.method)
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('_metrics_start', None)
+    if start is not None:
+        labels = _endpoint_labels()
+        http_latency.observe(labels, time.perf_counter() - start)
+        http_requests.inc(labels + (str(response.status_code),))
+    return response
+
+
+def _teardown_request(exc):
+    # Only still set when an unhandled exception skipped after_request
+    start = g.pop('_metrics_start', None)
+    if start is not None and exc is not None:
+        labels = _endpoint_labels()
+        http_latency.observe(labels, time.perf_counter() - start)
+        http_requests.inc(labels + ('500',))
+
+
+# --- Database -----------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Per statement, so one that raises (no after_cursor_execute) leaves nothing behind
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_query_start', None)
+    if started is not None:
+        operation = statement.lstrip()[:6].upper()
+        if operation not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+            operation = 'OTHER'
+        db_query_latency.observe((operation,), time.perf_counter() - started)
+
+
+def _instrument_pool(engine, name):
+    # Every Connection checks out through engine.raw_connection(), so timing
+    # it measures pool wait plus any new connection being opened
+    if getattr(engine.raw_connection, '_metrics_wrapped', False):
+        return
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            db_checkout_latency.observe((name,), time.perf_counter() - start)
+
+    timed_raw_connection._metrics_wrapped = True
+    engine.raw_connection = timed_raw_connection
+
+
+# --- Socket.IO ----------------------------------------------------------
+
+def _instrument_socketio(socketio):
+    # All @socketio.on handlers are dispatched through _handle_event with
+    # the event name, including 'connect' and 'disconnect'
+    handle_event = socketio._handle_event
+    if getattr(handle_event, '_metrics_wrapped', False):
+        return
+
+    def record(message, start):
+        socketio_events.inc((message,))
+        socketio_latency.observe((message,), time.perf_counter() - start)
+
+    def timed_handle_event(handler, message, *args):
+        start = time.perf_counter()
+        try:
+            result = handle_event(handler, message, *args)
+        except TypeError:
+            # python-socketio retries handlers that do not take its extra
+            # argument (e.g. the disconnect reason); only count the retry
+            raise
+        except Exception:
+            record(message, start)
+            raise
+        record(message, start)
+        return result
+
+    timed_handle_event._metrics_wrapped = True
+    socketio._handle_event = timed_handle_event
+
+
+@registry.collector
+def _socketio_collector():
+    from app.socket_events import connected_users
+    totals = socketio_events.totals()
+    connected = totals.get(('connect',), 0) - totals.get(('disconnect',), 0)
+    yield 'socketio_connected_clients', 'gauge', 'Open Socket.IO connections', [({}, max(0, connected))]
+    yield 'socketio_registered_users', 'gauge', 'Users registered for calls', [({}, len(connected_users))]
+
+
+# --- Outbound clients, caches and queues --------------------------------
+
+@registry.collector
+def _outbound_collector():
+    # Only report clients that exist; scraping should not import the HTTP stack
+    http_client = sys.modules.get('app.services.http_client')
+    if http_client is None:
+        return
+    requests_total, results, retries, latency, breaker = [], [], [], [], []
+    for name, client in sorted(http_client._clients.items()):
+        stats = client.stats()
+        requests_total.append(({'upstream': name}, stats['requests']))
+        retries.append(({'upstream': name}, stats['retries']))
+        for result in ('successes', 'failures', 'rejected', 'short_circuited', 'fallbacks'):
+            results.append(({'upstream': name, 'result': result}, stats[result]))
+        for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+            if stats[key] is not None:
+                latency.append(({'upstream': name, 'quantile': quantile}, stats[key] / 1000))
+        breaker.append(({'upstream': name, 'state': stats['breaker_state']}, 1))
+    yield 'outbound_requests_total', 'counter', 'Outbound API calls', requests_total
+    yield 'outbound_results_total', 'counter', 'Outbound API call outcomes', results
+    yield 'outbound_retries_total', 'counter', 'Outbound API retries', retries
+    yield 'outbound_request_duration_seconds', 'summary', 'Recent outbound API latency', latency
+    yield 'outbound_circuit_state', 'gauge', 'Circuit breaker state per upstream', breaker
+
+
+@registry.collector
+def _cache_collector():
+    from app.auth import identity_cache
+    from app.sessions import CachedSessionBackend
+    from app.json_provider import post_fragments
+    caches = [('identity', identity_cache), ('post_fragments', post_fragments)]
+    compressor = current_app.extensions.get('compressor')
+    if compressor is not None:
+        caches.append(('compressed_bodies', compressor.cache))
+    store = getattr(current_app.session_interface, 'store', None)
+    if isinstance(store, CachedSessionBackend):
+        caches.append(('session', store))
+    yield 'cache_hits_total', 'counter', 'In-process cache hits', [({'cache': n}, c.hits) for n, c in caches]
+    yield 'cache_misses_total', 'counter', 'In-process cache misses', [({'cache': n}, c.misses) for n, c in caches]
+
+
+@registry.collector
+def _queue_collector():
+    from app.services.passwords import password_hasher
+    from app.services.post_search import indexer
+    hasher = password_hasher.stats()
+    yield 'password_hash_pending', 'gauge', 'Password hashes queued or running', [({}, hasher['pending'])]
+    yield 'password_hash_completed_total', 'counter', 'Password hashes computed', [({}, hasher['completed'])]
+    yield 'password_hash_rejected_total', 'counter', 'Password hashes rejected while saturated', [({}, hasher['rejected'])]
+    yield 'password_hash_queue_seconds_total', 'counter', 'Time hashes waited for a worker', [({}, hasher['queue_seconds'])]
+    yield 'background_queue_depth', 'gauge', 'Tasks waiting on background workers', [({'worker': indexer.name}, indexer.qsize())]
+    yield 'background_dropped_total', 'counter', 'Tasks dropped by full background queues', [({'worker': indexer.name}, indexer.dropped)]
+
+
+@registry.collector
+def _like_buffer_collector():
+    from app.services.like_buffer import like_buffer
+    if not like_buffer.enabled:
+        return
+    yield 'like_buffer_pending', 'gauge', 'Like changes waiting for the next flush', [({}, like_buffer.pending())]
+    yield 'like_buffer_recorded_total', 'counter', 'Like and unlike requests buffered', [({}, like_buffer.recorded)]
+    yield 'like_buffer_flushed_total', 'counter', 'Coalesced like changes written', [({}, like_buffer.flushed)]
+    yield 'like_buffer_flushes_total', 'counter', 'Like flush transactions', [({'result': 'ok'}, like_buffer.flushes),
+                                                                              ({'result': 'failed'}, like_buffer.failures)]
+
+
+@registry.collector
+def _impressions_collector():
+    from app.services.impressions import impressions
+    if not impressions.enabled:
+        return
+    yield 'impressions_queue_depth', 'gauge', 'Feed responses waiting to be counted', [({}, impressions.qsize())]
+    yield 'impressions_recorded_total', 'counter', 'Feed responses queued for counting', [({}, impressions.recorded)]
+    yield 'impressions_dropped_total', 'counter', 'Feed responses dropped by a full queue', [({}, impressions.dropped)]
+    yield 'impressions_rollup_rows_total', 'counter', 'Hourly rollup rows upserted', [({}, impressions.rows_written)]
+    yield 'impressions_flush_failures_total', 'counter', 'Failed rollup writes', [({}, impressions.failures)]
+
+
+@registry.collector
+def _pool_collector():
+    samples = []
+    for key, engine in db.engines.items():
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            samples.append(({'engine': key or 'default', 'state': 'checked_out'}, pool.checkedout()))
+            samples.append(({'engine': key or 'default', 'state': 'idle'}, pool.checkedin()))
+    yield 'db_pool_connections', 'gauge', 'Pooled database connections', samples
+
+
+@registry.collector
+def _replica_collector():
+    router = current_app.extensions.get('replica_router')
+    if router is not None:
+        yield 'db_routed_requests_total', 'counter', 'Requests by the database they read from', [
+            ({'target': 'replica'}, router.replica_requests),
+            ({'target': 'primary'}, router.primary_requests),
+        ]
+
+
+@registry.collector
+def _compression_collector():
+    compressor = current_app.extensions.get('compressor')
+    if compressor is None:
+        return
+    responses, bytes_in, bytes_out, ratio, cpu, hits = [], [], [], [], [], []
+    for (endpoint, encoding), stats in sorted(compressor.stats().items()):
+        labels = {'endpoint': endpoint, 'encoding': encoding}
+        responses.append((labels, stats['responses']))
+        bytes_in.append((labels, stats['bytes_in']))
+        bytes_out.append((labels, stats['bytes_out']))
+        if stats['bytes_out']:
+            ratio.append((labels, round(stats['bytes_in'] / stats['bytes_out'], 3)))
+        cpu.append((labels, round(stats['cpu_seconds'], 6)))
+        hits.append((labels, stats['cache_hits']))
+    yield 'http_compressed_responses_total', 'counter', 'Compressed responses by endpoint and encoding', responses
+    yield 'http_compression_input_bytes_total', 'counter', 'Response bytes before compression', bytes_in
+    yield 'http_compression_output_bytes_total', 'counter', 'Response bytes after compression', bytes_out
+    yield 'http_compression_ratio', 'gauge', 'Uncompressed over compressed bytes since start', ratio
+    yield 'http_compression_cpu_seconds_total', 'counter', 'CPU time spent compressing (and hashing for the cache)', cpu
+    yield 'http_compression_cache_hits_total', 'counter', 'Responses served from already compressed bodies', hits
+    yield 'http_compression_skipped_total', 'counter', 'Compressible responses sent uncompressed, by reason', [
+        ({'reason': reason}, n) for reason, n in sorted(compressor.skipped.items())]
+
+
+@registry.collector
+def _rate_limit_collector():
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is not None:
+        yield 'ratelimit_limited_total', 'counter', 'Requests rejected by rate limits', [({}, limiter.limited)]
+
+
+LOOPBACK_ADDRESSES = frozenset(('127.0.0.1', '::1'))
+
+
+def _metrics_allowed(app):
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    from app.auth import is_admin
+    return request.remote_addr in LOOPBACK_ADDRESSES or is_admin()
+
+
+_listening = False
+
+
+def init_metrics(app, socketio):
+    """Install the recording hooks and the /metrics endpoint"""
+    global _listening
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+    with app.app_context():
+        for key, engine in db.engines.items():
+            _instrument_pool(engine, key or 'default')
+    _instrument_socketio(socketio)
+
+    @app.route('/metrics')
+    def metrics():
+        if not _metrics_allowed(app):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
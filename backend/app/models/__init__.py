@@ -1,6 +1,11 @@
 # Import all models from the models.py file
 from .models import User, Post, Like, Comment, Follow, Message
 from .note import Note
+from .track import SpotifyTrack
+from .session import UserSession
+from .rate_limit import RateLimitCounter
+from .backfill import BackfillProgress
+from .impression import PostImpressionHourly
 
 # Make sure all models are available when importing from app.models
-__all__ = ['User', 'Post', 'Like', 'Comment', 'Follow', 'Message', 'Note']
\ No newline at end of file
+__all__ = ['User', 'Post', 'Like', 'Comment', 'Follow', 'Message', 'Note', 'SpotifyTrack', 'UserSession', 'RateLimitCounter', 'BackfillProgress', 'PostImpressionHourly']
\ No newline at end of file
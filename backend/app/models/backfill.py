@@ -0,0 +1,17 @@
+"""Progress of online data backfills (see app/online_migrations.py)"""
+from datetime import datetime
+from app import db
+
+class BackfillProgress(db.Model):
+    __tablename__ = 'backfill_progress'
+
+    name = db.Column(db.String(100), primary_key=True)
+    # Highest primary key already processed; the next batch starts after it
+    last_key = db.Column(db.BigInteger, nullable=False, default=0)
+    rows_updated = db.Column(db.BigInteger, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<BackfillProgress {self.name} @{self.last_key}>'
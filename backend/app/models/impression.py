@@ -0,0 +1,19 @@
+"""Hourly post impression rollups written by app/services/impressions.py"""
+from app import db
+
+class PostImpressionHourly(db.Model):
+    __tablename__ = 'post_impression_hourly'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True)
+    # Start of the UTC hour the impressions fall in
+    hour = db.Column(db.DateTime, primary_key=True)
+    impressions = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'hour': self.hour.isoformat() + 'Z',
+            'impressions': self.impressions
+        }
+
+    def __repr__(self):
+        return f'<PostImpressionHourly {self.post_id} {self.hour:%Y-%m-%d %H}:00 {self.impressions}>'
@@ -1,22 +1,46 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import event
+from sqlalchemy.dialects.mysql import LONGBLOB, LONGTEXT
 import base64
+from app.services.passwords import password_hasher
+from app.services.like_buffer import like_buffer
+from app.json_provider import post_fragments, shared_fragment
+from app.fieldsets import requested_fields
 
 # Association table for followers
 followers = db.Table('followers',
     db.Column('follower_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('followed_id', db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    db.Column('followed_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    # The primary key serves "who do I follow"; this serves "who follows me"
+    db.Index('ix_followers_followed_id_follower_id', 'followed_id', 'follower_id')
 )
 
+# User.to_dict() tiers; each includes the one before it
+USER_TIERS = {'summary': ('id', 'username', 'profile_pic')}
+USER_TIERS['profile'] = USER_TIERS['summary'] + ('bio', 'created_at', 'followers', 'following', 'posts')
+USER_TIERS['private'] = USER_TIERS['profile'] + ('email', 'theme')
+
+_user_fields = {
+    'id': lambda user: user.id,
+    'username': lambda user: user.username,
+    'profile_pic': lambda user: user.profile_pic or 'default.jpg',
+    'bio': lambda user: user.bio or '',
+    'created_at': lambda user: user.created_at.isoformat() + 'Z' if user.created_at else None,
+    'followers': lambda user: user.get_follower_count(),
+    'following': lambda user: user.get_following_count(),
+    'posts': lambda user: user.get_post_count(),
+    'email': lambda user: user.email,
+    'theme': lambda user: user.theme or 'light',
+}
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    # profile_pic can hold a URL/path or base64 data-URI
-    profile_pic = db.Column(db.Text, default='default.jpg')
+    # profile_pic can hold a URL/path or base64 data-URI (MySQL TEXT stops at 64 KB)
+    profile_pic = db.Column(db.Text().with_variant(LONGTEXT(), 'mysql'), default='default.jpg')
     bio = db.Column(db.Text)
     is_private = db.Column(db.Boolean, default=False)
     theme = db.Column(db.String(20), default='light')
@@ -37,10 +61,13 @@ class User(db.Model):
         backref=db.backref('followers', lazy='dynamic'), lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
     
     def follow(self, user):
         if not self.is_following(user):
@@ -76,20 +103,28 @@ class User(db.Model):
         if len(username) < 3 or len(username) > 20:
             raise ValueError("Username must be between 3 and 20 characters")
     
-    def to_dict(self):
-        """Convert user object to dictionary - only user table data"""
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'bio': self.bio or '',
-            'profile_pic': self.profile_pic or 'default.jpg',
-            'theme': self.theme or 'light',
-            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
-            'followers': self.get_follower_count(),
-            'following': self.get_following_count(),
-            'posts': self.get_post_count()
-        }
+    def to_dict(self, tier='private', fields=None):
+        """
+        Convert user object to dictionary - only user table data
+
+        Args:
+            tier: 'summary', 'profile' or 'private' (see app/fieldsets.py);
+                private is only for the user themself
+            fields: Names to include instead of the tier's, e.g. from ?fields=;
+                limited to the profile tier unless tier is 'private'
+        """
+        if fields is None:
+            names = USER_TIERS[tier]
+        else:
+            allowed = USER_TIERS['private' if tier == 'private' else 'profile']
+            names = [name for name in allowed if name in fields or name == 'id']
+        return {name: _user_fields[name](self) for name in names}
+    
+    def to_shared_dict(self, tier='summary', fields=None):
+        """to_dict() encoded once per request, for responses that repeat the user"""
+        if fields is None:
+            fields = requested_fields('user')
+        return shared_fragment(('user', self.id, tier, fields), lambda: self.to_dict(tier, fields))
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -100,29 +135,41 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(500))  # For external URLs
     video_url = db.Column(db.String(500))  # For YouTube/video URLs
-    image_data = db.Column(db.LargeBinary)  # For uploaded files
+    image_data = db.Column(db.LargeBinary().with_variant(LONGBLOB(), 'mysql'))  # For uploaded files
     image_mimetype = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Maintained by app.services.likes in the same transaction as the like rows
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Profile post listings: WHERE user_id = ? ORDER BY created_at DESC
+    __table_args__ = (db.Index('ix_post_user_id_created_at', 'user_id', 'created_at'),)
     
     # Relationships
     comments = db.relationship('Comment', backref='post', lazy='dynamic', cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='post', lazy='dynamic', cascade='all, delete-orphan')
     
     def get_like_count(self):
-        return self.likes.count()
+        return like_buffer.adjust_count(self.id, self.like_count or 0)
     
     def get_comment_count(self):
         return self.comments.count()
     
     def is_liked_by(self, user):
+        pending = like_buffer.pending_state(user.id, self.id)
+        if pending is not None:
+            return pending
         return self.likes.filter_by(user_id=user.id).first() is not None
     
+    def _image_data_url(self):
+        encoded_data = base64.b64encode(self.image_data).decode('utf-8')
+        return f'data:{self.image_mimetype};base64,{encoded_data}'
+    
     def to_dict(self, current_user=None):
         image = self.image_url
         if self.image_data and self.image_mimetype:
-            encoded_data = base64.b64encode(self.image_data).decode('utf-8')
-            image = f'data:{self.image_mimetype};base64,{encoded_data}'
+            # Uploads never change, so the encoded data URL is reused across requests
+            image = post_fragments.get(('post_image', self.id, self.created_at), self._image_data_url)
         return {
             'id': self.id,
             'content': self.content,
@@ -145,12 +192,15 @@ class Comment(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
     
+    # Comments of a post in order
+    __table_args__ = (db.Index('ix_comment_post_id_created_at', 'post_id', 'created_at'),)
+    
     def to_dict(self):
         return {
             'id': self.id,
             'content': self.content,
             'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
-            'author': self.author.to_dict() if self.author else None,
+            'author': self.author.to_shared_dict() if self.author else None,
             'author_username': self.author.username if self.author else 'Unknown'
         }
 
@@ -161,8 +211,12 @@ class Like(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
     
-    # Ensure a user can only like a post once
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id'),)
+    # Ensure a user can only like a post once; the second index serves
+    # per-post counts and "did I like it" checks without touching the table
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id'),
+        db.Index('ix_like_post_id_user_id', 'post_id', 'user_id'),
+    )
 
 
 class Follow(db.Model):
@@ -173,8 +227,12 @@ class Follow(db.Model):
     following_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Ensure a user can't follow the same user multiple times
-    __table_args__ = (db.UniqueConstraint('follower_id', 'following_id', name='unique_follow'),)
+    # Ensure a user can't follow the same user multiple times; the second
+    # index serves follower counts and lists
+    __table_args__ = (
+        db.UniqueConstraint('follower_id', 'following_id', name='unique_follow'),
+        db.Index('ix_follow_following_id_follower_id', 'following_id', 'follower_id'),
+    )
     
     def to_dict(self):
         """Convert follow object to dictionary for JSON response"""
@@ -199,14 +257,20 @@ class Message(db.Model):
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    # Both directions of a conversation, unread counts and inbox partner lists
+    __table_args__ = (
+        db.Index('ix_message_receiver_id_sender_id_is_read', 'receiver_id', 'sender_id', 'is_read'),
+        db.Index('ix_message_sender_id_receiver_id_created_at', 'sender_id', 'receiver_id', 'created_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
             'content': self.content,
             'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
             'is_read': self.is_read,
-            'sender': self.sender.to_dict() if self.sender else None,
-            'receiver': self.receiver.to_dict() if self.receiver else None
+            'sender': self.sender.to_shared_dict() if self.sender else None,
+            'receiver': self.receiver.to_shared_dict() if self.receiver else None
         }
     
     def __repr__(self):
@@ -8,6 +8,8 @@ class Note(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text)
+    # Legacy per-note copies of the music metadata. New notes only set
+    # spotify_track_id and read the shared SpotifyTrack record instead.
     music_name = db.Column(db.String(255))
     music_artist = db.Column(db.String(255))
     music_preview_url = db.Column(db.String(500))
@@ -15,10 +17,15 @@ class Note(db.Model):
     spotify_track_id = db.Column(db.String(100))
     spotify_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime)
+    # Active notes and expiry cleanup filter on this
+    expires_at = db.Column(db.DateTime, index=True)
     
     # Relationship
     author = db.relationship('User', backref=db.backref('notes', lazy='dynamic'))
+    track = db.relationship(
+        'SpotifyTrack',
+        primaryjoin='foreign(Note.spotify_track_id) == SpotifyTrack.spotify_track_id',
+        viewonly=True)
     
     def __init__(self, **kwargs):
         super(Note, self).__init__(**kwargs)
@@ -26,6 +33,21 @@ class Note(db.Model):
             # Notes expire after 12 hours
             self.expires_at = datetime.utcnow() + timedelta(hours=12)
     
+    def get_music(self):
+        """Music block from the shared track record, falling back to legacy columns"""
+        if self.track:
+            return self.track.to_dict()
+        if self.music_name:
+            return {
+                'name': self.music_name,
+                'artist': self.music_artist,
+                'preview_url': self.music_preview_url,
+                'image': self.music_image,
+                'spotify_track_id': self.spotify_track_id,
+                'spotify_url': self.spotify_url
+            }
+        return None
+    
     def to_dict(self):
         """Convert note to dictionary"""
         return {
@@ -34,14 +56,7 @@ class Note(db.Model):
             'username': self.author.username,
             'profile_pic': self.author.profile_pic,
             'content': self.content,
-            'music': {
-                'name': self.music_name,
-                'artist': self.music_artist,
-                'preview_url': self.music_preview_url,
-                'image': self.music_image,
-                'spotify_track_id': self.spotify_track_id,
-                'spotify_url': self.spotify_url
-            } if self.music_name else None,
+            'music': self.get_music(),
             'created_at': self.created_at.isoformat(),
             'expires_at': self.expires_at.isoformat(),
             'is_expired': datetime.utcnow() > self.expires_at
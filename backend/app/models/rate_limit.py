@@ -0,0 +1,14 @@
+"""Shared rate limit counters (see app/ratelimit.py)"""
+from app import db
+
+class RateLimitCounter(db.Model):
+    __tablename__ = 'rate_limit_counter'
+
+    # '<rule>:<scope>:<value>', e.g. 'auth.login:ip:203.0.113.7'
+    key = db.Column(db.String(255), primary_key=True)
+    # Start of the fixed window (unix seconds) this count belongs to
+    window_start = db.Column(db.Integer, primary_key=True, autoincrement=False, index=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RateLimitCounter {self.key}@{self.window_start}={self.count}>'
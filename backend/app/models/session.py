@@ -0,0 +1,16 @@
+"""Server-side session records (see app/sessions.py)"""
+from datetime import datetime
+from app import db
+
+class UserSession(db.Model):
+    __tablename__ = 'user_session'
+
+    # SHA-256 of the cookie token; the raw token is never stored
+    token_hash = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, index=True)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<UserSession user={self.user_id} expires={self.expires_at}>'
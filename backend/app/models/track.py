@@ -0,0 +1,44 @@
+"""Shared Spotify track metadata, referenced by notes"""
+from datetime import datetime
+from app import db
+
+class SpotifyTrack(db.Model):
+    __tablename__ = 'spotify_track'
+
+    spotify_track_id = db.Column(db.String(100), primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    artist = db.Column(db.String(255))
+    album = db.Column(db.String(255))
+    preview_url = db.Column(db.String(500))
+    image = db.Column(db.String(500))
+    spotify_url = db.Column(db.String(500))
+    duration_ms = db.Column(db.Integer)
+    # NULL until the metadata has been confirmed by the Spotify API
+    fetched_at = db.Column(db.DateTime, index=True)
+
+    def update_from(self, track):
+        """Copy fields from a SpotifyService track dictionary"""
+        self.name = track.get('name') or self.name
+        self.artist = track.get('artist')
+        self.album = track.get('album')
+        self.preview_url = track.get('preview_url')
+        self.image = track.get('image')
+        self.spotify_url = track.get('spotify_url')
+        self.duration_ms = track.get('duration_ms')
+
+    def is_stale(self, max_age):
+        return self.fetched_at is None or datetime.utcnow() - self.fetched_at > max_age
+
+    def to_dict(self):
+        """Music block in the shape notes have always returned"""
+        return {
+            'name': self.name,
+            'artist': self.artist,
+            'preview_url': self.preview_url,
+            'image': self.image,
+            'spotify_track_id': self.spotify_track_id,
+            'spotify_url': self.spotify_url
+        }
+
+    def __repr__(self):
+        return f'<SpotifyTrack {self.spotify_track_id} {self.name}>'
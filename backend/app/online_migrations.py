@@ -0,0 +1,126 @@
+"""Helpers for migrations on large, busy tables
+
+backfill() fills a column in primary key ranges. Each batch commits on its
+own, and the helper sleeps between batches so application queries and
+replicas keep up. Progress is stored in backfill_progress. An interrupted
+backfill continues after the last finished batch when 'flask db upgrade'
+runs again; a batch cut off halfway may run twice, so the values must be
+idempotent (e.g. derived from other tables).
+
+create_index_online() builds an index without blocking writes:
+MySQL uses ALGORITHM=INPLACE, LOCK=NONE and PostgreSQL uses
+CONCURRENTLY. Adding a nullable column, or one with a constant default,
+is already instant on MySQL 8 and PostgreSQL 11+, so op.add_column is
+fine for that step.
+
+Give the backfill its own revision after the one adding the column.
+Revisions commit one at a time (see migrations/env.py), so a rerun only
+repeats the backfill. Rows written while it runs must already get the new
+value from application code.
+"""
+import time
+from datetime import datetime
+from alembic import op
+from flask import current_app
+from sqlalchemy import func, insert, inspect, select, update
+from app.models.backfill import BackfillProgress
+
+progress = BackfillProgress.__table__
+
+
+def _setting(value, name, default):
+    if value is not None:
+        return value
+    return current_app.config.get(name, default)
+
+
+def backfill(name, table, values, where=None, key='id', batch_size=None, pause=None, throttle=None, log=print):
+    """
+    Update every row of a large table in small committed batches
+
+    Args:
+        name: Unique name for this backfill; progress is recorded under it
+        table: Table or sa.table() construct to update
+        values: Dict of column name to value or SQL expression for the SET clause
+        where: Optional extra condition; rows not matching it are left alone
+        key: Integer primary key column walked in ranges
+        batch_size: Key range per batch (BACKFILL_BATCH_SIZE)
+        pause: Minimum seconds between batches (BACKFILL_PAUSE_SECONDS)
+        throttle: Sleep this multiple of each batch's duration (BACKFILL_THROTTLE_RATIO),
+            so 1.0 keeps the backfill busy at most half of the time
+        log: Callable receiving progress lines
+
+    Returns:
+        int: Rows updated by this run
+    """
+    batch_size = _setting(batch_size, 'BACKFILL_BATCH_SIZE', 5000)
+    pause = _setting(pause, 'BACKFILL_PAUSE_SECONDS', 0.05)
+    throttle = _setting(throttle, 'BACKFILL_THROTTLE_RATIO', 1.0)
+    key_column = table.c[key]
+
+    # Autocommit: every statement below is its own short transaction
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        state = conn.execute(select(progress).where(progress.c.name == name)).first()
+        if state is None:
+            now = datetime.utcnow()
+            conn.execute(insert(progress).values(name=name, last_key=0, rows_updated=0, started_at=now, updated_at=now))
+            last_key = 0
+        elif state.finished_at is not None:
+            log(f'{name}: already finished')
+            return 0
+        else:
+            last_key = state.last_key
+            log(f'{name}: resuming after {key} {last_key}')
+
+        max_key = conn.execute(select(func.max(key_column))).scalar() or 0
+        updated = 0
+        started = reported = time.perf_counter()
+        while last_key < max_key:
+            upper = min(last_key + batch_size, max_key)
+            condition = (key_column > last_key) & (key_column <= upper)
+            if where is not None:
+                condition = condition & where
+
+            batch_started = time.perf_counter()
+            count = conn.execute(update(table).where(condition).values(values)).rowcount
+            conn.execute(update(progress).where(progress.c.name == name).values(
+                last_key=upper, rows_updated=progress.c.rows_updated + count, updated_at=datetime.utcnow()))
+            elapsed = time.perf_counter() - batch_started
+            updated += count
+            last_key = upper
+
+            if time.perf_counter() - reported >= 5:
+                reported = time.perf_counter()
+                log(f'{name}: {key} {last_key}/{max_key} ({last_key / max_key:.0%}), {updated} rows updated')
+            if last_key < max_key:
+                time.sleep(max(pause, elapsed * throttle))
+
+        conn.execute(update(progress).where(progress.c.name == name).values(
+            finished_at=datetime.utcnow(), updated_at=datetime.utcnow()))
+        log(f'{name}: done, {updated} rows updated in {time.perf_counter() - started:.1f}s')
+    return updated
+
+
+def create_index_online(index_name, table_name, columns, unique=False):
+    """
+    Create an index while the table keeps accepting writes where the database allows it
+
+    Does nothing when an index of that name already exists, e.g. in databases
+    built from database/schema.sql or from a rerun after an interruption.
+    """
+    bind = op.get_bind()
+    if index_name in {index['name'] for index in inspect(bind).get_indexes(table_name)}:
+        return
+    dialect = bind.dialect.name
+    if dialect == 'mysql':
+        quote = bind.dialect.identifier_preparer.quote
+        column_list = ', '.join(quote(column) for column in columns)
+        op.execute(f"ALTER TABLE {quote(table_name)} ADD {'UNIQUE ' if unique else ''}INDEX "
+                   f"{quote(index_name)} ({column_list}), ALGORITHM=INPLACE, LOCK=NONE")
+    elif dialect == 'postgresql':
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            op.create_index(index_name, table_name, columns, unique=unique, postgresql_concurrently=True)
+    else:
+        op.create_index(index_name, table_name, columns, unique=unique)
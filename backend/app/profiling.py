@@ -0,0 +1,208 @@
+"""On-demand profiling of a live worker
+
+Two tools, both for operators only:
+
+Sampling profiler
+    A daemon thread snapshots every thread's stack with sys._current_frames()
+    every PROFILER_INTERVAL_MS and counts identical stacks. The result is a
+    collapsed-stack file (one 'frame;frame;frame count' line per stack) that
+    flamegraph.pl, speedscope or inferno render directly. By default only
+    threads that are inside a request are sampled, each under a root frame
+    named after its endpoint, so idle server and background threads do not
+    drown the picture. POST /api/admin/profiler/sample starts a capture and
+    answers at once with its file name, and PROFILER_SIGNAL (e.g. SIGUSR2)
+    does the same from outside. The file appears in PROFILER_OUTPUT_DIR, and
+    under GET /api/admin/profiles/<name>, when sampling ends. With
+    eventlet/gevent only the greenlet currently running on each OS thread is
+    visible.
+
+Per-route deterministic profiling
+    Endpoints listed in PROFILE_ROUTES ({'posts.get_posts': 0.1}) run under
+    cProfile for that fraction of requests carrying an 'X-Profile: 1' header
+    from an admin. The pstats file lands in PROFILER_OUTPUT_DIR and its name
+    is returned in the X-Profile-File header.
+"""
+import cProfile
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+# thread ident -> endpoint of the request it is serving
+_active_requests = {}
+
+
+class ProfilerBusy(Exception):
+    """A sampling session is already running in this process"""
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels = {}   # code object -> frame label
+
+    def sample(self, seconds, interval=0.005, requests_only=True):
+        """
+        Sample stacks for a while on the calling thread and return them in collapsed format
+
+        Args:
+            seconds: How long to sample
+            interval: Seconds between snapshots
+            requests_only: Only sample threads that are serving a request
+
+        Returns:
+            tuple: (collapsed stack text, number of snapshots taken)
+
+        Raises:
+            ProfilerBusy: If another session is running
+        """
+        self._acquire()
+        try:
+            return self._sample(seconds, interval, requests_only)
+        finally:
+            self._lock.release()
+
+    def start(self, path, seconds, interval=0.005, requests_only=True):
+        """
+        Sample on a daemon thread and write the collapsed stacks to path
+
+        Returns at once. The file is written when sampling ends, under a
+        temporary name first, so it never appears half written.
+
+        Raises:
+            ProfilerBusy: If another session is running
+        """
+        self._acquire()
+        try:
+            threading.Thread(target=self._capture, args=(path, seconds, interval, requests_only),
+                             name='profiler', daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+
+    def _acquire(self):
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy('A profiling session is already running')
+
+    def _capture(self, path, seconds, interval, requests_only):
+        try:
+            text, snapshots = self._sample(seconds, interval, requests_only)
+            with open(path + '.part', 'w') as f:
+                f.write(text)
+            os.replace(path + '.part', path)
+            logger.warning(f'Profiler wrote {snapshots} snapshots to {path}')
+        except Exception:
+            logger.exception('Profiler capture failed')
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds, interval, requests_only):
+        stacks = Counter()
+        own = threading.get_ident()
+        snapshots = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = None if requests_only else {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if requests_only:
+                    root = _active_requests.get(ident)
+                    if root is None:
+                        continue
+                else:
+                    root = names.get(ident, f'thread-{ident}')
+                stacks[self._collapse(root, frame)] += 1
+            snapshots += 1
+            time.sleep(interval)
+        lines = [f'{stack} {count}' for stack, count in stacks.most_common()]
+        return '\n'.join(lines) + '\n', snapshots
+
+    def _collapse(self, root, frame):
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = \
+                    f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ':')
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(str(root))
+        return ';'.join(reversed(labels))
+
+
+sampler = SamplingProfiler()
+
+
+def output_dir(app):
+    path = app.config.get('PROFILER_OUTPUT_DIR') or os.path.join(app.instance_path, 'profiles')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def capture_path(app):
+    """Where the next sampling capture of this process goes"""
+    return os.path.join(output_dir(app), f'sample-{os.getpid()}-{int(time.time() * 1000)}.collapsed')
+
+
+def _profiled_view(app, view, endpoint, fraction):
+    from app.auth import is_admin
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.headers.get('X-Profile') != '1' or random.random() >= fraction or not is_admin():
+            return view(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        response = app.make_response(profile.runcall(view, *args, **kwargs))
+        filename = f'{endpoint}-{int(time.time() * 1000)}-{os.getpid()}.prof'
+        profile.dump_stats(os.path.join(output_dir(app), filename))
+        response.headers['X-Profile-File'] = filename
+        return response
+    return wrapper
+
+
+def init_profiling(app):
+    """Track request threads, wrap PROFILE_ROUTES and install the signal handler"""
+
+    @app.before_request
+    def mark_request_thread():
+        _active_requests[threading.get_ident()] = request.endpoint or 'unmatched'
+
+    @app.teardown_request
+    def unmark_request_thread(exc):
+        _active_requests.pop(threading.get_ident(), None)
+
+    # Runs after blueprint registration, so every endpoint exists by now
+    for endpoint, fraction in app.config.get('PROFILE_ROUTES', {}).items():
+        view = app.view_functions.get(endpoint)
+        if view is None:
+            logger.warning(f'PROFILE_ROUTES: unknown endpoint {endpoint}')
+            continue
+        app.view_functions[endpoint] = _profiled_view(app, view, endpoint, fraction)
+
+    signal_name = app.config.get('PROFILER_SIGNAL')
+    if signal_name:
+        seconds = app.config.get('PROFILER_SIGNAL_SECONDS', 30)
+        interval = app.config.get('PROFILER_INTERVAL_MS', 5) / 1000
+
+        def on_signal(signum, frame):
+            try:
+                sampler.start(capture_path(app), seconds, interval)
+            except ProfilerBusy:
+                logger.warning('Profiler signal ignored: a session is already running')
+
+        try:
+            signal.signal(getattr(signal, signal_name), on_signal)
+        except (AttributeError, ValueError) as e:
+            # Unknown signal name, or not running in the main thread
+            logger.warning(f'Profiler signal {signal_name} not installed: {e}')
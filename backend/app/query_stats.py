@@ -0,0 +1,202 @@
+"""Per-request SQL instrumentation and N+1 detection
+
+Cursor execute events on every engine record, for the current request, the
+number of statements, the time spent in the database and how often each
+statement shape ran. A shape is the SQL with literals and bind parameters
+replaced by '?' and IN lists collapsed, so the same query for different IDs
+counts as one shape.
+
+After each request:
+  - a warning is logged for every shape that ran more than
+    QUERY_REPEAT_WARN_THRESHOLD times (the usual N+1 signature, e.g.
+    Post.to_dict() loading each author separately);
+  - Server-Timing and X-Query-Count headers are added when
+    QUERY_STATS_HEADERS is on (by default: when the app runs in debug mode).
+
+Shapes are also aggregated process-wide in query_shapes, with a sample
+statement for each, for tooling such as the index advisor.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s|\?|(?<![:\w]):\w+')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class _FingerprintCache:
+    """Statement text -> shape, since the same statements repeat endlessly"""
+
+    def __init__(self, max_size=5000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, statement):
+        shape = self._entries.get(statement)
+        if shape is None:
+            shape = _normalize(statement)
+            with self._lock:
+                self._entries[statement] = shape
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return shape
+
+
+def _normalize(statement):
+    shape = _STRING_RE.sub('?', statement)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _PARAM_RE.sub('?', shape)
+    shape = _IN_LIST_RE.sub('(?)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+_fingerprints = _FingerprintCache()
+
+
+def fingerprint(statement):
+    """Normalized shape of a SQL statement"""
+    return _fingerprints.get(statement)
+
+
+class RequestQueryStats:
+    __slots__ = ('count', 'seconds', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+
+class QueryShape:
+    __slots__ = ('shape', 'count', 'seconds', 'max_seconds', 'statement', 'parameters', 'endpoints')
+
+    def __init__(self, shape, statement, parameters):
+        self.shape = shape
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.statement = statement
+        self.parameters = parameters
+        self.endpoints = Counter()
+
+
+class QueryShapeRegistry:
+    """Process-wide totals per statement shape, bounded to max_shapes"""
+
+    MAX_ENDPOINTS = 20
+
+    def __init__(self, max_shapes=2000):
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def record(self, shape, statement, parameters, seconds, endpoint):
+        entry = self._shapes.get(shape)
+        if entry is None:
+            if len(self._shapes) >= self.max_shapes:
+                return
+            # Keep a sample only for reads; write parameters may carry secrets
+            sample = parameters if statement.lstrip()[:6].upper() == 'SELECT' else None
+            with self._lock:
+                entry = self._shapes.setdefault(shape, QueryShape(shape, statement, sample))
+        with self._lock:
+            entry.count += 1
+            entry.seconds += seconds
+            entry.max_seconds = max(entry.max_seconds, seconds)
+            if endpoint and (endpoint in entry.endpoints or len(entry.endpoints) < self.MAX_ENDPOINTS):
+                entry.endpoints[endpoint] += 1
+
+    def top(self, limit=50, key='seconds'):
+        """
+        Shapes ordered by total time (or another QueryShape attribute)
+
+        Returns:
+            list: QueryShape objects, largest first
+        """
+        with self._lock:
+            shapes = list(self._shapes.values())
+        return sorted(shapes, key=lambda s: getattr(s, key), reverse=True)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+query_shapes = QueryShapeRegistry()
+
+
+def get_request_query_stats():
+    """Query stats of the current request (None outside a request)"""
+    if not has_request_context():
+        return None
+    stats = g.get('_query_stats')
+    if stats is None:
+        stats = g._query_stats = RequestQueryStats()
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, not conn.info: a statement that raises never
+    # reaches after_cursor_execute, and its start time must not outlive it
+    if context is not None:
+        context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_stats_start', None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    shape = fingerprint(statement)
+
+    stats = get_request_query_stats()
+    endpoint = None
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += seconds
+        stats.shapes[shape] += 1
+        endpoint = request.endpoint
+    query_shapes.record(shape, statement, parameters, seconds, endpoint)
+
+
+_listening = False
+
+
+def init_query_stats(app):
+    """Install the engine hooks (once per process) and the per-request report"""
+    global _listening
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get('_query_stats')
+        if stats is None:
+            return response
+
+        threshold = app.config.get('QUERY_REPEAT_WARN_THRESHOLD', 10)
+        for shape, count in stats.shapes.items():
+            if count > threshold:
+                logger.warning(f"Possible N+1: statement ran {count} times in "
+                               f"{request.method} {request.path}: {shape[:300]}")
+
+        show_headers = app.config.get('QUERY_STATS_HEADERS')
+        if show_headers if show_headers is not None else app.debug:
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers.add('Server-Timing', f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"')
+        return response
@@ -0,0 +1,223 @@
+"""Sliding-window rate limiting configured per endpoint or blueprint
+
+RATE_LIMITS maps an endpoint ('auth.login') or a whole blueprint ('auth')
+to a limit per scope, e.g.
+
+    RATE_LIMITS = {
+        'auth.login': {'ip': '30/minute', 'username': '10/minute'},
+    }
+
+An endpoint entry takes precedence over its blueprint's. The 'ip' scope
+counts per client address; 'username' counts per username in the JSON body,
+so a credential-stuffing run spread over many addresses is still caught.
+
+Each key keeps two integers: the counts of the current and the previous
+fixed window. The previous count is weighted by how much of it still
+overlaps the sliding window, which approximates a true sliding log without
+storing timestamps. RATELIMIT_STORAGE selects where the counts live:
+    'memory'      per process, at most RATELIMIT_MAX_KEYS keys (LRU eviction)
+    'sqlalchemy'  the rate_limit_counter table, shared by every worker
+Requests over a limit get 429 with a Retry-After header.
+
+Scope values longer than MAX_VALUE_LENGTH (a username is whatever the client
+posts) are replaced by their SHA-256, so keys fit the 255-character column.
+The 'ip' scope uses request.remote_addr; behind a reverse proxy set
+TRUSTED_PROXIES so it is the client's address rather than the proxy's.
+"""
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from flask import jsonify, request
+from sqlalchemy import delete, insert, select, update
+from app import db
+
+Limit = namedtuple('Limit', ['amount', 'window'])
+
+# Longer scope values are hashed to keep keys short
+MAX_VALUE_LENGTH = 64
+
+_UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_LIMIT_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d+)?\s*(second|minute|hour|day)s?\s*$')
+
+
+def parse_limit(text):
+    """
+    Parse a limit such as '10/minute' or '100/15 minutes'
+
+    Raises:
+        ValueError: If the text is not a valid limit
+    """
+    match = _LIMIT_RE.match(text)
+    if not match:
+        raise ValueError(f'Invalid rate limit: {text!r}')
+    amount, multiplier, unit = match.groups()
+    return Limit(int(amount), int(multiplier or 1) * _UNITS[unit])
+
+
+class MemoryRateLimitBackend:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()   # key -> [window_start, previous, current]
+        self._lock = threading.Lock()
+
+    def hit(self, key, window_start, window):
+        """
+        Count one request and return the window counts
+
+        Returns:
+            tuple: (previous window count, current window count)
+        """
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                entry = self._counters[key] = [window_start, 0, 0]
+                # Evicting the least recently seen key only forgets an idle client
+                while len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+
+            if entry[0] != window_start:
+                entry[1] = entry[2] if window_start - entry[0] == window else 0
+                entry[0], entry[2] = window_start, 0
+            entry[2] += 1
+            return entry[1], entry[2]
+
+
+class SqlRateLimitBackend:
+    """Counts in the rate_limit_counter table, one row per key and window"""
+
+    # Chance per hit of deleting counters older than any window can reach back
+    PURGE_PROBABILITY = 0.001
+
+    def __init__(self):
+        from app.models.rate_limit import RateLimitCounter
+        self.table = RateLimitCounter.__table__
+
+    def hit(self, key, window_start, window):
+        t = self.table
+        with db.engine.begin() as conn:
+            self._increment(conn, key, window_start)
+            counts = dict(conn.execute(
+                select(t.c.window_start, t.c.count)
+                .where(t.c.key == key, t.c.window_start.in_([window_start - window, window_start]))
+            ).all())
+            if random.random() < self.PURGE_PROBABILITY:
+                conn.execute(delete(t).where(t.c.window_start < window_start - 2 * _UNITS['day']))
+        return counts.get(window_start - window, 0), counts.get(window_start, 1)
+
+    def _increment(self, conn, key, window_start):
+        t = self.table
+        dialect = conn.dialect.name
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(t).values(key=key, window_start=window_start, count=1)
+            conn.execute(stmt.on_duplicate_key_update(count=t.c.count + 1))
+        elif dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as upsert_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert_insert
+            stmt = upsert_insert(t).values(key=key, window_start=window_start, count=1)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[t.c.key, t.c.window_start], set_={'count': t.c.count + 1}))
+        else:
+            result = conn.execute(update(t).where(t.c.key == key, t.c.window_start == window_start)
+                                  .values(count=t.c.count + 1))
+            if result.rowcount == 0:
+                conn.execute(insert(t).values(key=key, window_start=window_start, count=1))
+
+
+class RateLimiter:
+    def __init__(self, backend, rules):
+        self.backend = backend
+        self.rules = {
+            name: [(scope, parse_limit(text)) for scope, text in scopes.items()]
+            for name, scopes in rules.items()
+        }
+        self.limited = 0
+
+    def rules_for(self, endpoint, blueprint):
+        """(rule name, [(scope, Limit)]) for a request, endpoint rules first"""
+        if endpoint in self.rules:
+            return endpoint, self.rules[endpoint]
+        if blueprint in self.rules:
+            return blueprint, self.rules[blueprint]
+        return None, None
+
+    def hit(self, rule, scope, value, limit, now=None):
+        """
+        Count a request against one limit
+
+        Returns:
+            int: 0 if allowed, else seconds until a request would be allowed
+        """
+        now = time.time() if now is None else now
+        window = limit.window
+        window_start = int(now) - int(now) % window
+        if len(value) > MAX_VALUE_LENGTH:
+            value = 'sha256:' + hashlib.sha256(value.encode('utf-8')).hexdigest()
+        previous, current = self.backend.hit(f'{rule}:{scope}:{value}', window_start, window)
+
+        elapsed = now - window_start
+        if previous * (1 - elapsed / window) + current <= limit.amount:
+            return 0
+
+        # Earliest time another request fits: within this window once the
+        # previous window's weight has decayed enough, else in the next one
+        room = limit.amount - current - 1
+        if room >= 0 and previous:
+            wait = window * (1 - room / previous) - elapsed
+        else:
+            wait = window - elapsed + window * max(0.0, 1 - (limit.amount - 1) / current)
+        return max(1, math.ceil(wait))
+
+
+def _scope_value(scope):
+    if scope == 'ip':
+        return request.remote_addr
+    if scope == 'username':
+        data = request.get_json(silent=True)
+        username = data.get('username') if isinstance(data, dict) else None
+        return username.strip().lower() if isinstance(username, str) and username.strip() else None
+    raise ValueError(f'Unknown rate limit scope: {scope!r}')
+
+
+def init_rate_limiter(app):
+    """Enforce RATE_LIMITS on every request through a before_request hook"""
+    if not app.config.get('RATELIMIT_ENABLED', True) or not app.config.get('RATE_LIMITS'):
+        return
+
+    if app.config.get('RATELIMIT_STORAGE', 'memory') == 'sqlalchemy':
+        backend = SqlRateLimitBackend()
+    else:
+        backend = MemoryRateLimitBackend(app.config.get('RATELIMIT_MAX_KEYS', 100000))
+    limiter = app.extensions['rate_limiter'] = RateLimiter(backend, app.config['RATE_LIMITS'])
+
+    @app.before_request
+    def enforce_rate_limits():
+        if request.method == 'OPTIONS':
+            return None
+        rule, limits = limiter.rules_for(request.endpoint, request.blueprint)
+        if not limits:
+            return None
+
+        now = time.time()
+        retry_after = 0
+        for scope, limit in limits:
+            value = _scope_value(scope)
+            if value is not None:
+                retry_after = max(retry_after, limiter.hit(rule, scope, value, limit, now))
+        if not retry_after:
+            return None
+
+        limiter.limited += 1
+        # Auth pages read 'message', the rest of the frontend reads 'error'
+        error = 'Too many attempts, please try again later'
+        response = jsonify({'error': error, 'message': error})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
@@ -0,0 +1,127 @@
+"""Connection pool options and read replica routing
+
+configure_engines() runs before db.init_app. It adapts the pool options in
+SQLALCHEMY_ENGINE_OPTIONS to each database, since in-memory SQLite takes no
+queue pool sizes. It also registers every URL in DATABASE_REPLICA_URLS as a
+bind named replica1, replica2, ... with the same options.
+
+RoutingSession (the db.session class) sends a statement to a replica only
+when all of these hold:
+  - the request is a GET or HEAD to an endpoint outside REPLICA_EXCLUDED_ENDPOINTS
+  - the client has not written in the last REPLICA_STICKY_SECONDS (a short
+    cookie set after every write request), so users always read their writes
+  - nothing has been written in this request yet
+  - the statement is a plain read, not a flush, DML or SELECT ... FOR UPDATE
+Everything else uses the primary. That includes CLI commands, background
+threads and Socket.IO handlers, which do not run before_request. Sessions
+and rate limit counters go through db.engine, so they also stay on the
+primary.
+"""
+import random
+import time
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+# Only understood by QueuePool; in-memory SQLite uses StaticPool
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+READ_METHODS = frozenset(('GET', 'HEAD'))
+
+
+def _engine_options(url, options, connect_timeout=None):
+    options = dict(options)
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            for key in QUEUE_POOL_OPTIONS:
+                options.pop(key, None)
+    elif connect_timeout:
+        options['connect_args'] = {'connect_timeout': int(connect_timeout), **options.get('connect_args', {})}
+    return options
+
+
+def configure_engines(app):
+    """Finish the engine configuration; must run before db.init_app"""
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    timeout = app.config.get('DB_CONNECT_TIMEOUT')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], options, timeout)
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    replica_keys = []
+    for number, url in enumerate(app.config.get('DATABASE_REPLICA_URLS') or [], 1):
+        key = f'replica{number}'
+        binds[key] = {'url': url, **_engine_options(url, options, timeout)}
+        replica_keys.append(key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.config['REPLICA_BIND_KEYS'] = replica_keys
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from the replica chosen for this request"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            replica = g.get('_db_replica')
+            if replica is not None:
+                if self._flushing or (clause is not None and (
+                        clause.is_dml or getattr(clause, '_for_update_arg', None) is not None)):
+                    # Read-your-writes: the rest of this request stays on the primary
+                    g._db_replica = None
+                    g._db_wrote = True
+                else:
+                    return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Per-request choice between the primary and a replica"""
+
+    def __init__(self, bind_keys, sticky_seconds=5, excluded_endpoints=(), cookie_name='aurachat_primary'):
+        self.bind_keys = list(bind_keys)
+        self.sticky_seconds = sticky_seconds
+        self.excluded_endpoints = set(excluded_endpoints)
+        self.cookie_name = cookie_name
+        self.replica_requests = 0
+        self.primary_requests = 0
+
+    def _wrote_recently(self):
+        try:
+            return float(request.cookies.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def before_request(self):
+        if request.endpoint is None or request.method == 'OPTIONS':
+            return
+        if (request.method in READ_METHODS and request.endpoint not in self.excluded_endpoints
+                and not self._wrote_recently()):
+            g._db_replica = random.choice(self.bind_keys)
+            self.replica_requests += 1
+        else:
+            self.primary_requests += 1
+
+    def after_request(self, response):
+        if request.endpoint is None or request.method == 'OPTIONS':
+            return response
+        if request.method not in READ_METHODS or g.get('_db_wrote'):
+            response.set_cookie(self.cookie_name, str(int(time.time() + self.sticky_seconds)),
+                                max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+def init_replica_routing(app):
+    """Route read-only requests to replicas when any are configured"""
+    bind_keys = app.config.get('REPLICA_BIND_KEYS') or []
+    if not bind_keys:
+        return None
+
+    router = ReplicaRouter(
+        bind_keys,
+        sticky_seconds=app.config.get('REPLICA_STICKY_SECONDS', 5),
+        excluded_endpoints=app.config.get('REPLICA_EXCLUDED_ENDPOINTS', ()),
+        cookie_name=app.config.get('REPLICA_STICKY_COOKIE', 'aurachat_primary'))
+    app.extensions['replica_router'] = router
+    app.before_request(router.before_request)
+    app.after_request(router.after_request)
+    return router
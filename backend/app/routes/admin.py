@@ -0,0 +1,81 @@
+from flask import Blueprint, Response, current_app, jsonify, request, send_from_directory
+from app.auth import admin_required
+from app import db
+from app.profiling import sampler, output_dir, capture_path, ProfilerBusy
+from app.query_stats import query_shapes
+import os
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/admin/profiler/sample', methods=['POST'])
+@admin_required
+def sample_profile():
+    """Start sampling request threads for ?seconds=; the collapsed-stack file follows under /admin/profiles"""
+    try:
+        max_seconds = current_app.config.get('PROFILER_MAX_SECONDS', 60)
+        seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), max_seconds)
+        interval_ms = request.args.get('interval_ms', current_app.config.get('PROFILER_INTERVAL_MS', 5), type=float)
+        requests_only = request.args.get('all_threads', 'false').lower() != 'true'
+
+        # Sampled on the profiler thread, so this worker is free for the requests being profiled
+        path = capture_path(current_app)
+        sampler.start(path, seconds, max(interval_ms, 1) / 1000, requests_only)
+        filename = os.path.basename(path)
+
+        return jsonify({
+            'file': filename,
+            'seconds': seconds,
+            'url': f'/api/admin/profiles/{filename}'
+        }), 202
+
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """Captures written by the profiler signal and per-route profiling"""
+    try:
+        directory = output_dir(current_app)
+        files = []
+        for name in sorted(os.listdir(directory), reverse=True):
+            if name.endswith('.part'):
+                continue
+            stat = os.stat(os.path.join(directory, name))
+            files.append({'name': name, 'size': stat.st_size, 'modified': int(stat.st_mtime)})
+
+        return jsonify({'profiles': files}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@admin_bp.route('/admin/profiles/<path:filename>', methods=['GET'])
+@admin_required
+def download_profile(filename):
+    """Download one capture (.collapsed text or .prof pstats)"""
+    return send_from_directory(output_dir(current_app), filename, as_attachment=True)
+
+
+@admin_bp.route('/admin/index-advisor', methods=['GET'])
+@admin_required
+def index_advisor():
+    """EXPLAIN the heaviest query shapes this process has seen and report index problems"""
+    try:
+        from app.index_advisor import advise, format_report
+
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        report = advise(query_shapes.top(limit), db.engine, limit)
+
+        if request.args.get('format') == 'text':
+            return Response(format_report(report), mimetype='text/plain')
+        return jsonify(report), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,23 +1,19 @@
 from flask import Blueprint, request, jsonify, session
-from functools import wraps
 from app import db
 from app.models import User
+from app.auth import login_required, get_current_user_id, get_current_user as load_current_user
+from app.sessions import revoke_user_sessions
+from app.services.passwords import PasswordHasherBusy
+from app.fieldsets import requested_fields
 import re
 
 auth_bp = Blueprint('auth', __name__)
 
-# Login required decorator (replaces @jwt_required)
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Login required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
 
-# Helper to get current user id
-def get_current_user_id():
-    return session.get('user_id')
+def hasher_busy_response(key='message'):
+    response = jsonify({key: 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 
 @auth_bp.route('/auth/register', methods=['POST'])
@@ -79,6 +75,9 @@ def register():
         
     except ValueError as e:
         return jsonify({'message': str(e)}), 400
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Registration failed: {str(e)}'}), 500
@@ -97,6 +96,15 @@ def login():
         user = User.query.filter_by(username=data['username']).first()
         
         if user and user.check_password(data['password']):
+            # Upgrade hashes made with an older method or cost; this is only
+            # opportunistic, so a busy hasher skips it until the next login
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(data['password'])
+                    db.session.commit()
+                except PasswordHasherBusy:
+                    db.session.rollback()
+            
             # Store user_id in session
             session['user_id'] = user.id
             session.permanent = True
@@ -108,6 +116,9 @@ def login():
         else:
             return jsonify({'message': 'Invalid username or password'}), 401
             
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         return jsonify({'message': f'Login failed: {str(e)}'}), 500
 
@@ -117,13 +128,12 @@ def login():
 def get_current_user():
     """Get current user information"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = load_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()}), 200
+        return jsonify({'user': user.to_dict(fields=requested_fields(primary=True))}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -139,18 +149,32 @@ def logout():
         return jsonify({'error': str(e)}), 500
 
 
+@auth_bp.route('/auth/logout-all', methods=['POST'])
+@login_required
+def logout_all():
+    """Log out of every device, including this one"""
+    try:
+        revoked = revoke_user_sessions(get_current_user_id())
+        session.clear()
+        return jsonify({
+            'message': 'Logged out of all devices',
+            'revoked_sessions': revoked
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @auth_bp.route('/auth/change-password', methods=['POST'])
 @login_required
 def change_password():
     """Change user password"""
     try:
-        user_id = get_current_user_id()
         data = request.get_json()
         
         if not data.get('current_password') or not data.get('new_password'):
             return jsonify({'error': 'Current password and new password are required'}), 400
         
-        user = User.query.get(user_id)
+        user = load_current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -166,10 +190,19 @@ def change_password():
         user.set_password(data['new_password'])
         db.session.commit()
         
-        return jsonify({'message': 'Password changed successfully'}), 200
+        # Sign out every other device
+        revoked = revoke_user_sessions(user.id, keep_current=True)
+        
+        return jsonify({
+            'message': 'Password changed successfully',
+            'revoked_sessions': revoked
+        }), 200
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return hasher_busy_response('error')
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Password change failed: {str(e)}'}), 500
\ No newline at end of file
@@ -1,30 +1,19 @@
-from flask import Blueprint, request, jsonify, session
-from functools import wraps
+from flask import Blueprint, request, jsonify
 from app import db
 from app.models import User, Message
 from datetime import datetime
+from app.auth import login_required, get_current_user_id, get_identity
+from app.services.message_search import message_search_index
 
 messages_bp = Blueprint('messages', __name__)
 
-# Login required decorator
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-def get_current_user_id():
-    return session.get('user_id')
-
 @messages_bp.route('/messages/conversations', methods=['GET'])
 @login_required
 def get_conversations():
     """Get all conversations for the current user"""
     try:
         user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_identity()
 
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -58,7 +47,7 @@ def get_conversations():
                 ).count()
 
                 conversations.append({
-                    'user': other_user.to_dict(),
+                    'user': other_user.to_shared_dict(),
                     'latest_message': latest_message.to_dict() if latest_message else None,
                     'unread_count': unread_count
                 })
@@ -71,13 +60,44 @@ def get_conversations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@messages_bp.route('/messages/search', methods=['GET'])
+@login_required
+def search_messages():
+    """Search the message history with one user (IDs and snippets only)"""
+    try:
+        current_user_id = get_current_user_id()
+        query = request.args.get('q', '').strip()
+        other_user_id = request.args.get('with', type=int)
+
+        if not other_user_id:
+            return jsonify({'error': 'Query parameter "with" is required'}), 400
+
+        if not query:
+            return jsonify({'results': [], 'next_cursor': None}), 200
+
+        cursor = request.args.get('cursor', type=int)
+        limit = min(request.args.get('limit', 20, type=int), 50)
+
+        results, next_cursor = message_search_index.search(
+            current_user_id, other_user_id, query, cursor=cursor, limit=limit
+        )
+
+        return jsonify({
+            'results': results,
+            'query': query,
+            'next_cursor': next_cursor
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @messages_bp.route('/messages/<int:user_id>', methods=['GET'])
 @login_required
 def get_messages(user_id):
     """Get all messages between current user and specified user"""
     try:
         current_user_id = get_current_user_id()
-        current_user = User.query.get(current_user_id)
+        current_user = get_identity()
         other_user = User.query.get(user_id)
 
         if not current_user or not other_user:
@@ -99,7 +119,7 @@ def get_messages(user_id):
 
         return jsonify({
             'messages': [message.to_dict() for message in messages],
-            'other_user': other_user.to_dict()
+            'other_user': other_user.to_shared_dict()
         }), 200
 
     except Exception as e:
@@ -112,7 +132,7 @@ def send_message():
     """Send a message to another user"""
     try:
         current_user_id = get_current_user_id()
-        current_user = User.query.get(current_user_id)
+        current_user = get_identity()
 
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
@@ -128,7 +148,7 @@ def send_message():
         if not content:
             return jsonify({'error': 'Message content cannot be empty'}), 400
 
-        receiver = User.query.get(receiver_id)
+        receiver = get_identity(receiver_id)
         if not receiver:
             return jsonify({'error': 'Receiver not found'}), 404
 
@@ -1,20 +1,13 @@
 """Routes for Instagram-style Notes with Spotify music"""
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify
 from datetime import datetime
 from app import db
 from app.models.note import Note
-from app.services.spotify_service import SpotifyService
+from app.services.track_store import TrackStore
+from app.auth import login_required, get_current_user_id
 
 notes_bp = Blueprint('notes', __name__)
 
-def login_required_check():
-    """Check if user is logged in"""
-    return 'user_id' in session
-
-def get_current_user_id():
-    """Get current user ID from session"""
-    return session.get('user_id')
-
 @notes_bp.route('/api/notes', methods=['GET'])
 def get_notes():
     """Get all active notes (not expired)"""
@@ -25,7 +18,10 @@ def get_notes():
         # Get active notes
         notes = Note.query.filter(
             Note.expires_at > datetime.utcnow()
-        ).order_by(Note.created_at.desc()).all()
+        ).options(db.joinedload(Note.track)).order_by(Note.created_at.desc()).all()
+        
+        # Refresh outdated shared track metadata without delaying the response
+        TrackStore.refresh_stale(note.track for note in notes)
         
         return jsonify({
             'notes': [note.to_dict() for note in notes]
@@ -35,11 +31,9 @@ def get_notes():
         return jsonify({'error': str(e)}), 500
 
 @notes_bp.route('/api/notes', methods=['POST'])
+@login_required
 def create_note():
     """Create a new note with optional music"""
-    if not login_required_check():
-        return jsonify({'error': 'Authentication required'}), 401
-    
     try:
         data = request.json
         user_id = get_current_user_id()
@@ -49,21 +43,31 @@ def create_note():
         if old_note:
             db.session.delete(old_note)
         
+        # Music metadata lives in the shared track record, not on the note
+        track = None
+        track_id = data.get('spotify_track_id')
+        if track_id:
+            track = TrackStore.get_or_create(track_id, fallback={
+                'name': data.get('music_name'),
+                'artist': data.get('music_artist'),
+                'preview_url': data.get('music_preview_url'),
+                'image': data.get('music_image'),
+                'spotify_url': data.get('spotify_url')
+            })
+        
         # Create new note
         new_note = Note(
             user_id=user_id,
             content=data.get('content'),
-            music_name=data.get('music_name'),
-            music_artist=data.get('music_artist'),
-            music_preview_url=data.get('music_preview_url'),
-            music_image=data.get('music_image'),
-            spotify_track_id=data.get('spotify_track_id'),
-            spotify_url=data.get('spotify_url')
+            spotify_track_id=track_id if track else None
         )
         
         db.session.add(new_note)
         db.session.commit()
         
+        if track:
+            TrackStore.refresh_stale([track])
+        
         return jsonify({
             'message': 'Note created successfully',
             'note': new_note.to_dict()
@@ -74,11 +78,9 @@ def create_note():
         return jsonify({'error': str(e)}), 500
 
 @notes_bp.route('/api/notes/<int:note_id>', methods=['DELETE'])
+@login_required
 def delete_note(note_id):
     """Delete a note"""
-    if not login_required_check():
-        return jsonify({'error': 'Authentication required'}), 401
-    
     try:
         note = Note.query.get_or_404(note_id)
         user_id = get_current_user_id()
@@ -106,6 +108,7 @@ def search_music():
         if not query:
             return jsonify({'tracks': []}), 200
         
+        from app.services.spotify_service import SpotifyService
         tracks = SpotifyService.search_tracks(query, limit)
         
         return jsonify({'tracks': tracks}), 200
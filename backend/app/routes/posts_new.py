@@ -1,27 +1,17 @@
-from flask import Blueprint, request, jsonify, session, current_app
-from functools import wraps
+from flask import Blueprint, request, jsonify, current_app
 from app import db
-from app.models import Post, User, Like, Comment
-from datetime import datetime
+from app.models import Post, User, Comment, PostImpressionHourly
+from datetime import datetime, timedelta
 import os
 import time
 import base64
 from werkzeug.utils import secure_filename
+from app.auth import login_required, get_current_user_id, get_current_user, get_identity
+from app.services import likes
+from app.services.impressions import impressions, current_hour
 
 posts_bp = Blueprint('posts', __name__)
 
-# Login required decorator
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Login required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-def get_current_user_id():
-    return session.get('user_id')
-
 
 @posts_bp.route('/posts', methods=['GET'])
 @login_required
@@ -29,7 +19,7 @@ def get_posts():
     """Get all posts (feed)"""
     try:
         user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -55,7 +45,7 @@ def get_posts():
         for post in posts:
             post_dict = post.to_dict()
             post_dict['is_liked'] = post.is_liked_by(user)
-            post_dict['author'] = post.author.to_dict()  # Include full author info
+            post_dict['author'] = post.author.to_shared_dict()  # Author summary (fields[user]= for more)
             
             # Include comments in feed
             comments = Comment.query.filter_by(post_id=post.id)\
@@ -66,6 +56,9 @@ def get_posts():
             
             posts_data.append(post_dict)
         
+        # Impressions of other people's posts, counted off the request path
+        impressions.record([post.id for post in posts if post.user_id != user_id])
+        
         return jsonify({'posts': posts_data}), 200
         
     except Exception as e:
@@ -78,7 +71,7 @@ def create_post():
     """Create a new post"""
     try:
         user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_identity()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -144,8 +137,7 @@ def create_post():
 def get_post(post_id):
     """Get a specific post"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_identity()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -197,42 +189,79 @@ def delete_post(post_id):
 def like_post(post_id):
     """Like or unlike a post"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
-        post = Post.query.get(post_id)
+        like_count, is_liked = likes.toggle(get_current_user_id(), post_id)
+        return jsonify({
+            'message': 'Post liked' if is_liked else 'Post unliked',
+            'is_liked': is_liked,
+            'likes_count': like_count
+        }), 200
         
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+    except likes.PostNotFound:
+        return jsonify({'error': 'Post not found'}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to like/unlike post: {str(e)}'}), 500
+
+
+@posts_bp.route('/posts/<int:post_id>/like', methods=['PUT'])
+@login_required
+def put_like(post_id):
+    """Like a post; liking it again changes nothing"""
+    try:
+        like_count, _ = likes.like(get_current_user_id(), post_id)
+        return jsonify({'is_liked': True, 'likes_count': like_count}), 200
+        
+    except likes.PostNotFound:
+        return jsonify({'error': 'Post not found'}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to like post: {str(e)}'}), 500
+
+
+@posts_bp.route('/posts/<int:post_id>/like', methods=['DELETE'])
+@login_required
+def delete_like(post_id):
+    """Remove a like; removing it again changes nothing"""
+    try:
+        like_count, _ = likes.unlike(get_current_user_id(), post_id)
+        return jsonify({'is_liked': False, 'likes_count': like_count}), 200
+        
+    except likes.PostNotFound:
+        return jsonify({'error': 'Post not found'}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to unlike post: {str(e)}'}), 500
+
+
+@posts_bp.route('/posts/<int:post_id>/stats', methods=['GET'])
+@login_required
+def get_post_stats(post_id):
+    """Engagement counters and hourly impressions for the last ?hours= (default 24, max 168)"""
+    try:
+        post = Post.query.get(post_id)
         
         if not post:
             return jsonify({'error': 'Post not found'}), 404
         
-        # Check if already liked
-        existing_like = Like.query.filter_by(user_id=user_id, post_id=post_id).first()
-        
-        if existing_like:
-            # Unlike the post
-            db.session.delete(existing_like)
-            db.session.commit()
-            return jsonify({
-                'message': 'Post unliked', 
-                'is_liked': False,
-                'likes_count': post.get_like_count()
-            }), 200
-        else:
-            # Like the post
-            like = Like(user_id=user_id, post_id=post_id)
-            db.session.add(like)
-            db.session.commit()
-            return jsonify({
-                'message': 'Post liked', 
-                'is_liked': True,
-                'likes_count': post.get_like_count()
-            }), 200
+        hours = min(max(request.args.get('hours', 24, type=int), 1), 168)
+        since = current_hour() - timedelta(hours=hours - 1)
+        
+        total = db.session.query(db.func.coalesce(db.func.sum(PostImpressionHourly.impressions), 0))\
+                          .filter(PostImpressionHourly.post_id == post_id).scalar()
+        hourly = PostImpressionHourly.query.filter(PostImpressionHourly.post_id == post_id,
+                                                   PostImpressionHourly.hour >= since)\
+                                           .order_by(PostImpressionHourly.hour.asc()).all()
+        
+        return jsonify({
+            'post_id': post_id,
+            'impressions': int(total),
+            'likes': post.get_like_count(),
+            'comments': post.get_comment_count(),
+            'hourly': [row.to_dict() for row in hourly]
+        }), 200
         
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': f'Failed to like/unlike post: {str(e)}'}), 500
+        return jsonify({'error': str(e)}), 500
 
 
 @posts_bp.route('/posts/<int:post_id>/comments', methods=['POST'])
@@ -241,7 +270,7 @@ def add_comment(post_id):
     """Add a comment to a post"""
     try:
         user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_identity()
         post = Post.query.get(post_id)
         
         if not user:
@@ -309,14 +338,13 @@ def delete_comment(post_id, comment_id):
 def get_user_posts(user_id):
     """Get posts from a specific user"""
     try:
-        current_user_id = get_current_user_id()
         target_user = User.query.get(user_id)
         
         if not target_user:
             return jsonify({'error': 'User not found'}), 404
         
         # No privacy check - all profiles are public
-        current_user = User.query.get(current_user_id)
+        current_user = get_identity()
         posts = Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()).all()
         
         # Convert posts to dict and add like status for current user
@@ -324,7 +352,7 @@ def get_user_posts(user_id):
         for post in posts:
             post_dict = post.to_dict()
             post_dict['is_liked'] = post.is_liked_by(current_user)
-            post_dict['author'] = target_user.to_dict()  # Include full author info
+            post_dict['author'] = target_user.to_shared_dict()  # Author summary (fields[user]= for more)
             posts_data.append(post_dict)
         
         return jsonify({'posts': posts_data}), 200
@@ -1,39 +1,27 @@
-from flask import Blueprint, request, jsonify, session, current_app
-from functools import wraps
+from flask import Blueprint, request, jsonify, current_app
 from app import db
 from app.models import User
 from datetime import datetime
 import os
 import time
 from werkzeug.utils import secure_filename
+from app.auth import login_required, get_current_user
+from app.fieldsets import requested_fields
 
 profile_bp = Blueprint('profile', __name__)
 
-# Login required decorator
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Login required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-def get_current_user_id():
-    return session.get('user_id')
-
 
 @profile_bp.route('/profile', methods=['GET'])
 @login_required
 def get_profile():
     """Get current user's profile - data from user table only"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify(user.to_dict()), 200
+        return jsonify(user.to_dict(fields=requested_fields(primary=True))), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -44,8 +32,7 @@ def get_profile():
 def update_profile():
     """Update user profile - updates user table only"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -79,8 +66,7 @@ def update_profile():
 def update_theme():
     """Update user's theme preference"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -109,8 +95,7 @@ def update_theme():
 def get_settings():
     """Get user settings from user table"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -131,8 +116,7 @@ def get_settings():
 def update_settings():
     """Update user settings in user table"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -161,8 +145,7 @@ def update_settings():
 def update_comprehensive_profile():
     """Update user profile - all customizable fields in user table"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -220,13 +203,12 @@ def update_comprehensive_profile():
 def get_detailed_profile():
     """Get user profile with all fields from user table"""
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify(user.to_dict()), 200
+        return jsonify(user.to_dict(fields=requested_fields(primary=True))), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -238,8 +220,7 @@ def upload_avatar():
     """Upload avatar image file and store as base64 data-URI in profile_pic column."""
     import traceback
     try:
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
+        user = get_current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
@@ -0,0 +1,47 @@
+"""Search routes for AuraChat"""
+from flask import Blueprint, request, jsonify
+from app.auth import login_required, get_identity
+from app.services.post_search import search_visible_posts
+
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('/search/posts', methods=['GET'])
+@login_required
+def search_posts():
+    """
+    Full-text search over post and comment content
+    
+    Query params:
+        - q: Search text (required)
+        - cursor: next_cursor from the previous page
+        - limit: Page size (default: 20, max: 50)
+    """
+    try:
+        user = get_identity()
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'posts': [], 'next_cursor': None}), 200
+        
+        cursor = request.args.get('cursor', type=int)
+        limit = min(request.args.get('limit', 20, type=int), 50)
+        
+        posts, next_cursor = search_visible_posts(query, user, cursor=cursor, limit=limit)
+        
+        posts_data = []
+        for post in posts:
+            post_dict = post.to_dict(current_user=user)
+            post_dict['author'] = post.author.to_shared_dict()
+            posts_data.append(post_dict)
+        
+        return jsonify({
+            'posts': posts_data,
+            'query': query,
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
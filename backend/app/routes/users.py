@@ -1,38 +1,35 @@
-from flask import Blueprint, request, jsonify, session
-from functools import wraps
+from flask import Blueprint, request, jsonify
 from app import db
 from app.models import User, Post, Follow, Comment
+from app.models.models import USER_TIERS
 from sqlalchemy import func
+from app.auth import login_required, get_current_user_id, get_current_user
+from app.services.user_search import ViewerFollows, user_search_index
+from app.fieldsets import requested_fields
 
 users_bp = Blueprint('users', __name__)
 
-# Login required decorator
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Login required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-def get_current_user_id():
-    return session.get('user_id')
+# Profile page counts; follows come from Follow, which /users/<username>/follow writes
+PROFILE_COUNTS = {
+    'followers_count': lambda user: Follow.query.filter_by(following_id=user.id).count(),
+    'following_count': lambda user: Follow.query.filter_by(follower_id=user.id).count(),
+    'posts_count': lambda user: Post.query.filter_by(user_id=user.id).count(),
+}
+PROFILE_COUNT_FIELDS = frozenset(('followers', 'following', 'posts'))
 
 
 @users_bp.route('/profile', methods=['GET'])
 @login_required
 def get_current_user_profile():
     try:
-        user_id = get_current_user_id()
-        
-        if not user_id:
+        if not get_current_user_id():
             return jsonify({'error': 'Invalid session'}), 401
         
-        user = User.query.get(user_id)
+        user = get_current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()}), 200
+        return jsonify({'user': user.to_dict(fields=requested_fields(primary=True))}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -42,8 +39,9 @@ def get_current_user_profile():
 @login_required
 def update_profile():
     try:
-        user_id = get_current_user_id()
-        user = User.query.get_or_404(user_id)
+        user = get_current_user()
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
         data = request.get_json()
         
         # Update allowed fields in user table
@@ -72,7 +70,7 @@ def update_profile():
 def get_user_profile(user_id):
     try:
         user = User.query.get_or_404(user_id)
-        return jsonify({'user': user.to_dict()}), 200
+        return jsonify({'user': user.to_dict('profile', requested_fields(primary=True))}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -94,7 +92,7 @@ def get_user_posts(user_id):
             'total': posts.total,
             'pages': posts.pages,
             'current_page': page,
-            'user': user.to_dict()
+            'user': user.to_dict('profile', requested_fields())
         }), 200
         
     except Exception as e:
@@ -110,7 +108,9 @@ def follow_user(user_id):
         if current_user_id == user_id:
             return jsonify({'error': 'Cannot follow yourself'}), 400
         
-        current_user = User.query.get_or_404(current_user_id)
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
         user_to_follow = User.query.get_or_404(user_id)
         
         if current_user.is_following(user_to_follow):
@@ -133,9 +133,9 @@ def follow_user(user_id):
 @login_required
 def unfollow_user(user_id):
     try:
-        current_user_id = get_current_user_id()
-        
-        current_user = User.query.get_or_404(current_user_id)
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
         user_to_unfollow = User.query.get_or_404(user_id)
         
         if not current_user.is_following(user_to_unfollow):
@@ -162,13 +162,15 @@ def search_users():
         if not query:
             return jsonify({'users': []}), 200
         
-        users = User.query.filter(
-            User.username.contains(query)
-        ).limit(20).all()
+        # Rank matches from the in-memory index, then load just those rows
+        viewer_id = get_current_user_id()
+        viewer = ViewerFollows(viewer_id) if viewer_id else None
+        user_ids = user_search_index.search(query, viewer=viewer, limit=20)
+        users_by_id = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
         
         # Return user data without follower counts to avoid authentication issues
         user_data = []
-        for user in users:
+        for user in (users_by_id[uid] for uid in user_ids if uid in users_by_id):
             user_data.append({
                 'id': user.id,
                 'username': user.username,
@@ -206,17 +208,16 @@ def get_user_by_username(username):
             ).first()
             is_following = follow is not None
         
-        # Get user stats
-        followers_count = Follow.query.filter_by(following_id=user.id).count()
-        following_count = Follow.query.filter_by(follower_id=user.id).count()
-        posts_count = Post.query.filter_by(user_id=user.id).count()
-        
-        user_data = user.to_dict()
-        user_data.update({
-            'followers_count': followers_count,
-            'following_count': following_count,
-            'posts_count': posts_count
-        })
+        # The counts replace the tier's followers/following/posts and cost a
+        # query each, so only the requested ones run (fields=followers_count or followers)
+        # Viewing their own profile, users also get their private fields (email, theme)
+        tier = 'private' if user.id == current_user_id else 'profile'
+        fields = requested_fields(primary=True)
+        names = USER_TIERS[tier] if fields is None else fields
+        user_data = user.to_dict(tier, frozenset(names) - PROFILE_COUNT_FIELDS)
+        for name, count in PROFILE_COUNTS.items():
+            if fields is None or name in fields or name[:-len('_count')] in fields:
+                user_data[name] = count(user)
         
         return jsonify({
             'user': user_data,
@@ -242,12 +243,14 @@ def get_user_posts_by_username(username):
                          .order_by(Post.created_at.desc())\
                          .all()
         
+        current_user = get_current_user()
+        author_data = user.to_shared_dict()
+        
         posts_data = []
         for post in posts:
             post_data = post.to_dict()
-            post_data['author'] = user.to_dict()
+            post_data['author'] = author_data
             # Add is_liked for current user
-            current_user = User.query.get(get_current_user_id())
             post_data['is_liked'] = post.is_liked_by(current_user) if current_user else False
             # Add comments for this post
             comments = Comment.query.filter_by(post_id=post.id)\
@@ -331,7 +334,8 @@ def get_followers():
             .filter(Follow.following_id == user_id)\
             .all()
         
-        followers_data = [follower.to_dict() for follower in followers]
+        fields = requested_fields(primary=True)
+        followers_data = [follower.to_dict('summary', fields) for follower in followers]
         
         return jsonify({'followers': followers_data}), 200
         
@@ -358,7 +362,8 @@ def get_following():
             .filter(Follow.follower_id == user_id)\
             .all()
         
-        following_data = [user.to_dict() for user in following]
+        fields = requested_fields(primary=True)
+        following_data = [user.to_dict('summary', fields) for user in following]
         
         return jsonify({'following': following_data}), 200
         
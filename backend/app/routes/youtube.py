@@ -1,6 +1,5 @@
 """YouTube Shorts routes for AuraChat"""
-from flask import Blueprint, jsonify, request, session
-from app.services.youtube_service import YouTubeService
+from flask import Blueprint, jsonify, request, session, current_app
 
 youtube_bp = Blueprint('youtube', __name__)
 
@@ -22,6 +21,7 @@ def get_shorts():
     # Limit max_results to prevent abuse
     max_results = min(max_results, 50)
     
+    from app.services.youtube_service import YouTubeService
     result = YouTubeService.get_shorts(max_results=max_results, query=query)
     
     if result.get('error'):
@@ -36,6 +36,7 @@ def get_trending_shorts():
     max_results = request.args.get('max_results', 20, type=int)
     max_results = min(max_results, 50)
     
+    from app.services.youtube_service import YouTubeService
     result = YouTubeService.get_trending_shorts(max_results=max_results)
     
     if result.get('error'):
@@ -60,9 +61,36 @@ def search_shorts():
     max_results = request.args.get('max_results', 20, type=int)
     max_results = min(max_results, 50)
     
+    from app.services.youtube_service import YouTubeService
     result = YouTubeService.search_shorts(query=query, max_results=max_results)
     
     if result.get('error'):
         return jsonify(result), 500
     
     return jsonify(result), 200
+
+@youtube_bp.route('/api/youtube/shorts/mixed', methods=['GET'])
+def get_mixed_shorts():
+    """
+    Trending plus personalized shorts in one call
+    
+    Query params:
+        - q: Personalized search query (optional)
+        - max_results: Number of results (default: 20)
+    """
+    # Allow public access
+    query = request.args.get('q', '').strip()
+    max_results = request.args.get('max_results', 20, type=int)
+    max_results = min(max_results, 50)
+    
+    from app.services.youtube_service import YouTubeService
+    result = YouTubeService.get_mixed_shorts(
+        query=query,
+        max_results=max_results,
+        deadline=current_app.config.get('OUTBOUND_FANOUT_DEADLINE', 4.0)
+    )
+    
+    if result.get('error'):
+        return jsonify(result), 500
+    
+    return jsonify(result), 200
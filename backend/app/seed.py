@@ -0,0 +1,351 @@
+"""Bulk synthetic data seeder: flask seed --users 1e6 --posts 1e7 ...
+
+Rows are generated lazily in chunks and written with Core executemany
+inserts on one connection, bypassing the ORM unit of work entirely (no
+identity map, no autoflush, no per-row events). IDs are assigned up front
+from the current maximum, so nothing is read back while loading. During the
+load, the secondary (non-unique) indexes of the seeded tables are dropped
+and rebuilt afterwards, foreign key and unique checks are relaxed on MySQL,
+and SQLite skips fsync. On MySQL, --load-data stages each chunk as a CSV
+file and loads it with LOAD DATA LOCAL INFILE instead (the server needs
+local_infile enabled).
+
+The social graph is skewed like a real one. Follower counts, posting
+activity, post popularity and message recipients follow a Zipf
+distribution over rank. Each user likes a different set of posts. Every
+seeded user is named seed_user<id> and has the password SEED_PASSWORD.
+"""
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, func, select, text, update
+from app import db
+
+SEED_PASSWORD = 'seed-password'
+USERNAME_FORMAT = 'seed_user{}'
+
+SNIPPETS = ['hello world', 'new music', 'weekend plans', 'coffee time', 'late night coding',
+            'concert tonight', 'beach day', 'study session', 'road trip', 'throwback']
+
+
+def username(user_id):
+    return USERNAME_FORMAT.format(user_id)
+
+
+class ZipfSampler:
+    """
+    Draw ranks 0..n-1 with probability roughly proportional to 1 / (rank + 1) ** alpha
+
+    Uses the inverse CDF of the continuous power law, so it needs no tables
+    and is O(1) per draw even for tens of millions of ranks.
+    """
+
+    def __init__(self, n, alpha, rng):
+        self.n = n
+        self.rng = rng
+        self.exponent = 1.0 - alpha
+        self.top = (n + 1) ** self.exponent if self.exponent else None
+        self.log_top = None if self.exponent else (n + 1)
+
+    def sample(self):
+        u = self.rng.random()
+        if self.exponent:
+            x = ((self.top - 1.0) * u + 1.0) ** (1.0 / self.exponent)
+        else:
+            x = self.log_top ** u
+        return min(self.n - 1, int(x) - 1)
+
+
+def _parse_count(ctx, param, value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        raise click.BadParameter(f'expected a number such as 1000 or 1e6, got {value!r}')
+
+
+class BulkLoader:
+    """Write row dictionaries to tables in executemany chunks"""
+
+    def __init__(self, conn, chunk_size=10000, load_data=False, log=click.echo):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.load_data = load_data
+        self.log = log
+        self.counts = {}
+
+    def load(self, table, rows):
+        columns = None
+        total = 0
+        started = time.perf_counter()
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                columns = columns or list(chunk[0])
+                self._write(table, columns, chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            self._write(table, columns or list(chunk[0]), chunk)
+            total += len(chunk)
+
+        elapsed = time.perf_counter() - started
+        self.counts[table.name] = total
+        self.log(f'{table.name:<14} {total:>12,} rows  {elapsed:7.1f}s  {total / elapsed if elapsed else 0:>12,.0f} rows/s')
+        return total
+
+    def _write(self, table, columns, chunk):
+        if self.load_data:
+            self._load_data_infile(table, columns, chunk)
+        else:
+            self.conn.execute(table.insert(), chunk)
+        self.conn.commit()
+
+    def _load_data_infile(self, table, columns, chunk):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                for row in chunk:
+                    writer.writerow(['NULL' if row[c] is None else
+                                     int(row[c]) if isinstance(row[c], bool) else
+                                     row[c].strftime('%Y-%m-%d %H:%M:%S') if isinstance(row[c], datetime) else
+                                     row[c] for c in columns])
+            column_list = ', '.join(f'`{c}`' for c in columns)
+            self.conn.execute(text(
+                f"LOAD DATA LOCAL INFILE :path INTO TABLE `{table.name}` "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '\\n' ({column_list})"), {'path': path})
+        finally:
+            os.remove(path)
+
+
+def _next_id(conn, column):
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def seed_database(conn, users=1000, posts=10000, likes=50000, comments=20000, messages=20000,
+                  notes=1000, tracks=200, avg_follows=20, alpha=1.1, seed=42,
+                  chunk_size=10000, defer_indexes=True, load_data=False, log=click.echo):
+    """
+    Generate and bulk load a synthetic dataset
+
+    Args:
+        conn: SQLAlchemy Connection to load through (committed per chunk)
+        users, posts, likes, comments, messages, notes, tracks: Rows to create
+        avg_follows: Mean follows per user (the distribution is heavy-tailed)
+        alpha: Zipf exponent for popularity skew
+        seed: Random seed; the same seed produces the same dataset
+        chunk_size: Rows per executemany batch
+        defer_indexes: Drop secondary indexes during the load and rebuild them after
+        load_data: Stage chunks as CSV and use LOAD DATA LOCAL INFILE (MySQL)
+
+    Returns:
+        dict: Rows created per table
+    """
+    from app.models import User, Post, Like, Comment, Follow, Message, Note, SpotifyTrack
+    from app.models.models import followers
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    loader = BulkLoader(conn, chunk_size, load_data, log)
+    tables = [User.__table__, Follow.__table__, followers, Post.__table__, Like.__table__,
+              Comment.__table__, Message.__table__, SpotifyTrack.__table__, Note.__table__]
+    deferred = [index for table in tables for index in table.indexes if not index.unique] if defer_indexes else []
+
+    dialect = conn.dialect.name
+    if dialect == 'mysql':
+        conn.execute(text('SET foreign_key_checks = 0, unique_checks = 0'))
+    elif dialect == 'sqlite':
+        conn.execute(text('PRAGMA synchronous = OFF'))
+    for index in deferred:
+        index.drop(conn, checkfirst=True)
+    conn.commit()
+
+    try:
+        first_user = _next_id(conn, User.id)
+        first_post = _next_id(conn, Post.id)
+        user_ids = range(first_user, first_user + users)
+        password_hash = None
+        if users:
+            from app.services.passwords import password_hasher
+            password_hash = password_hasher.hash(SEED_PASSWORD)
+        popular_user = ZipfSampler(max(users, 1), alpha, rng)
+        popular_post = ZipfSampler(max(posts, 1), alpha, rng)
+
+        def days_ago(max_days):
+            return now - timedelta(seconds=rng.randint(0, max_days * 86400))
+
+        loader.load(User.__table__, ({
+            'id': user_id,
+            'username': username(user_id),
+            'email': f'{username(user_id)}@seed.invalid',
+            'password_hash': password_hash,
+            'profile_pic': 'default.jpg',
+            'bio': f'Seeded user {user_id}',
+            'is_private': rng.random() < 0.1,
+            'theme': 'light',
+            'created_at': days_ago(365),
+        } for user_id in user_ids))
+
+        # Out-degree is Pareto distributed around avg_follows; targets are
+        # drawn by popularity, so in-degree follows the Zipf skew. Both follow
+        # tables get the same pairs, so the generator is replayed from a seed
+        follow_seed = rng.random()
+
+        def follow_pairs():
+            pair_rng = random.Random(follow_seed)
+            popular = ZipfSampler(max(users, 1), alpha, pair_rng)
+            scale = avg_follows * (alpha - 1) / alpha if alpha > 1 else avg_follows / 10
+            for follower in user_ids:
+                degree = min(users - 1, int(scale * pair_rng.paretovariate(max(alpha, 1.01))))
+                targets = set()
+                for _ in range(degree * 3):
+                    if len(targets) >= degree:
+                        break
+                    followed = first_user + popular.sample()
+                    if followed != follower:
+                        targets.add(followed)
+                for followed in sorted(targets):
+                    yield follower, followed
+
+        loader.load(Follow.__table__, ({'follower_id': a, 'following_id': b, 'created_at': now}
+                                       for a, b in follow_pairs()))
+        loader.load(followers, ({'follower_id': a, 'followed_id': b} for a, b in follow_pairs()))
+
+        if users:
+            loader.load(Post.__table__, ({
+                'id': first_post + i,
+                'content': f'Seeded post {first_post + i} {rng.choice(SNIPPETS)} #seed',
+                'user_id': first_user + popular_user.sample(),
+                'created_at': days_ago(90),
+            } for i in range(posts)))
+
+        if users and posts:
+            # Each user likes distinct posts, so (user_id, post_id) stays unique
+            def like_rows():
+                per_user, extra = divmod(likes, users)
+                for offset, user_id in enumerate(user_ids):
+                    wanted = min(posts, per_user + (1 if offset < extra else 0))
+                    liked = set()
+                    for _ in range(wanted * 3):
+                        if len(liked) >= wanted:
+                            break
+                        liked.add(first_post + popular_post.sample())
+                    for post_id in liked:
+                        yield {'user_id': user_id, 'post_id': post_id, 'created_at': now}
+
+            loader.load(Like.__table__, like_rows())
+            loader.load(Comment.__table__, ({
+                'content': f'Seeded comment {i} {rng.choice(SNIPPETS)}',
+                'user_id': first_user + rng.randrange(users),
+                'post_id': first_post + popular_post.sample(),
+                'created_at': days_ago(90),
+            } for i in range(comments)))
+
+        if users > 1:
+            def message_rows():
+                for i in range(messages):
+                    sender_id = first_user + rng.randrange(users)
+                    receiver_id = first_user + popular_user.sample()
+                    if receiver_id == sender_id:
+                        receiver_id = first_user + (receiver_id - first_user + 1) % users
+                    yield {
+                        'content': f'Seeded message {i} {rng.choice(SNIPPETS)}',
+                        'sender_id': sender_id,
+                        'receiver_id': receiver_id,
+                        'is_read': rng.random() < 0.7,
+                        'created_at': days_ago(30),
+                    }
+
+            loader.load(Message.__table__, message_rows())
+
+        track_ids = [f'seed{seed}track{i:06d}' for i in range(tracks)]
+        existing = set(conn.execute(select(SpotifyTrack.spotify_track_id)
+                                    .where(SpotifyTrack.spotify_track_id.in_(track_ids))).scalars()) if track_ids else set()
+        loader.load(SpotifyTrack.__table__, ({
+            'spotify_track_id': track_id,
+            'name': f'Seeded track {i}',
+            'artist': f'Seeded artist {i % 50}',
+            'album': f'Seeded album {i % 100}',
+            'preview_url': None,
+            'image': None,
+            'spotify_url': f'https://open.spotify.com/track/{track_id}',
+            'duration_ms': rng.randint(120000, 300000),
+            # Marked fresh so notes do not trigger Spotify refreshes
+            'fetched_at': now,
+        } for i, track_id in enumerate(track_ids) if track_id not in existing))
+
+        if users:
+            def note_rows():
+                for i in range(notes):
+                    created_at = now - timedelta(minutes=rng.randint(0, 24 * 60))
+                    yield {
+                        'user_id': first_user + rng.randrange(users),
+                        'content': f'Seeded note {i}',
+                        'spotify_track_id': rng.choice(track_ids) if track_ids and rng.random() < 0.6 else None,
+                        'created_at': created_at,
+                        'expires_at': created_at + timedelta(hours=12),
+                    }
+
+            loader.load(Note.__table__, note_rows())
+    finally:
+        started = time.perf_counter()
+        for index in deferred:
+            index.create(conn, checkfirst=True)
+        if dialect == 'mysql':
+            conn.execute(text('SET foreign_key_checks = 1, unique_checks = 1'))
+        conn.commit()
+        if deferred:
+            log(f'rebuilt {len(deferred)} indexes in {time.perf_counter() - started:.1f}s')
+
+    if loader.counts.get(Like.__table__.name):
+        # One set-based pass once the like indexes are back
+        post = Post.__table__
+        like_count = select(func.count()).where(Like.__table__.c.post_id == post.c.id).scalar_subquery()
+        conn.execute(update(post).where(post.c.id >= first_post).values(like_count=like_count))
+        conn.commit()
+
+    return loader.counts
+
+
+@click.command('seed')
+@click.option('--users', default='1000', callback=_parse_count, help='Users to create (accepts 1e6)')
+@click.option('--posts', default='10000', callback=_parse_count)
+@click.option('--likes', default='50000', callback=_parse_count)
+@click.option('--comments', default='20000', callback=_parse_count)
+@click.option('--messages', default='20000', callback=_parse_count)
+@click.option('--notes', default='1000', callback=_parse_count)
+@click.option('--tracks', default='200', callback=_parse_count, help='Shared Spotify tracks for notes')
+@click.option('--avg-follows', default=20, show_default=True)
+@click.option('--alpha', default=1.1, show_default=True, help='Zipf exponent for popularity skew')
+@click.option('--seed', 'random_seed', default=42, show_default=True)
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows per executemany batch')
+@click.option('--defer-indexes/--no-defer-indexes', default=True, show_default=True,
+              help='Rebuild secondary indexes after loading instead of maintaining them per row')
+@click.option('--load-data', is_flag=True, help='MySQL: stage chunks as CSV and use LOAD DATA LOCAL INFILE')
+@with_appcontext
+def seed_command(users, posts, likes, comments, messages, notes, tracks, avg_follows, alpha,
+                 random_seed, chunk_size, defer_indexes, load_data):
+    """Fill the database with synthetic users, posts, likes, comments, messages and notes."""
+    engine = db.engine
+    if load_data:
+        if engine.dialect.name != 'mysql':
+            raise click.UsageError('--load-data needs a MySQL database')
+        engine = create_engine(engine.url, connect_args={'local_infile': True})
+
+    # Same schema step as 'flask init-db', so the database has its migration history
+    from app.cli import init_database
+    init_database()
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        counts = seed_database(conn, users, posts, likes, comments, messages, notes, tracks,
+                               avg_follows, alpha, random_seed, chunk_size, defer_indexes, load_data)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    click.echo(f'Seeded {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)')
@@ -0,0 +1,80 @@
+"""Single-thread background worker for work that must not block a request"""
+import logging
+import queue
+import signal
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """
+    FIFO queue drained by one daemon thread
+
+    Tasks run in submission order, so an update followed by a delete for the
+    same record is applied in that order. When the queue is full new tasks are
+    dropped rather than blocking the caller.
+    """
+
+    def __init__(self, name, maxsize=10000):
+        self.name = name
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """
+        Queue fn(*args) to run on the worker thread
+
+        Returns:
+            bool: False if the queue was full and the task was dropped
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((fn, args))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"{self.name}: queue full, dropped {getattr(fn, '__name__', fn)}")
+            return False
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def drain(self):
+        """Block until every queued task has run"""
+        self._queue.join()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception(f"{self.name}: task {getattr(fn, '__name__', fn)} failed")
+            finally:
+                self._queue.task_done()
+
+
+def exit_on_sigterm():
+    """
+    Make SIGTERM a normal exit so atexit handlers (buffer flushes) run
+
+    Only replaces the default handler, and only from the main thread; servers
+    with their own SIGTERM handling already exit through sys.exit.
+    """
+    try:
+        if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    except ValueError:
+        pass
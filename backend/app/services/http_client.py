@@ -0,0 +1,378 @@
+"""Shared outbound HTTP client for third-party APIs (Spotify, YouTube)
+
+Every upstream gets its own OutboundClient with:
+    - a bulkhead (bounded semaphore) so one slow upstream can't hold every worker
+    - a circuit breaker that fails fast once the upstream keeps erroring
+    - retries with full-jitter exponential backoff for transient failures
+    - a small stale-response cache used as fallback while the breaker is open
+    - latency and outcome counters exposed through stats()
+
+Async callers use get_json_async()/post_json_async(), which run the same
+pipeline on a worker thread so several upstream queries can be fanned out
+concurrently with gather_within(). Flask views call run_within(), which runs
+the fan-out on a shared background loop and returns at the deadline. Pass
+the same deadline to each call so that calls still running after it time out
+and give back their bulkhead slots.
+"""
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class UpstreamUnavailable(requests.exceptions.RequestException):
+    """Raised when an upstream call is rejected or failed and no cached data exists"""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a call may go upstream right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: let exactly one probe through
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give back a half-open probe slot that never reached the upstream"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class OutboundClient:
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, name, max_concurrency=8, acquire_timeout=0.5, timeout=(2.0, 5.0),
+                 retries=2, backoff=0.2, failure_threshold=5, reset_timeout=30.0,
+                 cache_size=256, cache_ttl=600.0, latency_window=512):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.acquire_timeout = acquire_timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self._bulkhead = threading.BoundedSemaphore(max_concurrency)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._counters = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'rejected': 0,
+            'short_circuited': 0,
+            'fallbacks': 0,
+        }
+
+    def get_json(self, url, params=None, headers=None, use_cache=True, deadline=None):
+        """
+        GET a JSON document through the bulkhead/breaker/retry pipeline
+
+        Args:
+            url: Absolute upstream URL
+            params: Query string parameters
+            headers: Extra request headers
+            use_cache: Remember the response and serve it as fallback on failure
+            deadline: time.monotonic() value after which waiting, sending and
+                retrying stop
+
+        Returns:
+            dict: Parsed JSON body (possibly stale cached data on failure)
+
+        Raises:
+            UpstreamUnavailable: Upstream failed and nothing is cached
+            requests.HTTPError: Upstream answered with a non-retryable 4xx
+        """
+        key = self._cache_key(url, params) if use_cache else None
+        return self._call('GET', url, key, deadline, params=params, headers=headers)
+
+    def post_json(self, url, data=None, headers=None, deadline=None):
+        """POST a form body and return the parsed JSON response (never cached)"""
+        return self._call('POST', url, None, deadline, data=data, headers=headers)
+
+    async def get_json_async(self, url, params=None, headers=None, use_cache=True, deadline=None):
+        """Awaitable get_json(); the blocking call runs on the default executor"""
+        return await asyncio.to_thread(self.get_json, url, params, headers, use_cache, deadline)
+
+    async def post_json_async(self, url, data=None, headers=None, deadline=None):
+        """Awaitable post_json()"""
+        return await asyncio.to_thread(self.post_json, url, data, headers, deadline)
+
+    def stats(self):
+        """Snapshot of counters, breaker state and latency percentiles (ms)"""
+        samples = sorted(self._latencies)
+        snapshot = dict(self._counters)
+        snapshot['breaker_state'] = self.breaker.state
+        snapshot['cached_entries'] = len(self._cache)
+        for label, pct in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            snapshot[label] = round(samples[min(len(samples) - 1, int(len(samples) * pct))] * 1000, 2) if samples else None
+        return snapshot
+
+    def _call(self, method, url, cache_key, deadline=None, **kwargs):
+        self._counters['requests'] += 1
+
+        if not self.breaker.allow_request():
+            self._counters['short_circuited'] += 1
+            return self._fallback(cache_key, f'{self.name} circuit open')
+
+        acquire_timeout = self.acquire_timeout
+        if deadline is not None:
+            acquire_timeout = max(0.0, min(acquire_timeout, deadline - time.monotonic()))
+        if not self._bulkhead.acquire(timeout=acquire_timeout):
+            self._counters['rejected'] += 1
+            # Otherwise a half-open breaker would wait forever for this probe
+            self.breaker.release_probe()
+            return self._fallback(cache_key, f'{self.name} concurrency limit reached')
+
+        try:
+            data = self._send_with_retries(method, url, deadline, **kwargs)
+        except requests.HTTPError:
+            # Non-retryable client error: the upstream is healthy, the request isn't
+            self.breaker.record_success()
+            raise
+        except requests.exceptions.RequestException as e:
+            self._counters['failures'] += 1
+            self.breaker.record_failure()
+            return self._fallback(cache_key, f'{self.name} request failed: {e}')
+        except Exception:
+            self._counters['failures'] += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._bulkhead.release()
+
+        self._counters['successes'] += 1
+        self.breaker.record_success()
+        if cache_key is not None:
+            self._remember(cache_key, data)
+        return data
+
+    def _timeout(self, deadline):
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f'{self.name} deadline passed')
+        parts = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+        return tuple(min(part, remaining) for part in parts)
+
+    def _send_with_retries(self, method, url, deadline=None, **kwargs):
+        attempt = 0
+        while True:
+            timeout = self._timeout(deadline)
+            started = time.perf_counter()
+            try:
+                response = self._session.request(method, url, timeout=timeout, **kwargs)
+                self._latencies.append(time.perf_counter() - started)
+                if response.status_code in self.RETRY_STATUSES:
+                    raise requests.exceptions.RetryError(
+                        f'{self.name} returned {response.status_code}')
+                response.raise_for_status()
+                return response.json()
+            except requests.HTTPError:
+                raise
+            except (requests.exceptions.RetryError, requests.ConnectionError,
+                    requests.Timeout, ValueError) as e:
+                if attempt >= self.retries or (deadline is not None and time.monotonic() >= deadline):
+                    if isinstance(e, ValueError):
+                        raise requests.exceptions.InvalidJSONError(str(e))
+                    raise
+                attempt += 1
+                self._counters['retries'] += 1
+                # Full jitter keeps retrying workers from synchronising
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                if deadline is not None:
+                    delay = min(delay, max(0.0, deadline - time.monotonic()))
+                time.sleep(delay)
+
+    def _fallback(self, cache_key, reason):
+        if cache_key is not None:
+            with self._cache_lock:
+                entry = self._cache.get(cache_key)
+            if entry is not None and time.monotonic() - entry[0] < self.cache_ttl:
+                self._counters['fallbacks'] += 1
+                return entry[1]
+        raise UpstreamUnavailable(reason)
+
+    def _remember(self, cache_key, data):
+        with self._cache_lock:
+            self._cache[cache_key] = (time.monotonic(), data)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _cache_key(url, params):
+        if not params:
+            return url
+        items = sorted((k, str(v)) for k, v in params.items() if k != 'key')
+        return url + '?' + '&'.join(f'{k}={v}' for k, v in items)
+
+
+async def gather_within(deadline, *aws):
+    """
+    Run awaitables concurrently under one overall deadline
+
+    Args:
+        deadline: Seconds to wait for all awaitables combined
+        *aws: Coroutines to run
+
+    Returns:
+        list: One entry per awaitable, in order; None for any that failed or
+        did not finish before the deadline
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for task in tasks:
+        if task in done and not task.cancelled() and task.exception() is None:
+            results.append(task.result())
+        else:
+            results.append(None)
+    return results
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _fanout_loop():
+    """Event loop on a daemon thread, shared by every run_within() call"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='outbound-fanout', daemon=True).start()
+        return _loop
+
+
+def run_within(deadline, *aws):
+    """
+    Blocking gather_within() for sync callers such as Flask views
+
+    asyncio.run() would wait for the worker threads of calls still running at
+    the deadline, since a thread cannot be cancelled. The shared loop leaves
+    them to finish in the background, so this returns at the deadline. The
+    tasks start in a copy of the caller's context, app context included.
+
+    Args:
+        deadline: Seconds to wait for all awaitables combined
+        *aws: Coroutines to run
+
+    Returns:
+        list: As gather_within()
+    """
+    future = asyncio.run_coroutine_threadsafe(gather_within(deadline, *aws), _fanout_loop())
+    try:
+        # gather_within() itself stops at the deadline; the margin covers scheduling
+        return future.result(timeout=deadline + 1.0)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        return [None] * len(aws)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """
+    Get the process-wide OutboundClient for an upstream
+
+    Settings come from the app config (OUTBOUND_* defaults, overridden per
+    upstream by OUTBOUND_CLIENTS[name]) when an app context is active.
+
+    Args:
+        name: Upstream name, e.g. 'spotify' or 'youtube'
+
+    Returns:
+        OutboundClient
+    """
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = OutboundClient(name, **_client_settings(name))
+        return _clients[name]
+
+
+def reset_clients():
+    """Drop all clients (used when reconfiguring, e.g. pointing at a stub server)"""
+    with _clients_lock:
+        _clients.clear()
+
+
+def _client_settings(name):
+    try:
+        from flask import current_app
+        config = current_app.config
+    except RuntimeError:
+        return {}
+
+    settings = {
+        'max_concurrency': config.get('OUTBOUND_MAX_CONCURRENCY', 8),
+        'acquire_timeout': config.get('OUTBOUND_ACQUIRE_TIMEOUT', 0.5),
+        'timeout': (config.get('OUTBOUND_CONNECT_TIMEOUT', 2.0), config.get('OUTBOUND_READ_TIMEOUT', 5.0)),
+        'retries': config.get('OUTBOUND_RETRIES', 2),
+        'failure_threshold': config.get('OUTBOUND_BREAKER_THRESHOLD', 5),
+        'reset_timeout': config.get('OUTBOUND_BREAKER_RESET', 30.0),
+        'cache_ttl': config.get('OUTBOUND_CACHE_TTL', 600.0),
+    }
+    settings.update(config.get('OUTBOUND_CLIENTS', {}).get(name, {}))
+    return settings
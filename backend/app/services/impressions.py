@@ -0,0 +1,180 @@
+"""Post impression pipeline: feed responses -> queue -> batcher -> hourly rollups
+
+record() is called with the post IDs a feed response served. It only puts
+one tuple on a bounded queue and never waits; when the queue is full the
+event is dropped and counted, so a slow database costs impressions, not
+request latency. A daemon thread drains the queue, adds the IDs up per
+(post, hour) and every IMPRESSIONS_FLUSH_SECONDS, or once
+IMPRESSIONS_BATCH_SIZE events are waiting, upserts the totals into
+post_impression_hourly with one executemany:
+  - SQLite and PostgreSQL: INSERT ... ON CONFLICT DO UPDATE
+  - MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+Stats therefore lag by up to one flush interval. What is still queued or
+aggregated is written at exit.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app import db
+from app.services.background import exit_on_sigterm
+
+logger = logging.getLogger(__name__)
+
+
+def current_hour(now=None):
+    return (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert(dialect, table):
+    """INSERT that adds to the impressions of an existing (post, hour) row"""
+    if dialect.name in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect.name == 'sqlite' else postgresql).insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.post_id, table.c.hour],
+            set_={'impressions': table.c.impressions + statement.excluded.impressions})
+    if dialect.name == 'mysql':
+        statement = mysql.insert(table)
+        return statement.on_duplicate_key_update(impressions=table.c.impressions + statement.inserted.impressions)
+    raise NotImplementedError(f'Impression upserts are not implemented for {dialect.name}')
+
+
+class ImpressionPipeline:
+    def __init__(self):
+        self.enabled = False
+        self.flush_seconds = 5.0
+        self.batch_size = 5000
+        self.recorded = 0
+        self.dropped = 0
+        self.rows_written = 0
+        self.failures = 0
+        self._app = None
+        self._queue = queue.Queue()
+        self._counts = Counter()        # (post_id, hour) -> impressions not written yet
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        self._app = app
+        self.enabled = True
+        self.flush_seconds = app.config.get('IMPRESSIONS_FLUSH_SECONDS', 5.0)
+        self.batch_size = app.config.get('IMPRESSIONS_BATCH_SIZE', 5000)
+        self._queue = queue.Queue(maxsize=app.config.get('IMPRESSIONS_QUEUE_SIZE', 10000))
+
+    def record(self, post_ids):
+        """
+        Count one impression for each post ID
+
+        Returns:
+            bool: False if the queue was full and the impressions were dropped
+        """
+        if not self.enabled or not post_ids:
+            return True
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((current_hour(), tuple(post_ids)))
+            self.recorded += 1
+            if self._queue.qsize() >= self.batch_size:
+                self._wakeup.set()
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """
+        Move everything queued into the rollups
+
+        Returns:
+            int: (post, hour) rows upserted
+        """
+        with self._flush_lock:
+            self._drain()
+            if not self._counts:
+                return 0
+            counts, self._counts = self._counts, Counter()
+            try:
+                with self._app.app_context(), db.engine.begin() as conn:
+                    written = self._write(conn, counts)
+                self.rows_written += written
+                return written
+            except Exception:
+                self.failures += 1
+                logger.exception(f'Writing {len(counts)} impression rollups failed; retrying with the next flush')
+                counts.update(self._counts)
+                self._counts = counts
+                return 0
+
+    def shutdown(self):
+        """Stop the batcher and write what is left"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.enabled:
+            self.flush()
+
+    def _drain(self):
+        """Add up every queued event"""
+        while True:
+            try:
+                hour, post_ids = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            for post_id in post_ids:
+                self._counts[(post_id, hour)] += 1
+
+    def _write(self, conn, counts):
+        from app.models import Post, PostImpressionHourly
+        table = PostImpressionHourly.__table__
+
+        # Posts deleted since they were served would fail the foreign key
+        post_ids = {post_id for post_id, _ in counts}
+        live = set(conn.execute(select(Post.id).where(Post.id.in_(post_ids))).scalars())
+        rows = [{'post_id': post_id, 'hour': hour, 'impressions': n}
+                for (post_id, hour), n in counts.items() if post_id in live]
+        if rows:
+            conn.execute(_upsert(conn.dialect, table), rows)
+        return len(rows)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='impression-batcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            failures = self.failures
+            self.flush()
+            if self.failures > failures:
+                # Back off while the database is failing; the queue bounds memory
+                time.sleep(self.flush_seconds)
+
+
+impressions = ImpressionPipeline()
+
+
+def init_impressions(app):
+    """Start counting feed impressions (IMPRESSIONS_ENABLED) and flush them at exit"""
+    if not app.config.get('IMPRESSIONS_ENABLED', True):
+        return None
+    impressions.configure(app)
+    atexit.register(impressions.shutdown)
+    exit_on_sigterm()
+    return impressions
@@ -0,0 +1,209 @@
+"""Write-behind buffer for likes (LIKE_WRITE_BEHIND)
+
+With the buffer on, like and unlike requests only record the wanted state
+of a (user, post) pair in process memory; a later request for the same
+pair replaces it, so a burst of toggles costs one write. A background
+thread applies everything pending in one transaction every
+LIKE_FLUSH_INTERVAL_MS, or sooner once LIKE_FLUSH_MAX_EVENTS pairs are
+waiting. The flush inserts and deletes like rows in bulk and applies one
+grouped increment per post to post.like_count, so a viral post costs one
+counter update per flush instead of one per tap.
+
+Reads in this process see pending changes: get_like_count() adds the
+pending delta of the post and is_liked_by() returns the pending state.
+The delta is taken against whether the like row existed when the request
+read it (or, when the caller does not know, assumes the request changed
+something), and the flush applies the real difference. Other processes see a like only after it is flushed, and
+anything still pending is lost if the process dies without a graceful
+shutdown, which flushes.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from sqlalchemy import bindparam, select, tuple_, update
+from app import db
+from app.services.background import exit_on_sigterm
+
+logger = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    CHUNK_SIZE = 500
+
+    def __init__(self):
+        self.enabled = False
+        self.interval = 0.25
+        self.max_events = 1000
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self._app = None
+        self._pending = {}       # (user_id, post_id) -> (assumed stored state, wanted state)
+        self._deltas = defaultdict(int)
+        self._flushing = {}      # snapshot being written, still visible to reads
+        self._flushing_deltas = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def configure(self, app):
+        self._app = app
+        self.enabled = True
+        self.interval = app.config.get('LIKE_FLUSH_INTERVAL_MS', 250) / 1000
+        self.max_events = app.config.get('LIKE_FLUSH_MAX_EVENTS', 1000)
+
+    def record(self, user_id, post_id, liked, stored=None):
+        """
+        Queue the wanted like state of a pair; the last call before a flush wins
+
+        Args:
+            liked: Wanted state
+            stored: Whether the like row exists now, if the caller has read it
+        """
+        with self._lock:
+            key = (user_id, post_id)
+            entry = self._pending.get(key)
+            if entry is not None:
+                stored = entry[0]
+            elif stored is None:
+                stored = not liked
+            self._set(key, stored, liked)
+            self.recorded += 1
+            full = len(self._pending) >= self.max_events
+        self._ensure_started()
+        if full:
+            self._wakeup.set()
+
+    def pending_state(self, user_id, post_id):
+        """Wanted state of a pair not flushed yet, or None"""
+        entry = self._pending.get((user_id, post_id)) or self._flushing.get((user_id, post_id))
+        return entry[1] if entry else None
+
+    def adjust_count(self, post_id, count):
+        """A stored like count plus the changes still pending for the post"""
+        return count + self._deltas.get(post_id, 0) + self._flushing_deltas.get(post_id, 0)
+
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """
+        Write everything pending in one transaction
+
+        Returns:
+            int: Pairs written
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                self._flushing_deltas, self._deltas = dict(self._deltas), defaultdict(int)
+            batch = self._flushing
+            try:
+                with self._app.app_context(), db.engine.begin() as conn:
+                    items = list(batch.items())
+                    for start in range(0, len(items), self.CHUNK_SIZE):
+                        self._write(conn, items[start:start + self.CHUNK_SIZE])
+                self.flushed += len(batch)
+                self.flushes += 1
+            except Exception:
+                self.failures += 1
+                logger.exception(f'Like flush of {len(batch)} pairs failed; keeping them for the next flush')
+                with self._lock:
+                    self._flushing, self._flushing_deltas = {}, {}
+                    for key, (stored, liked) in batch.items():
+                        newer = self._pending.pop(key, None)
+                        self._unset(key, newer)
+                        self._set(key, stored, newer[1] if newer else liked)
+            finally:
+                with self._lock:
+                    self._flushing, self._flushing_deltas = {}, {}
+            return len(batch)
+
+    def shutdown(self):
+        """Stop the flush thread and write what is left"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.enabled:
+            self.flush()
+
+    def _set(self, key, stored, liked):
+        previous = self._pending.get(key)
+        if previous is not None:
+            self._deltas[key[1]] -= previous[1] - previous[0]
+        elif key in self._flushing:
+            # The flush in progress applies the earlier change; count only ours
+            stored = self._flushing[key][1]
+        self._pending[key] = (stored, liked)
+        self._deltas[key[1]] += liked - stored
+
+    def _unset(self, key, entry):
+        if entry is not None:
+            self._deltas[key[1]] -= entry[1] - entry[0]
+
+    def _write(self, conn, items):
+        from app.models import Like, Post
+        from app.services.likes import insert_ignore
+        likes, posts = Like.__table__, Post.__table__
+
+        keys = [key for key, _ in items]
+        live = set(conn.execute(select(posts.c.id).where(posts.c.id.in_({p for _, p in keys}))).scalars())
+        existing = set(map(tuple, conn.execute(
+            select(likes.c.user_id, likes.c.post_id)
+            .where(tuple_(likes.c.user_id, likes.c.post_id).in_(keys)).with_for_update())))
+
+        now = datetime.utcnow()
+        added = [{'user_id': u, 'post_id': p, 'created_at': now}
+                 for (u, p), (_, liked) in items if liked and (u, p) not in existing and p in live]
+        removed = [key for key, (_, liked) in items if not liked and key in existing]
+        if added:
+            conn.execute(insert_ignore(conn.dialect), added)
+        if removed:
+            conn.execute(likes.delete().where(tuple_(likes.c.user_id, likes.c.post_id).in_(removed)))
+
+        deltas = Counter(row['post_id'] for row in added)
+        deltas.subtract(p for _, p in removed)
+        changes = [{'b_id': p, 'delta': d} for p, d in deltas.items() if d]
+        if changes:
+            conn.execute(update(posts).where(posts.c.id == bindparam('b_id'))
+                         .values(like_count=posts.c.like_count + bindparam('delta')), changes)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='like-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            failures = self.failures
+            self.flush()
+            if self.failures > failures:
+                # Do not spin on a database that keeps failing
+                time.sleep(self.interval)
+
+
+like_buffer = LikeBuffer()
+
+
+def init_like_buffer(app):
+    """Turn on write-behind likes and flush them when the process exits"""
+    if not app.config.get('LIKE_WRITE_BEHIND'):
+        return None
+    like_buffer.configure(app)
+    atexit.register(like_buffer.shutdown)
+    exit_on_sigterm()
+    return like_buffer
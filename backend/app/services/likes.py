@@ -0,0 +1,132 @@
+"""Atomic like and unlike with a denormalized post.like_count
+
+like() inserts the (user, post) row with the database's "ignore duplicates"
+form of INSERT and only bumps post.like_count when a row was really
+inserted; unlike() does the same with DELETE. Both are idempotent, so a
+double tap or a retried request never raises on the unique constraint or
+counts twice, and no SELECT runs before the write. The INSERT selects from
+post, so a missing post inserts nothing instead of failing on the foreign
+key.
+
+Round trips per call: two where UPDATE ... RETURNING exists (SQLite 3.35+,
+PostgreSQL), three on MySQL, where the counter is read back in the same
+transaction.
+
+With LIKE_WRITE_BEHIND on, the calls only read the post and hand the change
+to app.services.like_buffer, which writes it later in bulk.
+"""
+from datetime import datetime
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Post, Like
+from app.services.like_buffer import like_buffer
+
+likes = Like.__table__
+posts = Post.__table__
+
+
+class PostNotFound(Exception):
+    pass
+
+
+def insert_ignore(dialect):
+    """INSERT INTO like that skips rows already there instead of failing"""
+    if dialect.name == 'sqlite':
+        return sqlite.insert(likes).on_conflict_do_nothing()
+    if dialect.name == 'postgresql':
+        return postgresql.insert(likes).on_conflict_do_nothing()
+    if dialect.name == 'mysql':
+        return insert(likes).prefix_with('IGNORE')
+    raise NotImplementedError(f'Idempotent like insert is not implemented for {dialect.name}')
+
+
+def _adjust_count(post_id, delta):
+    """Apply delta to post.like_count and return the new value (None if the post is gone)"""
+    statement = update(posts).where(posts.c.id == post_id).values(like_count=posts.c.like_count + delta)
+    if db.engine.dialect.update_returning:
+        return db.session.execute(statement.returning(posts.c.like_count)).scalar()
+    db.session.execute(statement)
+    return _current_count(post_id)
+
+
+def _current_count(post_id):
+    return db.session.execute(select(posts.c.like_count).where(posts.c.id == post_id)).scalar()
+
+
+def _buffered(user_id, post_id, liked=None):
+    """Queue the change in the write-behind buffer; liked=None toggles"""
+    is_liked = exists().where(likes.c.user_id == user_id, likes.c.post_id == post_id)
+    row = db.session.execute(select(posts.c.like_count, is_liked).where(posts.c.id == post_id)).first()
+    if row is None:
+        raise PostNotFound(f'Post {post_id} not found')
+    if liked is None:
+        pending = like_buffer.pending_state(user_id, post_id)
+        liked = not (row[1] if pending is None else pending)
+    like_buffer.record(user_id, post_id, liked, stored=bool(row[1]))
+    return like_buffer.adjust_count(post_id, row[0]), liked
+
+
+def _finish(post_id, count, changed):
+    if count is None:
+        db.session.rollback()
+        raise PostNotFound(f'Post {post_id} not found')
+    db.session.commit()
+    return count, changed
+
+
+def like(user_id, post_id):
+    """
+    Record that user_id likes post_id; does nothing if it already does
+
+    Returns:
+        tuple: (like count after the call, True if a like was added;
+            None when the write-behind buffer decides that later)
+
+    Raises:
+        PostNotFound: The post does not exist
+    """
+    if like_buffer.enabled:
+        return _buffered(user_id, post_id, True)[0], None
+    source = select(literal(user_id), posts.c.id, literal(datetime.utcnow())).where(posts.c.id == post_id)
+    statement = insert_ignore(db.engine.dialect).from_select(['user_id', 'post_id', 'created_at'], source)
+    added = db.session.execute(statement).rowcount > 0
+    count = _adjust_count(post_id, 1) if added else _current_count(post_id)
+    return _finish(post_id, count, added)
+
+
+def unlike(user_id, post_id):
+    """
+    Remove user_id's like of post_id; does nothing if there is none
+
+    Returns:
+        tuple: (like count after the call, True if a like was removed;
+            None when the write-behind buffer decides that later)
+
+    Raises:
+        PostNotFound: The post does not exist
+    """
+    if like_buffer.enabled:
+        return _buffered(user_id, post_id, False)[0], None
+    removed = db.session.execute(
+        likes.delete().where(likes.c.user_id == user_id, likes.c.post_id == post_id)).rowcount > 0
+    count = _adjust_count(post_id, -1) if removed else _current_count(post_id)
+    return _finish(post_id, count, removed)
+
+
+def toggle(user_id, post_id):
+    """
+    Unlike if liked, like otherwise
+
+    Returns:
+        tuple: (like count after the call, True if the post is now liked)
+    """
+    if like_buffer.enabled:
+        return _buffered(user_id, post_id)
+    removed = db.session.execute(
+        likes.delete().where(likes.c.user_id == user_id, likes.c.post_id == post_id)).rowcount > 0
+    if removed:
+        count, _ = _finish(post_id, _adjust_count(post_id, -1), True)
+        return count, False
+    count, _ = like(user_id, post_id)
+    return count, True
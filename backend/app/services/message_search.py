@@ -0,0 +1,155 @@
+"""Per-conversation message search index
+
+Each conversation (pair of users) gets its own small inverted index over
+Message.content, built on the first search in that conversation from just
+the (id, content) columns and kept current from message mapper events on
+the shared search-indexer worker. Only the most recently searched
+conversations are held in memory. Searches on request threads and updates
+on the indexer thread are serialized by each InvertedIndex's own lock.
+Updates that arrive while a conversation's index is being loaded are
+buffered and replayed onto it once it is registered, so a message sent
+during the load is not missed until the next rebuild.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, or_, and_
+from app import db
+from app.models import Message
+from app.services.post_search import indexer
+from app.services.text_index import InvertedIndex, make_snippet
+
+
+def conversation_key(user_a, user_b):
+    return (user_a, user_b) if user_a <= user_b else (user_b, user_a)
+
+
+class MessageSearchIndex:
+    MAX_CONVERSATIONS = 5000
+
+    def __init__(self):
+        self._conversations = OrderedDict()   # key -> (built_at, InvertedIndex)
+        self._building = {}                   # key -> [update buffers of the loads in progress]
+        self._lock = threading.Lock()
+
+    def search(self, user_id, other_user_id, query, cursor=None, limit=20):
+        """
+        Search one conversation
+
+        Args:
+            user_id: Current user ID
+            other_user_id: The other participant
+            query: Search text
+            cursor: Only return messages with an ID below this
+            limit: Page size
+
+        Returns:
+            tuple: (list of result dicts with id, sender_id, created_at and
+            snippet, next_cursor or None)
+        """
+        index = self._get_index(conversation_key(user_id, other_user_id))
+        ids = sorted(index.search(query), reverse=True)
+        if cursor is not None:
+            ids = [mid for mid in ids if mid < cursor]
+
+        page_ids = ids[:limit]
+        next_cursor = page_ids[-1] if len(ids) > limit else None
+        if not page_ids:
+            return [], None
+
+        rows = db.session.query(
+            Message.id, Message.sender_id, Message.content, Message.created_at
+        ).filter(Message.id.in_(page_ids)).order_by(Message.id.desc()).all()
+
+        results = [{
+            'id': row.id,
+            'sender_id': row.sender_id,
+            'snippet': make_snippet(row.content, query),
+            'created_at': row.created_at.isoformat() + 'Z' if row.created_at else None
+        } for row in rows]
+        return results, next_cursor
+
+    def add_message(self, sender_id, receiver_id, message_id, content):
+        entry = self._route(conversation_key(sender_id, receiver_id), message_id, content)
+        if entry is not None:
+            entry[1].add(message_id, content)
+
+    def remove_message(self, sender_id, receiver_id, message_id):
+        entry = self._route(conversation_key(sender_id, receiver_id), message_id, None)
+        if entry is not None:
+            entry[1].remove(message_id)
+
+    def _route(self, key, message_id, content):
+        """Buffer an update (content None for a removal) for loads in progress; returns the live entry"""
+        with self._lock:
+            for pending in self._building.get(key, ()):
+                pending.append((message_id, content))
+            return self._conversations.get(key)
+
+    @staticmethod
+    def _apply(index, updates):
+        for message_id, content in updates:
+            if content is None:
+                index.remove(message_id)
+            else:
+                index.add(message_id, content)
+
+    def _get_index(self, key):
+        max_age = current_app.config.get('SEARCH_INDEX_REBUILD_SECONDS', 600)
+        with self._lock:
+            entry = self._conversations.get(key)
+            if entry is not None and (not max_age or time.monotonic() - entry[0] < max_age):
+                self._conversations.move_to_end(key)
+                return entry[1]
+
+        # Registered before the snapshot is read, so no update can fall between the two
+        pending = []
+        with self._lock:
+            self._building.setdefault(key, []).append(pending)
+        index = InvertedIndex()
+        user_a, user_b = key
+        try:
+            rows = db.session.query(Message.id, Message.content).filter(or_(
+                and_(Message.sender_id == user_a, Message.receiver_id == user_b),
+                and_(Message.sender_id == user_b, Message.receiver_id == user_a)
+            )).execution_options(yield_per=2000)
+            for message_id, content in rows:
+                index.add(message_id, content)
+        except Exception:
+            with self._lock:
+                self._stop_building(key, pending)
+            raise
+
+        with self._lock:
+            self._stop_building(key, pending)
+            self._apply(index, pending)
+            self._conversations[key] = (time.monotonic(), index)
+            self._conversations.move_to_end(key)
+            while len(self._conversations) > self.MAX_CONVERSATIONS:
+                self._conversations.popitem(last=False)
+        return index
+
+    def _stop_building(self, key, pending):
+        loads = [load for load in self._building[key] if load is not pending]
+        if loads:
+            self._building[key] = loads
+        else:
+            del self._building[key]
+
+
+message_search_index = MessageSearchIndex()
+
+
+@event.listens_for(Message, 'after_insert')
+@event.listens_for(Message, 'after_update')
+def _queue_message(mapper, connection, message):
+    if db.inspect(message).attrs.content.history.has_changes():
+        indexer.submit(message_search_index.add_message,
+                       message.sender_id, message.receiver_id, message.id, message.content)
+
+
+@event.listens_for(Message, 'after_delete')
+def _queue_message_delete(mapper, connection, message):
+    indexer.submit(message_search_index.remove_message,
+                   message.sender_id, message.receiver_id, message.id)
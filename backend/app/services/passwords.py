@@ -0,0 +1,206 @@
+"""Password hashing on a bounded worker process pool
+
+Hashing is deliberately slow, so it runs on PASSWORD_HASH_WORKERS processes
+instead of the request thread. At most PASSWORD_HASH_MAX_PENDING hashes are
+queued or running at once; a request that cannot get a slot within
+PASSWORD_HASH_QUEUE_TIMEOUT seconds fails fast with PasswordHasherBusy
+rather than piling onto an already saturated pool.
+
+PASSWORD_HASH_METHOD selects the algorithm for new hashes ('pbkdf2',
+'scrypt' or 'bcrypt'), with PBKDF2_ITERATIONS, SCRYPT_N and BCRYPT_ROUNDS as
+the cost. Existing hashes of any supported kind still verify, and
+needs_rehash() tells login to upgrade a hash whose parameters changed.
+
+Workers start through forkserver (PASSWORD_HASH_START_METHOD) and only need
+this module, but multiprocessing also re-imports the parent's main script in
+each worker as __mp_main__. A script that builds the app at import time must
+skip that under __mp_main__, as run.py does, or every worker runs
+create_app() with its own engines and background threads.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import bcrypt
+except ImportError:  # pragma: no cover - optional dependency
+    bcrypt = None
+
+logger = logging.getLogger(__name__)
+
+# bcrypt only uses the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+
+DEFAULTS = {
+    'PASSWORD_HASH_METHOD': 'pbkdf2',
+    'PBKDF2_ITERATIONS': 600000,
+    'SCRYPT_N': 32768,
+    'BCRYPT_ROUNDS': 12,
+    'PASSWORD_HASH_WORKERS': 2,
+    'PASSWORD_HASH_MAX_PENDING': 32,
+    'PASSWORD_HASH_QUEUE_TIMEOUT': 2.0,
+    'PASSWORD_HASH_START_METHOD': 'forkserver',
+}
+
+
+class PasswordHasherBusy(Exception):
+    """No hashing slot became free within PASSWORD_HASH_QUEUE_TIMEOUT"""
+
+
+def _hash_prefix(method, cost):
+    if method == 'bcrypt':
+        return f'$2b${cost:02d}$'
+    if method == 'scrypt':
+        return f'scrypt:{cost}:8:1$'
+    return f'pbkdf2:sha256:{cost}$'
+
+
+def _hash_password(password, method, cost):
+    if method == 'bcrypt':
+        salt = bcrypt.gensalt(rounds=cost)
+        return bcrypt.hashpw(password.encode('utf-8')[:BCRYPT_MAX_BYTES], salt).decode('ascii')
+    if method == 'scrypt':
+        return generate_password_hash(password, method=f'scrypt:{cost}:8:1')
+    return generate_password_hash(password, method=f'pbkdf2:sha256:{cost}')
+
+
+def _verify_password(stored_hash, password):
+    if stored_hash.startswith('$2'):
+        if bcrypt is None:
+            raise RuntimeError('Found a bcrypt password hash but the bcrypt package is not installed')
+        return bcrypt.checkpw(password.encode('utf-8')[:BCRYPT_MAX_BYTES], stored_hash.encode('ascii'))
+    return check_password_hash(stored_hash, password)
+
+
+def _timed(fn, *args):
+    # Runs in the worker: report when work actually started so the caller
+    # can split queue wait from hashing time
+    return time.time(), fn(*args)
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.completed = 0
+        self.rejected = 0
+        self.pending = 0
+        self.queue_seconds = 0.0
+        self.hash_seconds = 0.0
+        self._executor = None
+        self._slots = None
+        self._max_pending = 0
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        """
+        Hash a password with the configured method and cost
+
+        Raises:
+            PasswordHasherBusy: If the pool stays saturated
+        """
+        method, cost = self._method()
+        return self._run(_hash_password, password, method, cost)
+
+    def verify(self, stored_hash, password):
+        """
+        Check a password against a stored hash of any supported kind
+
+        Raises:
+            PasswordHasherBusy: If the pool stays saturated
+        """
+        if not stored_hash or password is None:
+            return False
+        return self._run(_verify_password, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True if a hash was made with another method or cost than configured"""
+        return not stored_hash.startswith(_hash_prefix(*self._method()))
+
+    def stats(self):
+        """Counters for metrics: queue depth, rejections and time split"""
+        return {
+            'workers': self._setting('PASSWORD_HASH_WORKERS'),
+            'pending': self.pending,
+            'max_pending': self._max_pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'queue_seconds': round(self.queue_seconds, 3),
+            'hash_seconds': round(self.hash_seconds, 3),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _method(self):
+        method = self._setting('PASSWORD_HASH_METHOD')
+        if method == 'bcrypt' and bcrypt is None:
+            logger.warning('PASSWORD_HASH_METHOD is bcrypt but bcrypt is not installed; using pbkdf2')
+            method = 'pbkdf2'
+        if method == 'bcrypt':
+            return method, int(self._setting('BCRYPT_ROUNDS'))
+        if method == 'scrypt':
+            return method, int(self._setting('SCRYPT_N'))
+        return 'pbkdf2', int(self._setting('PBKDF2_ITERATIONS'))
+
+    def _setting(self, key):
+        if has_app_context():
+            return current_app.config.get(key, DEFAULTS[key])
+        return DEFAULTS[key]
+
+    def _run(self, fn, *args):
+        executor, slots = self._ensure_pool()
+        if executor is None:
+            # PASSWORD_HASH_WORKERS = 0: hash inline (tests, CLI scripts)
+            return fn(*args)
+
+        if not slots.acquire(timeout=self._setting('PASSWORD_HASH_QUEUE_TIMEOUT')):
+            self.rejected += 1
+            raise PasswordHasherBusy('Password hashing is saturated, try again shortly')
+
+        submitted = time.time()
+        with self._lock:
+            self.pending += 1
+        try:
+            started, result = executor.submit(_timed, fn, *args).result()
+            finished = time.time()
+            with self._lock:
+                self.completed += 1
+                self.queue_seconds += max(0.0, started - submitted)
+                self.hash_seconds += max(0.0, finished - started)
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+            slots.release()
+
+    def _ensure_pool(self):
+        if self._executor is not None:
+            return self._executor, self._slots
+        workers = int(self._setting('PASSWORD_HASH_WORKERS'))
+        if workers <= 0:
+            return None, None
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self._setting('PASSWORD_HASH_START_METHOD'))
+                if context.get_start_method() == 'forkserver':
+                    context.set_forkserver_preload([__name__])
+                self._max_pending = max(workers, int(self._setting('PASSWORD_HASH_MAX_PENDING')))
+                self._slots = threading.BoundedSemaphore(self._max_pending)
+                self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            return self._executor, self._slots
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,168 @@
+"""Full-text search over post and comment content
+
+Posts and comments are held in two in-memory inverted indexes. A post
+matches a query when its own content or any of its comments contains every
+query token. Index updates are queued from SQLAlchemy mapper events and
+applied on a background worker, so create_post, add_comment and the delete
+paths never wait for tokenizing. Like the user search index, it is built
+lazily and rebuilt every SEARCH_INDEX_REBUILD_SECONDS to pick up writes from
+other worker processes.
+"""
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, or_, select
+from app import db
+from app.models import User, Post, Comment
+from app.models.models import followers
+from app.services.background import BackgroundWorker
+from app.services.text_index import InvertedIndex
+
+indexer = BackgroundWorker('search-indexer')
+
+
+class PostSearchIndex:
+    def __init__(self):
+        self._posts = InvertedIndex()
+        self._comments = InvertedIndex()
+        self._comment_posts = {}   # comment id -> post id
+        self._loaded = False
+        self._built_at = 0.0
+        self._build_lock = threading.Lock()
+
+    def search(self, query):
+        """
+        Post IDs matching a query, newest first
+
+        Returns:
+            list: Matching post IDs in descending order
+        """
+        self._ensure_fresh()
+        post_ids = self._posts.search(query)
+        comment_posts = self._comment_posts
+        post_ids.update(comment_posts[c] for c in self._comments.search(query) if c in comment_posts)
+        return sorted(post_ids, reverse=True)
+
+    def index_post(self, post_id, content):
+        if self._loaded:
+            self._posts.add(post_id, content)
+
+    def unindex_post(self, post_id):
+        if self._loaded:
+            self._posts.remove(post_id)
+
+    def index_comment(self, comment_id, post_id, content):
+        if self._loaded:
+            self._comments.add(comment_id, content)
+            self._comment_posts[comment_id] = post_id
+
+    def unindex_comment(self, comment_id):
+        if self._loaded:
+            self._comments.remove(comment_id)
+            self._comment_posts.pop(comment_id, None)
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            self.rebuild()
+            return
+        max_age = current_app.config.get('SEARCH_INDEX_REBUILD_SECONDS', 600)
+        if max_age and time.monotonic() - self._built_at > max_age and not self._build_lock.locked():
+            # Queued behind pending updates so none of them is lost by the swap
+            self._built_at = time.monotonic()
+            indexer.submit(self._rebuild_in_context, current_app._get_current_object())
+
+    def _rebuild_in_context(self, app):
+        with app.app_context():
+            self.rebuild()
+
+    def rebuild(self):
+        """Load all post and comment content from the database"""
+        if not self._build_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            posts = InvertedIndex()
+            for post_id, content in db.session.query(Post.id, Post.content).execution_options(yield_per=5000):
+                posts.add(post_id, content)
+
+            comments = InvertedIndex()
+            comment_posts = {}
+            rows = db.session.query(Comment.id, Comment.post_id, Comment.content).execution_options(yield_per=5000)
+            for comment_id, post_id, content in rows:
+                comments.add(comment_id, content)
+                comment_posts[comment_id] = post_id
+
+            self._posts, self._comments, self._comment_posts = posts, comments, comment_posts
+            self._built_at = time.monotonic()
+            self._loaded = True
+        finally:
+            self._build_lock.release()
+
+
+post_search_index = PostSearchIndex()
+
+
+def search_visible_posts(query, viewer, cursor=None, limit=20):
+    """
+    Search posts the viewer is allowed to see, with cursor paging
+
+    Visibility follows the feed: own posts, posts by public authors and posts
+    by private authors the viewer follows.
+
+    Args:
+        query: Search text
+        viewer: Current User
+        cursor: Only return posts with an ID below this (from next_cursor)
+        limit: Page size
+
+    Returns:
+        tuple: (list of Post, next_cursor or None)
+    """
+    candidate_ids = post_search_index.search(query)
+    if cursor is not None:
+        candidate_ids = [pid for pid in candidate_ids if pid < cursor]
+
+    followed_ids = select(followers.c.followed_id).where(followers.c.follower_id == viewer.id)
+    visible = or_(
+        Post.user_id == viewer.id,
+        User.is_private.is_(None),
+        User.is_private == False,
+        Post.user_id.in_(followed_ids)
+    )
+
+    # Check candidates in newest-first chunks until a full page is visible
+    page = []
+    chunk_size = max(limit * 4, 100)
+    for start in range(0, len(candidate_ids), chunk_size):
+        chunk = candidate_ids[start:start + chunk_size]
+        page.extend(Post.query.join(User, Post.user_id == User.id)
+                    .filter(Post.id.in_(chunk), visible)
+                    .order_by(Post.id.desc())
+                    .limit(limit + 1 - len(page))
+                    .all())
+        if len(page) > limit:
+            break
+
+    next_cursor = page[limit - 1].id if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+@event.listens_for(Post, 'after_insert')
+@event.listens_for(Post, 'after_update')
+def _queue_post(mapper, connection, post):
+    indexer.submit(post_search_index.index_post, post.id, post.content)
+
+
+@event.listens_for(Post, 'after_delete')
+def _queue_post_delete(mapper, connection, post):
+    indexer.submit(post_search_index.unindex_post, post.id)
+
+
+@event.listens_for(Comment, 'after_insert')
+@event.listens_for(Comment, 'after_update')
+def _queue_comment(mapper, connection, comment):
+    indexer.submit(post_search_index.index_comment, comment.id, comment.post_id, comment.content)
+
+
+@event.listens_for(Comment, 'after_delete')
+def _queue_comment_delete(mapper, connection, comment):
+    indexer.submit(post_search_index.unindex_comment, comment.id)
@@ -1,13 +1,16 @@
 """Spotify API Service for music search"""
 import os
+import asyncio
 import requests
 import base64
 from datetime import datetime, timedelta
 from flask import current_app
+from app.services.http_client import get_client
 
 class SpotifyService:
-    BASE_URL = "https://api.spotify.com/v1"
-    TOKEN_URL = "https://accounts.spotify.com/api/token"
+    BASE_URL = os.getenv('SPOTIFY_API_URL', "https://api.spotify.com/v1")
+    TOKEN_URL = os.getenv('SPOTIFY_TOKEN_URL', "https://accounts.spotify.com/api/token")
+    MAX_TRACKS_PER_REQUEST = 50
     
     _access_token = None
     _token_expires = None
@@ -37,10 +40,7 @@ class SpotifyService:
         data = {'grant_type': 'client_credentials'}
         
         try:
-            response = requests.post(cls.TOKEN_URL, headers=headers, data=data, timeout=10)
-            response.raise_for_status()
-            
-            token_data = response.json()
+            token_data = get_client('spotify').post_json(cls.TOKEN_URL, data=data, headers=headers)
             cls._access_token = token_data['access_token']
             cls._token_expires = datetime.now() + timedelta(seconds=token_data['expires_in'] - 60)
             
@@ -73,25 +73,13 @@ class SpotifyService:
                 'market': 'US'
             }
             
-            response = requests.get(f"{cls.BASE_URL}/search", headers=headers, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = get_client('spotify').get_json(f"{cls.BASE_URL}/search", params=params, headers=headers)
             tracks = []
             tracks_with_preview = []
             tracks_without_preview = []
             
             for item in data.get('tracks', {}).get('items', []):
-                track_data = {
-                    'id': item['id'],
-                    'name': item['name'],
-                    'artist': ', '.join([artist['name'] for artist in item['artists']]),
-                    'album': item['album']['name'],
-                    'preview_url': item.get('preview_url'),
-                    'image': item['album']['images'][0]['url'] if item['album']['images'] else None,
-                    'spotify_url': item['external_urls']['spotify'],
-                    'duration_ms': item['duration_ms']
-                }
+                track_data = cls._track_from_item(item)
                 
                 # Prioritize tracks with preview URLs
                 if track_data['preview_url']:
@@ -127,22 +115,65 @@ class SpotifyService:
             
             headers = {'Authorization': f'Bearer {token}'}
             
-            response = requests.get(f"{cls.BASE_URL}/tracks/{track_id}", headers=headers, timeout=10)
-            response.raise_for_status()
+            item = get_client('spotify').get_json(f"{cls.BASE_URL}/tracks/{track_id}", headers=headers)
             
-            item = response.json()
-            
-            return {
-                'id': item['id'],
-                'name': item['name'],
-                'artist': ', '.join([artist['name'] for artist in item['artists']]),
-                'album': item['album']['name'],
-                'preview_url': item.get('preview_url'),
-                'image': item['album']['images'][0]['url'] if item['album']['images'] else None,
-                'spotify_url': item['external_urls']['spotify'],
-                'duration_ms': item['duration_ms']
-            }
+            return cls._track_from_item(item)
             
         except Exception as e:
             current_app.logger.error(f"Error fetching track: {str(e)}")
             return None
+    
+    @classmethod
+    def get_tracks(cls, track_ids):
+        """
+        Get details for many tracks using the batched /tracks?ids= endpoint
+        
+        Args:
+            track_ids: Iterable of Spotify track IDs (any length; requested
+                       in chunks of MAX_TRACKS_PER_REQUEST)
+        
+        Returns:
+            list: Track dictionaries for the IDs Spotify knows about
+        """
+        track_ids = list(dict.fromkeys(track_ids))
+        tracks = []
+        
+        try:
+            token = cls.get_access_token()
+            headers = {'Authorization': f'Bearer {token}'}
+            
+            for start in range(0, len(track_ids), cls.MAX_TRACKS_PER_REQUEST):
+                chunk = track_ids[start:start + cls.MAX_TRACKS_PER_REQUEST]
+                params = {'ids': ','.join(chunk), 'market': 'US'}
+                data = get_client('spotify').get_json(f"{cls.BASE_URL}/tracks", params=params, headers=headers)
+                # Unknown IDs come back as null entries
+                tracks.extend(cls._track_from_item(item) for item in data.get('tracks', []) if item)
+            
+        except Exception as e:
+            current_app.logger.error(f"Error fetching tracks: {str(e)}")
+        
+        return tracks
+    
+    @staticmethod
+    def _track_from_item(item):
+        """Convert a Spotify track object into our track dictionary"""
+        return {
+            'id': item['id'],
+            'name': item['name'],
+            'artist': ', '.join([artist['name'] for artist in item['artists']]),
+            'album': item['album']['name'],
+            'preview_url': item.get('preview_url'),
+            'image': item['album']['images'][0]['url'] if item['album']['images'] else None,
+            'spotify_url': item['external_urls']['spotify'],
+            'duration_ms': item['duration_ms']
+        }
+    
+    @classmethod
+    async def search_tracks_async(cls, query, limit=10):
+        """Awaitable search_tracks(); use with gather_within() to fan out queries"""
+        return await asyncio.to_thread(cls.search_tracks, query, limit)
+    
+    @classmethod
+    async def get_track_async(cls, track_id):
+        """Awaitable get_track()"""
+        return await asyncio.to_thread(cls.get_track, track_id)
@@ -0,0 +1,100 @@
+"""Tokenizer and incrementally updated in-memory inverted index"""
+import re
+import threading
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercase word tokens of a text, de-duplicated"""
+    if not text:
+        return frozenset()
+    return frozenset(_TOKEN_RE.findall(text.lower()))
+
+
+class InvertedIndex:
+    """
+    Token -> document ID postings with add/remove by document
+
+    Updates come from the indexer thread (see BackgroundWorker) while request
+    threads search. The posting sets are changed in place, so writes and the
+    intersection in search() hold the same lock; a search never iterates a
+    set that is changing size.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._doc_tokens = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_tokens)
+
+    def add(self, doc_id, text):
+        """Index (or re-index) a document"""
+        tokens = tokenize(text)
+        with self._lock:
+            self.remove(doc_id)
+            self._doc_tokens[doc_id] = tokens
+            for token in tokens:
+                postings = self._postings.get(token)
+                if postings is None:
+                    self._postings[token] = {doc_id}
+                else:
+                    postings.add(doc_id)
+
+    def remove(self, doc_id):
+        with self._lock:
+            tokens = self._doc_tokens.pop(doc_id, None)
+            if not tokens:
+                return
+            for token in tokens:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.discard(doc_id)
+                    if not postings:
+                        del self._postings[token]
+
+    def search(self, query):
+        """
+        IDs of documents containing every token of the query
+
+        Returns:
+            set: Matching document IDs (empty for a query without tokens)
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return set()
+        with self._lock:
+            postings = [self._postings.get(token) for token in tokens]
+            if any(p is None for p in postings):
+                return set()
+            postings.sort(key=len)
+            result = set(postings[0])
+            for p in postings[1:]:
+                result &= p
+                if not result:
+                    break
+            return result
+
+
+def make_snippet(text, query, width=80):
+    """
+    Short excerpt of text around the first query token it contains
+
+    Args:
+        text: Full document text
+        query: Search text
+        width: Approximate snippet length in characters
+
+    Returns:
+        str: Excerpt with '…' marking trimmed ends
+    """
+    if len(text) <= width:
+        return text
+    lowered = text.lower()
+    positions = [m.start() for m in (re.search(r'\b' + re.escape(t), lowered) for t in tokenize(query)) if m]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    end = min(len(text), start + width)
+    start = max(0, end - width)
+    return ('…' if start > 0 else '') + text[start:end].strip() + ('…' if end < len(text) else '')
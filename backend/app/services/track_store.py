@@ -0,0 +1,121 @@
+"""Deduplicated Spotify track metadata store backed by the spotify_track table"""
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.track import SpotifyTrack
+
+class TrackStore:
+    MAX_AGE = timedelta(days=7)
+    # Tracks a refresh could not fetch wait this long, doubling per failure up to RETRY_MAX
+    RETRY_AFTER = 300
+    RETRY_MAX = 6 * 3600
+
+    _refreshing = set()
+    _retry = {}          # track_id -> (monotonic time of the next attempt, failures so far)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_or_create(cls, track_id, fallback=None):
+        """
+        Get the shared record for a track, creating it if needed
+
+        A new record is seeded from the client-supplied fallback data (the
+        search result the user picked) and left unconfirmed, so the next
+        background refresh replaces it with authoritative metadata. The caller
+        commits.
+
+        Args:
+            track_id: Spotify track ID
+            fallback: Track dictionary used when the track is not stored yet
+
+        Returns:
+            SpotifyTrack or None if unknown and no fallback name was given
+        """
+        track = SpotifyTrack.query.get(track_id)
+        if track:
+            return track
+
+        if not fallback or not fallback.get('name'):
+            # Imported on first use so the HTTP stack is not loaded at startup
+            from app.services.spotify_service import SpotifyService
+            fetched = SpotifyService.get_tracks([track_id])
+            if not fetched:
+                return None
+            fallback = fetched[0]
+            fetched_at = datetime.utcnow()
+        else:
+            fetched_at = None
+
+        track = SpotifyTrack(spotify_track_id=track_id, fetched_at=fetched_at)
+        track.update_from(fallback)
+        try:
+            # Savepoint, so losing a race only undoes this row
+            with db.session.begin_nested():
+                db.session.add(track)
+        except IntegrityError:
+            # Another request stored the track first; use its record
+            track = db.session.get(SpotifyTrack, track_id)
+        return track
+
+    @classmethod
+    def refresh_stale(cls, tracks):
+        """
+        Schedule a background refresh for the stale tracks among those given
+
+        Args:
+            tracks: Iterable of SpotifyTrack records already loaded by the caller
+        """
+        max_age = current_app.config.get('SPOTIFY_TRACK_MAX_AGE', cls.MAX_AGE)
+        stale_ids = {t.spotify_track_id for t in tracks if t is not None and t.is_stale(max_age)}
+
+        now = time.monotonic()
+        with cls._lock:
+            stale_ids -= cls._refreshing
+            stale_ids = {i for i in stale_ids if i not in cls._retry or cls._retry[i][0] <= now}
+            if not stale_ids:
+                return
+            cls._refreshing |= stale_ids
+
+        app = current_app._get_current_object()
+        thread = threading.Thread(target=cls._refresh, args=(app, stale_ids), daemon=True)
+        thread.start()
+
+    @classmethod
+    def _refresh(cls, app, track_ids):
+        """Re-fetch tracks in batches of 50 and update their records"""
+        fetched = {}
+        try:
+            with app.app_context():
+                from app.services.spotify_service import SpotifyService
+                fetched = {t['id']: t for t in SpotifyService.get_tracks(track_ids)}
+                if not fetched:
+                    return
+
+                now = datetime.utcnow()
+                for track in SpotifyTrack.query.filter(SpotifyTrack.spotify_track_id.in_(list(fetched))).all():
+                    track.update_from(fetched[track.spotify_track_id])
+                    track.fetched_at = now
+                db.session.commit()
+        except Exception as e:
+            app.logger.error(f"Track refresh failed: {str(e)}")
+            fetched = {}
+        finally:
+            cls._finish_refresh(app, track_ids, fetched)
+
+    @classmethod
+    def _finish_refresh(cls, app, track_ids, fetched):
+        """Release the tracks and back off those that were not refreshed"""
+        base = app.config.get('SPOTIFY_TRACK_RETRY_SECONDS', cls.RETRY_AFTER)
+        now = time.monotonic()
+        with cls._lock:
+            cls._refreshing -= set(track_ids)
+            for track_id in track_ids:
+                if track_id in fetched:
+                    cls._retry.pop(track_id, None)
+                    continue
+                # Spotify is down, not configured, or does not know the track
+                failures = cls._retry.get(track_id, (0, 0))[1] + 1
+                cls._retry[track_id] = (now + min(base * 2 ** (failures - 1), cls.RETRY_MAX), failures)
@@ -0,0 +1,280 @@
+"""In-memory username search index with prefix and trigram matching
+
+The index keeps every username in a sorted list (a flattened prefix trie:
+all names sharing a prefix are contiguous, found with one bisect) plus
+trigram posting lists for substring matches. Results are ranked by match
+quality (exact, prefix, substring), whether the viewer follows the user and
+follower count. The viewer's follows are not loaded as a whole. ViewerFollows
+looks up only the matched candidates, in one IN query, plus a bounded query
+for followed users with a short prefix.
+
+The index is built lazily from the database on first use, kept current
+through SQLAlchemy mapper events on User and Follow, and rebuilt in the
+background every USER_SEARCH_REBUILD_SECONDS so that changes made by other
+worker processes are picked up.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import event, func
+from app import db
+from app.models import User, Follow
+
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+
+def _trigrams(name):
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+class ViewerFollows:
+    """Follow edges of the searching user, queried only for what a search needs"""
+
+    def __init__(self, viewer_id):
+        self.viewer_id = viewer_id
+
+    def among(self, user_ids):
+        """The subset of user_ids the viewer follows"""
+        if not user_ids:
+            return set()
+        return {row[0] for row in db.session.query(Follow.following_id).filter(
+            Follow.follower_id == self.viewer_id, Follow.following_id.in_(list(user_ids)))}
+
+    def with_prefix(self, prefix, limit):
+        """IDs of up to limit followed users whose username starts with prefix"""
+        return [row[0] for row in db.session.query(Follow.following_id)
+                .join(User, User.id == Follow.following_id)
+                .filter(Follow.follower_id == self.viewer_id,
+                        func.lower(User.username).startswith(prefix, autoescape=True))
+                .limit(limit)]
+
+
+class UserSearchIndex:
+    # Upper bound on candidates examined per match type on large user tables
+    MAX_CANDIDATES = 500
+    # One- and two-letter prefixes match huge ranges, so their most-followed
+    # users are precomputed at build time instead of ranked per query
+    SHORT_PREFIX = 2
+    POPULAR_PER_PREFIX = 100
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._loaded = False
+        self._built_at = 0.0
+        self._sorted_names = []          # lowercase usernames, sorted
+        self._ids_by_name = {}           # lowercase username -> user id
+        self._names_by_id = {}           # user id -> lowercase username
+        self._postings = defaultdict(lambda: array('I'))  # trigram -> user ids
+        self._follower_counts = defaultdict(int)
+        self._popular = {}               # short prefix -> most-followed user ids
+
+    def search(self, query, viewer=None, limit=20):
+        """
+        Find and rank users whose username matches a query
+
+        Args:
+            query: Search text (case-insensitive)
+            viewer: ViewerFollows of the searching user, or None
+            limit: Maximum number of IDs to return
+
+        Returns:
+            list: Ranked user IDs
+        """
+        self._ensure_fresh()
+        q = query.lower()
+        matches = {}
+
+        exact_id = self._ids_by_name.get(q)
+        if exact_id is not None:
+            matches[exact_id] = EXACT
+
+        if len(q) <= self.SHORT_PREFIX:
+            prefix_ids = list(self._popular.get(q, ()))
+            if viewer is not None:
+                prefix_ids.extend(viewer.with_prefix(q, self.POPULAR_PER_PREFIX))
+            for user_id in prefix_ids:
+                if self._names_by_id.get(user_id, '').startswith(q):
+                    matches.setdefault(user_id, PREFIX)
+        else:
+            names = self._sorted_names
+            i = bisect_left(names, q)
+            end = min(len(names), i + self.MAX_CANDIDATES)
+            while i < end and names[i].startswith(q):
+                user_id = self._ids_by_name.get(names[i])
+                if user_id is not None:
+                    matches.setdefault(user_id, PREFIX)
+                i += 1
+
+        if len(q) >= 3:
+            for user_id in self._substring_candidates(q):
+                name = self._names_by_id.get(user_id)
+                if name is not None and q in name:
+                    matches.setdefault(user_id, SUBSTRING)
+
+        viewer_following = viewer.among(matches) if viewer is not None else set()
+        counts = self._follower_counts
+        ranked = sorted(matches, key=lambda uid: (
+            matches[uid],
+            uid not in viewer_following,
+            -counts.get(uid, 0),
+            len(self._names_by_id.get(uid, '')),
+            uid
+        ))
+        return ranked[:limit]
+
+    def _substring_candidates(self, q):
+        """Posting list of the query's rarest trigram, capped"""
+        postings = [self._postings.get(t) for t in _trigrams(q)]
+        if not postings or any(p is None for p in postings):
+            return ()
+        rarest = min(postings, key=len)
+        return rarest[:self.MAX_CANDIDATES]
+
+    def add_user(self, user_id, username):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(user_id)
+            name = username.lower()
+            insort(self._sorted_names, name)
+            self._ids_by_name[name] = user_id
+            self._names_by_id[user_id] = name
+            for trigram in _trigrams(name):
+                self._postings[trigram].append(user_id)
+            for length in range(1, self.SHORT_PREFIX + 1):
+                bucket = self._popular.setdefault(name[:length], [])
+                if len(bucket) < self.POPULAR_PER_PREFIX and user_id not in bucket:
+                    bucket.append(user_id)
+
+    def remove_user(self, user_id):
+        with self._lock:
+            if self._loaded:
+                self._remove(user_id)
+
+    def _remove(self, user_id):
+        # Trigram postings are left in place; stale entries fail the
+        # substring check against _names_by_id and vanish on the next rebuild
+        name = self._names_by_id.pop(user_id, None)
+        if name is None:
+            return
+        self._ids_by_name.pop(name, None)
+        i = bisect_left(self._sorted_names, name)
+        if i < len(self._sorted_names) and self._sorted_names[i] == name:
+            del self._sorted_names[i]
+
+    def adjust_followers(self, user_id, delta):
+        with self._lock:
+            if self._loaded:
+                self._follower_counts[user_id] = max(0, self._follower_counts.get(user_id, 0) + delta)
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            self.rebuild()
+            return
+        max_age = current_app.config.get('USER_SEARCH_REBUILD_SECONDS', 300)
+        if max_age and time.monotonic() - self._built_at > max_age and not self._build_lock.locked():
+            app = current_app._get_current_object()
+            threading.Thread(target=self._rebuild_in_context, args=(app,), daemon=True).start()
+
+    def _rebuild_in_context(self, app):
+        with app.app_context():
+            try:
+                self.rebuild()
+            except Exception as e:
+                app.logger.error(f"User search index rebuild failed: {str(e)}")
+
+    def rebuild(self):
+        """Load every username and follower count from the database"""
+        # The first build blocks concurrent searches; later rebuilds are
+        # skipped while one is already running
+        if not self._build_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            if self._loaded and time.monotonic() - self._built_at < 1:
+                return
+            ids_by_name = {}
+            names_by_id = {}
+            postings = defaultdict(lambda: array('I'))
+            rows = db.session.query(User.id, User.username).execution_options(yield_per=10000)
+            for user_id, username in rows:
+                name = username.lower()
+                ids_by_name[name] = user_id
+                names_by_id[user_id] = name
+                for trigram in _trigrams(name):
+                    postings[trigram].append(user_id)
+
+            follower_counts = defaultdict(int, db.session.query(
+                Follow.following_id, func.count(Follow.id)
+            ).group_by(Follow.following_id).all())
+
+            sorted_names = sorted(ids_by_name)
+            popular = self._build_popular(sorted_names, ids_by_name, follower_counts)
+
+            with self._lock:
+                self._popular = popular
+                self._sorted_names = sorted_names
+                self._ids_by_name = ids_by_name
+                self._names_by_id = names_by_id
+                self._postings = postings
+                self._follower_counts = follower_counts
+                self._built_at = time.monotonic()
+                self._loaded = True
+        finally:
+            self._build_lock.release()
+
+    def _build_popular(self, sorted_names, ids_by_name, follower_counts):
+        names_by_id = {uid: name for name, uid in ids_by_name.items()}
+        by_prefix = defaultdict(list)
+        for user_id, count in sorted(follower_counts.items(), key=lambda item: -item[1]):
+            name = names_by_id.get(user_id)
+            if name is None:
+                continue
+            for length in range(1, self.SHORT_PREFIX + 1):
+                bucket = by_prefix[name[:length]]
+                if len(bucket) < self.POPULAR_PER_PREFIX:
+                    bucket.append(user_id)
+
+        # Pad sparse prefixes with alphabetical matches so they still return results
+        for prefix in {name[:length] for name in sorted_names for length in range(1, self.SHORT_PREFIX + 1)}:
+            bucket = by_prefix[prefix]
+            i = bisect_left(sorted_names, prefix)
+            while len(bucket) < self.POPULAR_PER_PREFIX and i < len(sorted_names) \
+                    and sorted_names[i].startswith(prefix):
+                user_id = ids_by_name[sorted_names[i]]
+                if user_id not in bucket:
+                    bucket.append(user_id)
+                i += 1
+        return dict(by_prefix)
+
+
+user_search_index = UserSearchIndex()
+
+
+@event.listens_for(User, 'after_insert')
+def _index_new_user(mapper, connection, user):
+    user_search_index.add_user(user.id, user.username)
+
+
+@event.listens_for(User, 'after_update')
+def _index_updated_user(mapper, connection, user):
+    if db.inspect(user).attrs.username.history.has_changes():
+        user_search_index.add_user(user.id, user.username)
+
+
+@event.listens_for(User, 'after_delete')
+def _unindex_user(mapper, connection, user):
+    user_search_index.remove_user(user.id)
+
+
+@event.listens_for(Follow, 'after_insert')
+def _count_follow(mapper, connection, follow):
+    user_search_index.adjust_followers(follow.following_id, 1)
+
+
+@event.listens_for(Follow, 'after_delete')
+def _count_unfollow(mapper, connection, follow):
+    user_search_index.adjust_followers(follow.following_id, -1)
@@ -1,20 +1,24 @@
 """YouTube API Service for fetching shorts"""
 import os
+import asyncio
 import requests
 import re
+import time
 from flask import current_app
+from app.services.http_client import get_client, gather_within, run_within
 
 class YouTubeService:
-    BASE_URL = "https://www.googleapis.com/youtube/v3"
+    BASE_URL = os.getenv('YOUTUBE_API_URL', "https://www.googleapis.com/youtube/v3")
     
     @staticmethod
-    def get_shorts(max_results=20, query="#shorts"):
+    def get_shorts(max_results=20, query="#shorts", deadline=None):
         """
         Fetch YouTube Shorts
         
         Args:
             max_results: Number of shorts to fetch (default: 20)
             query: Search query (default: #shorts)
+            deadline: time.monotonic() value after which the upstream call gives up
         
         Returns:
             dict: {'shorts': [...], 'error': None} or {'shorts': [], 'error': 'message'}
@@ -37,9 +41,7 @@ class YouTubeService:
         }
         
         try:
-            response = requests.get(f"{YouTubeService.BASE_URL}/search", params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = get_client('youtube').get_json(f"{YouTubeService.BASE_URL}/search", params=params, deadline=deadline)
             
             shorts = []
             for item in data.get('items', []):
@@ -117,3 +119,61 @@ class YouTubeService:
             dict: {'shorts': [...], 'error': None}
         """
         return YouTubeService.get_shorts(max_results=max_results, query=f"{query} #shorts")
+    
+    @staticmethod
+    async def get_shorts_async(max_results=20, query="#shorts", deadline=None):
+        """Awaitable get_shorts(); same return shape"""
+        return await asyncio.to_thread(YouTubeService.get_shorts, max_results, query, deadline)
+    
+    @staticmethod
+    async def get_mixed_shorts_async(query=None, max_results=20, deadline=4.0):
+        """
+        Fetch trending and personalized shorts concurrently and merge them
+        
+        Both upstream queries run in parallel under one overall deadline, so
+        the call costs one round trip instead of two. A query that fails or
+        misses the deadline simply contributes no results, and its HTTP call
+        times out at the same deadline.
+        
+        Args:
+            query: Personalized search query (trending only if empty)
+            max_results: Number of shorts to return
+            deadline: Overall time budget in seconds
+        
+        Returns:
+            dict: {'shorts': [...], 'error': None} or {'shorts': [], 'error': 'message'}
+        """
+        results = await gather_within(deadline, *YouTubeService._mixed_calls(query, max_results, deadline))
+        return YouTubeService._merge_mixed(results, max_results)
+    
+    @staticmethod
+    def _mixed_calls(query, max_results, deadline):
+        until = time.monotonic() + deadline
+        calls = [YouTubeService.get_shorts_async(max_results, "shorts trending", until)]
+        if query:
+            calls.append(YouTubeService.get_shorts_async(max_results, f"{query} #shorts", until))
+        return calls
+    
+    @staticmethod
+    def _merge_mixed(results, max_results):
+        """Interleave personalized and trending results, dropping duplicates"""
+        lists = [r['shorts'] for r in reversed(results) if r and not r.get('error')]
+        if not lists:
+            errors = [r['error'] for r in results if r and r.get('error')]
+            return {'shorts': [], 'error': errors[0] if errors else 'Timed out fetching shorts'}
+        
+        shorts = []
+        seen = set()
+        for i in range(max(len(l) for l in lists)):
+            for l in lists:
+                if i < len(l) and l[i]['id'] not in seen:
+                    seen.add(l[i]['id'])
+                    shorts.append(l[i])
+        
+        return {'shorts': shorts[:max_results], 'error': None}
+    
+    @staticmethod
+    def get_mixed_shorts(query=None, max_results=20, deadline=4.0):
+        """Blocking get_mixed_shorts_async() for Flask views; returns by the deadline"""
+        results = run_within(deadline, *YouTubeService._mixed_calls(query, max_results, deadline))
+        return YouTubeService._merge_mixed(results, max_results)
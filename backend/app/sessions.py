@@ -0,0 +1,336 @@
+"""Server-side sessions with pluggable storage and per-user revocation
+
+SESSION_TYPE selects the storage backend:
+    'memory'      in-process dict, for tests and single-process dev servers
+    'sqlalchemy'  the user_session table, looked up by primary key
+    anything else Flask's default signed-cookie sessions (no revocation)
+
+The cookie only carries a random token; the store is keyed by its SHA-256.
+Expiry slides lazily: it is rounded to SESSION_REFRESH_BUCKET seconds and
+only written back when that bucket changes, so an active session costs one
+write per bucket instead of one per request.
+
+With the sqlalchemy backend, validated sessions are also cached in-process
+for SESSION_LOCAL_CACHE_TTL seconds. Revocation stays immediate across the
+workers on a host through a memory-mapped table of per-user revocation
+epochs: revoking bumps the user's slot, and every cached entry whose epoch
+no longer matches is re-read from the database.
+"""
+import hashlib
+import mmap
+import os
+import random
+import secrets
+import threading
+import time
+from collections import namedtuple, OrderedDict, defaultdict
+from datetime import datetime
+from flask import current_app, session
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from sqlalchemy import delete, insert, select, update
+from werkzeug.datastructures import CallbackDict
+from app import db
+
+SessionRecord = namedtuple('SessionRecord', ['data', 'user_id', 'expires_at'])
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, token=None, user_id=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.token = token
+        self.stored_user_id = user_id
+        self.expires_at = expires_at
+        self.new = token is None
+        self.modified = False
+
+
+class MemorySessionBackend:
+    def __init__(self):
+        self._records = {}
+        self._by_user = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._records.get(key)
+
+    def save(self, key, record):
+        with self._lock:
+            self._records[key] = record
+            if record.user_id is not None:
+                self._by_user[record.user_id].add(key)
+
+    def touch(self, key, expires_at):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                self._records[key] = record._replace(expires_at=expires_at)
+
+    def delete(self, key, user_id=None):
+        with self._lock:
+            self._records.pop(key, None)
+            self._by_user.get(user_id, set()).discard(key)
+
+    def delete_user(self, user_id, keep=None):
+        with self._lock:
+            keys = self._by_user.pop(user_id, set())
+            for key in keys:
+                if key != keep:
+                    self._records.pop(key, None)
+            if keep in keys:
+                self._by_user[user_id].add(keep)
+            return len(keys - {keep})
+
+    def purge_expired(self):
+        now = datetime.utcnow()
+        with self._lock:
+            for key in [k for k, r in self._records.items() if r.expires_at <= now]:
+                record = self._records.pop(key)
+                self._by_user.get(record.user_id, set()).discard(key)
+
+
+class SqlSessionBackend:
+    """Sessions in the user_session table, written on their own connection"""
+
+    def __init__(self):
+        from app.models.session import UserSession
+        self.table = UserSession.__table__
+
+    def get(self, key):
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.data, self.table.c.user_id, self.table.c.expires_at)
+                .where(self.table.c.token_hash == key)
+            ).first()
+        if row is None:
+            return None
+        return SessionRecord(session_json_serializer.loads(row.data), row.user_id, row.expires_at)
+
+    def save(self, key, record):
+        values = {
+            'data': session_json_serializer.dumps(record.data),
+            'user_id': record.user_id,
+            'expires_at': record.expires_at
+        }
+        with db.engine.begin() as conn:
+            result = conn.execute(update(self.table).where(self.table.c.token_hash == key).values(**values))
+            if result.rowcount == 0:
+                conn.execute(insert(self.table).values(token_hash=key, created_at=datetime.utcnow(), **values))
+
+    def touch(self, key, expires_at):
+        with db.engine.begin() as conn:
+            conn.execute(update(self.table).where(self.table.c.token_hash == key).values(expires_at=expires_at))
+
+    def delete(self, key, user_id=None):
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.token_hash == key))
+
+    def delete_user(self, user_id, keep=None):
+        stmt = delete(self.table).where(self.table.c.user_id == user_id)
+        if keep is not None:
+            stmt = stmt.where(self.table.c.token_hash != keep)
+        with db.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def purge_expired(self):
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.expires_at <= datetime.utcnow()))
+
+
+class RevocationEpochs:
+    """
+    Per-user revocation counters in a memory-mapped file
+
+    Users hash into SLOTS counters, so a collision only costs an extra
+    re-validation, never a missed revocation.
+    """
+    SLOTS = 65536
+
+    def __init__(self, path):
+        size = self.SLOTS * 4
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'\0' * size)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._slots = memoryview(self._map).cast('I')
+
+    def get(self, user_id):
+        return self._slots[int(user_id) % self.SLOTS] if user_id is not None else 0
+
+    def bump(self, user_id):
+        if user_id is not None:
+            slot = int(user_id) % self.SLOTS
+            self._slots[slot] = (self._slots[slot] + 1) & 0xFFFFFFFF
+
+
+class CachedSessionBackend:
+    """Write-through in-process cache in front of another backend"""
+
+    def __init__(self, backend, epochs, ttl=5.0, max_entries=10000):
+        self.backend = backend
+        self.epochs = epochs
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (cached_until, epoch, record)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic() and entry[1] == self.epochs.get(entry[2].user_id):
+            self.hits += 1
+            return entry[2]
+
+        self.misses += 1
+        record = self.backend.get(key)
+        if record is not None:
+            self._remember(key, record)
+        else:
+            self._forget(key)
+        return record
+
+    def save(self, key, record):
+        self.backend.save(key, record)
+        self._remember(key, record)
+
+    def touch(self, key, expires_at):
+        self.backend.touch(key, expires_at)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._remember(key, entry[2]._replace(expires_at=expires_at))
+
+    def delete(self, key, user_id=None):
+        self.backend.delete(key, user_id)
+        self._forget(key)
+        self.epochs.bump(user_id)
+
+    def delete_user(self, user_id, keep=None):
+        count = self.backend.delete_user(user_id, keep)
+        self.epochs.bump(user_id)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[2].user_id == user_id and k != keep]:
+                del self._entries[key]
+        return count
+
+    def purge_expired(self):
+        self.backend.purge_expired()
+
+    def _remember(self, key, record):
+        with self._lock:
+            # A revocation landing between the backend read and this epoch
+            # read can leave a stale entry, but only for at most ttl seconds
+            self._entries[key] = (time.monotonic() + self.ttl, self.epochs.get(record.user_id), record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    # Chance per new session of sweeping expired records from the store
+    PURGE_PROBABILITY = 0.001
+
+    def __init__(self, store, refresh_bucket=3600):
+        self.store = store
+        self.refresh_bucket = refresh_bucket
+
+    def open_session(self, app, request):
+        token = request.cookies.get(self.get_cookie_name(app))
+        if token:
+            record = self.store.get(_hash_token(token))
+            if record is not None and record.expires_at > datetime.utcnow():
+                return ServerSession(record.data, token, record.user_id, record.expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.token is not None:
+                self.store.delete(_hash_token(session.token), session.stored_user_id)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        user_id = session.get('user_id')
+        expires_at = self._bucketed_expiry(app)
+
+        if session.token is None or user_id != session.stored_user_id:
+            # New session, or a different user logged in: issue a fresh token
+            if session.token is not None:
+                self.store.delete(_hash_token(session.token), session.stored_user_id)
+            session.token = secrets.token_urlsafe(32)
+            self.store.save(_hash_token(session.token), SessionRecord(dict(session), user_id, expires_at))
+            if random.random() < self.PURGE_PROBABILITY:
+                self.store.purge_expired()
+        elif session.modified:
+            self.store.save(_hash_token(session.token), SessionRecord(dict(session), user_id, expires_at))
+        elif expires_at != session.expires_at:
+            self.store.touch(_hash_token(session.token), expires_at)
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            session.token,
+            expires=expires_at if session.permanent else None,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+    def _bucketed_expiry(self, app):
+        expires = time.time() + app.permanent_session_lifetime.total_seconds()
+        return datetime.utcfromtimestamp(expires - expires % self.refresh_bucket)
+
+
+def init_session_interface(app):
+    """Install the server-side session interface selected by SESSION_TYPE"""
+    session_type = app.config.get('SESSION_TYPE')
+
+    if session_type == 'memory':
+        store = MemorySessionBackend()
+    elif session_type == 'sqlalchemy':
+        store = SqlSessionBackend()
+        cache_ttl = app.config.get('SESSION_LOCAL_CACHE_TTL', 5)
+        if cache_ttl:
+            epoch_file = app.config.get('SESSION_EPOCH_FILE') or \
+                os.path.join(app.instance_path, 'session-epochs.bin')
+            store = CachedSessionBackend(store, RevocationEpochs(epoch_file), ttl=cache_ttl)
+    else:
+        return
+
+    app.session_interface = ServerSideSessionInterface(
+        store, refresh_bucket=app.config.get('SESSION_REFRESH_BUCKET', 3600))
+
+
+def revoke_user_sessions(user_id, keep_current=False):
+    """
+    Revoke every session of a user
+
+    Args:
+        user_id: User whose sessions to revoke
+        keep_current: Leave the session of the current request signed in
+
+    Returns:
+        int: Number of revoked sessions (0 with cookie sessions)
+    """
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSideSessionInterface):
+        return 0
+    keep = _hash_token(session.token) if keep_current and getattr(session, 'token', None) else None
+    return interface.store.delete_user(user_id, keep)
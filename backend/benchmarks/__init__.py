@@ -0,0 +1,19 @@
+"""Load tests and benchmarks for the AuraChat API
+
+Seeds a database with a synthetic social graph, replays scripted user
+sessions (login, feed, profile, inbox, send message, search) and reports
+p50/p95/p99 latency and SQL queries per request for each step.
+
+Run from the backend directory:
+
+    # In-process through the Flask test client, against a fresh SQLite file
+    python -m benchmarks --users 100 --posts 500 --sessions 40 --concurrency 4
+
+    # Against a running server: seed its (empty) database so user ids start
+    # at 1, then start it with RATELIMIT_ENABLED=false QUERY_STATS_HEADERS=true
+    flask seed --users 100 --posts 500 --likes 2000
+    python -m benchmarks --url http://localhost:5000 --users 100
+
+    # Save results and compare with an earlier run
+    python -m benchmarks --output benchmarks/results/today.json --compare benchmarks/results/base.json
+"""
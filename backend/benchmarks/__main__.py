@@ -0,0 +1,198 @@
+"""Command line entry point: python -m benchmarks --help"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.scenarios import Recorder, user_session
+from benchmarks.targets import HttpTarget, TestClientTarget
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder):
+    steps = {}
+    for step, samples in recorder.samples.items():
+        latencies = sorted(s[0] * 1000 for s in samples)
+        queries = [s[2] for s in samples if s[2] is not None]
+        steps[step] = {
+            'count': len(samples),
+            'errors': sum(1 for s in samples if s[1] >= 400),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_queries': round(sum(queries) / len(queries), 1) if queries else None,
+            'max_queries': max(queries) if queries else None,
+        }
+    return steps
+
+
+def print_report(result, baseline=None):
+    print(f"\n{result['sessions']} sessions, concurrency {result['concurrency']}, "
+          f"{result['duration_s']}s, {result['requests_per_s']} req/s against {result['target']}")
+    header = f"{'step':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}"
+    if baseline:
+        header += f"{'p95 vs base':>14}{'queries vs base':>17}"
+    print(header)
+    for step, s in result['steps'].items():
+        queries = '-' if s['mean_queries'] is None else s['mean_queries']
+        line = f"{step:<16}{s['count']:>7}{s['errors']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{queries:>9}"
+        base = (baseline or {}).get('steps', {}).get(step)
+        if base:
+            change = (s['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0
+            query_change = '-'
+            if s['mean_queries'] is not None and base['mean_queries'] is not None:
+                query_change = f"{s['mean_queries'] - base['mean_queries']:+.1f}"
+            line += f"{change:>+13.1f}%{query_change:>17}"
+        print(line)
+
+
+def run_sessions(target, total, concurrency, users, seed, warmup):
+    recorder = Recorder()
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local = Recorder()
+        client = target.client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            user_session(client, rng, users, local)
+        with lock:
+            recorder.merge(local)
+
+    warm = Recorder()
+    client = target.client()
+    rng = random.Random(seed - 1)
+    for _ in range(warmup):
+        user_session(client, rng, users, warm)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder, time.perf_counter() - start
+
+
+def build_app(database_url):
+    from config import Config
+    from app import create_app
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        RATELIMIT_ENABLED = False
+        AUTO_CREATE_TABLES = True
+        QUERY_STATS_HEADERS = True
+
+    return create_app(BenchmarkConfig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Seed a synthetic dataset and time scripted user sessions')
+    parser.add_argument('--url', help='Benchmark a running server instead of the in-process test client')
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'aurachat-bench.db'),
+                        help='Database to seed and serve from in test-client mode')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse an already seeded database')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--likes', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=500)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--notes', type=int, default=100)
+    parser.add_argument('--avg-follows', type=int, default=20)
+    parser.add_argument('--sessions', type=int, default=40, help='Scripted user sessions to run')
+    parser.add_argument('--concurrency', type=int, default=4, help='Sessions running at once')
+    parser.add_argument('--warmup', type=int, default=5, help='Unrecorded sessions before measuring')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    parser.add_argument('--log-n-plus-one', action='store_true', help='Keep the per-request N+1 warnings')
+    parser.add_argument('--index-advice', action='store_true',
+                        help='EXPLAIN the query shapes the sessions ran and report index problems (test-client mode)')
+    args = parser.parse_args(argv)
+
+    if not args.log_n_plus_one:
+        # The report already shows queries per step
+        logging.getLogger('app.query_stats').setLevel(logging.ERROR)
+
+    dataset = None
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        if not args.no_seed and args.database_url.startswith('sqlite:///'):
+            path = args.database_url[len('sqlite:///'):]
+            if os.path.exists(path):
+                os.remove(path)
+        app = build_app(args.database_url)
+        if not args.no_seed:
+            from app import db
+            from app.seed import seed_database
+            with app.app_context(), db.engine.connect() as conn:
+                started = time.perf_counter()
+                dataset = seed_database(conn, args.users, args.posts, args.likes, args.comments, args.messages,
+                                        notes=args.notes, avg_follows=args.avg_follows, seed=args.seed, log=print)
+                print(f'Seeded in {time.perf_counter() - started:.1f}s')
+        target = TestClientTarget(app)
+        # Only the sessions' statements should reach the index advisor
+        from app.query_stats import query_shapes
+        query_shapes.clear()
+
+    recorder, duration = run_sessions(target, args.sessions, args.concurrency, args.users, args.seed, args.warmup)
+    requests_made = sum(len(samples) for samples in recorder.samples.values())
+    result = {
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'target': target.name,
+        'dataset': dataset or {'users': args.users},
+        'sessions': args.sessions,
+        'concurrency': args.concurrency,
+        'duration_s': round(duration, 2),
+        'requests_per_s': round(requests_made / duration, 1) if duration else None,
+        'steps': summarize(recorder),
+    }
+
+    if args.index_advice and not args.url:
+        from app import db
+        from app.index_advisor import advise, format_report
+        from app.query_stats import query_shapes
+        with app.app_context():
+            result['index_advice'] = advise(query_shapes.top(100), db.engine, limit=100)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if 'index_advice' in result:
+        print()
+        print(format_report(result['index_advice']))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Fan-out deadline check: python -m benchmarks.fanout
+
+Points the YouTube client at a local stub that stalls every request for
+--stall seconds, then times GET /api/youtube/shorts/mixed with
+OUTBOUND_FANOUT_DEADLINE set to --deadline. The request must answer within
+the deadline (plus --margin). Shortly after that, the stalled upstream calls
+must also have timed out and given back their bulkhead slots. Exits 1 if
+either check fails.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.__main__ import build_app
+
+
+def _stub_server(stall):
+    class StallingHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(stall)
+            body = b'{"items": []}'
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass  # the client gave up at its deadline
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StallingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.fanout', description=__doc__.splitlines()[0])
+    parser.add_argument('--deadline', type=float, default=0.5)
+    parser.add_argument('--stall', type=float, default=3.0, help='Seconds the stub upstream holds each request')
+    parser.add_argument('--margin', type=float, default=0.25, help='Allowed lateness in seconds')
+    args = parser.parse_args(argv)
+
+    server = _stub_server(args.stall)
+    os.environ['YOUTUBE_API_KEY'] = os.environ.get('YOUTUBE_API_KEY') or 'fanout-check'
+    app = build_app('sqlite:///' + os.path.join(tempfile.gettempdir(), 'aurachat-fanout.db'))
+    app.config['OUTBOUND_FANOUT_DEADLINE'] = args.deadline
+
+    from app.services.http_client import get_client, reset_clients
+    from app.services.youtube_service import YouTubeService
+    reset_clients()
+    YouTubeService.BASE_URL = f'http://127.0.0.1:{server.server_port}'
+
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get('/api/youtube/shorts/mixed?q=cats')
+    elapsed = time.perf_counter() - started
+    on_time = elapsed <= args.deadline + args.margin
+    print(f'mixed shorts: {response.status_code} in {elapsed:.2f}s '
+          f'(deadline {args.deadline:.2f}s) {"ok" if on_time else "LATE"}')
+
+    # The abandoned calls carry the same deadline as their HTTP timeout
+    with app.app_context():
+        youtube = get_client('youtube')
+    free = False
+    settle_until = time.monotonic() + args.margin * 4
+    while time.monotonic() < settle_until and not free:
+        free = youtube._bulkhead._value == youtube._bulkhead._initial_value
+        time.sleep(0.02)
+    print(f'bulkhead slots: {"released" if free else "STILL HELD"} '
+          f'{time.perf_counter() - started:.2f}s after the request started')
+
+    server.shutdown()
+    return 0 if on_time and free else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Scripted user sessions
+
+A session logs in as one seeded user and walks through what a person
+does when opening the app. It reads the feed, looks at a profile, checks
+the inbox and a conversation, sends a message and searches for users.
+Every step is timed separately under its own name.
+"""
+import time
+from app.seed import SEED_PASSWORD, username
+
+
+class Recorder:
+    """Latency, status and query count samples per step name"""
+
+    def __init__(self):
+        self.samples = {}   # step -> list of (seconds, status, queries)
+
+    def timed(self, step, client, method, path, json=None):
+        start = time.perf_counter()
+        response = client.request(method, path, json=json)
+        elapsed = time.perf_counter() - start
+        self.samples.setdefault(step, []).append((elapsed, response.status, response.queries))
+        return response
+
+    def merge(self, other):
+        for step, samples in other.samples.items():
+            self.samples.setdefault(step, []).extend(samples)
+
+
+def user_session(client, rng, users, recorder):
+    """
+    One scripted visit by a random seeded user
+
+    Args:
+        client: Client from a target (keeps the session cookie)
+        rng: random.Random for this worker
+        users: Number of seeded users (ids 1..users)
+        recorder: Recorder collecting the step timings
+    """
+    me, other = rng.sample(range(1, users + 1), 2)
+    login = recorder.timed('login', client, 'POST', '/api/auth/login',
+                           {'username': username(me), 'password': SEED_PASSWORD})
+    if login.status != 200:
+        return
+
+    recorder.timed('feed', client, 'GET', '/api/posts')
+
+    profile = recorder.timed('profile', client, 'GET', f'/api/users/{username(other)}')
+    recorder.timed('profile_posts', client, 'GET', f'/api/users/{username(other)}/posts')
+    other_id = (profile.data or {}).get('user', {}).get('id') if profile.status == 200 else None
+
+    recorder.timed('inbox', client, 'GET', '/api/messages/conversations')
+    if other_id:
+        recorder.timed('conversation', client, 'GET', f'/api/messages/{other_id}')
+        recorder.timed('send_message', client, 'POST', '/api/messages',
+                       {'receiver_id': other_id, 'content': f'Benchmark hello {rng.random():.6f}'})
+
+    recorder.timed('search_users', client, 'GET', f'/api/users/search?q={username(other)[:8]}')
+
+    recorder.timed('logout', client, 'POST', '/api/auth/logout')
@@ -0,0 +1,153 @@
+"""Response encoding throughput: python -m benchmarks.serialization
+
+Seeds a SQLite database (some posts get uploaded images, which are sent as
+base64 data URLs), requests the feed and the largest conversation of one
+user, and keeps the object each view handed to jsonify. Each payload is then
+encoded --rounds times by:
+  flask       Flask's default provider (standard library, no fragments)
+  json        FastJSONProvider on the standard library, with shared fragments
+  orjson      FastJSONProvider on orjson, without fragments
+  orjson+frag FastJSONProvider on orjson, with shared fragments
+The report shows payload bytes, median encode time and MB/s, plus the median
+time of the whole request.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.__main__ import build_app, percentile
+
+
+def _median_ms(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentile(sorted(samples), 50)
+
+
+def _capture(app, client, path):
+    """The object the view at path passed to jsonify"""
+    provider = app.json
+    captured = {}
+    original = provider.response
+
+    def response(*args, **kwargs):
+        captured['payload'] = provider._prepare_response_obj(args, kwargs)
+        return original(captured['payload'])
+
+    provider.response = response
+    try:
+        response_ = client.get(path)
+    finally:
+        provider.response = original
+    if response_.status_code != 200:
+        raise RuntimeError(f'GET {path} returned {response_.status_code}')
+    return captured['payload']
+
+
+def _provider(app, backend):
+    from app.json_provider import FastJSONProvider
+    configured = app.config.get('JSON_BACKEND')
+    app.config['JSON_BACKEND'] = backend
+    try:
+        return FastJSONProvider(app)
+    finally:
+        app.config['JSON_BACKEND'] = configured
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.serialization', description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'aurachat-serialization.db'))
+    parser.add_argument('--no-seed', action='store_true', help='Reuse an already seeded database')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=300)
+    parser.add_argument('--messages', type=int, default=3000)
+    parser.add_argument('--images', type=int, default=20, help='Posts given an uploaded image')
+    parser.add_argument('--image-kb', type=int, default=64)
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    logging.getLogger('app.query_stats').setLevel(logging.ERROR)
+
+    if not args.no_seed and args.database_url.startswith('sqlite:///'):
+        path = args.database_url[len('sqlite:///'):]
+        if os.path.exists(path):
+            os.remove(path)
+    app = build_app(args.database_url)
+    app.config['IMPRESSIONS_ENABLED'] = False
+
+    from sqlalchemy import func, select, update
+    from app import db
+    from app.models import Message, Post
+    from app.seed import SEED_PASSWORD, seed_database, username
+    if not args.no_seed:
+        with app.app_context(), db.engine.connect() as conn:
+            seed_database(conn, args.users, args.posts, likes=args.posts * 4, comments=args.posts,
+                          messages=args.messages, notes=0, tracks=0, log=lambda line: None)
+            rng = random.Random(7)
+            for post_id in rng.sample(range(1, args.posts + 1), min(args.images, args.posts)):
+                conn.execute(update(Post.__table__).where(Post.id == post_id).values(
+                    image_data=rng.randbytes(args.image_kb * 1024), image_mimetype='image/png'))
+            conn.commit()
+
+    with app.app_context():
+        user_id = 1
+        partner = db.session.execute(
+            select(Message.sender_id, func.count()).where(Message.receiver_id == user_id)
+            .group_by(Message.sender_id).order_by(func.count().desc()).limit(1)).first()
+    if partner is None:
+        print('The seeded user has no messages; raise --messages')
+        return 1
+
+    client = app.test_client()
+    login = client.post('/api/auth/login', json={'username': username(user_id), 'password': SEED_PASSWORD})
+    if login.status_code != 200:
+        print(f'Login failed with {login.status_code}; seed the database or drop --no-seed')
+        return 1
+
+    paths = {'feed': '/api/posts', 'conversation': f'/api/messages/{partner[0]}'}
+    encoders = {
+        'flask': (DefaultJSONProvider(app), False),
+        'json': (_provider(app, 'json'), True),
+        'orjson': (_provider(app, 'orjson'), False),
+        'orjson+frag': (_provider(app, 'orjson'), True),
+    }
+
+    results = {}
+    print(f"{'payload':<14}{'encoder':<13}{'bytes':>12}{'p50 ms':>10}{'MB/s':>10}")
+    for name, path in paths.items():
+        request_ms = _median_ms(lambda: client.get(path), max(args.rounds // 3, 3))
+        with app.test_request_context():
+            payload = _capture(app, client, path)
+            # The same data without fragments, as plain dicts and lists
+            plain = json.loads(encoders['orjson+frag'][0].dumps_bytes(payload))
+            results[name] = {'request_p50_ms': round(request_ms, 2), 'encoders': {}}
+            for encoder, (provider, fragments) in encoders.items():
+                obj = payload if fragments else plain
+                size = len(provider.dumps(obj, separators=(',', ':')).encode())
+                ms = _median_ms(lambda: provider.dumps(obj, separators=(',', ':')), args.rounds)
+                rate = size / 1e6 / (ms / 1000) if ms else None
+                results[name]['encoders'][encoder] = {'bytes': size, 'p50_ms': round(ms, 3),
+                                                      'mb_per_s': round(rate, 1) if rate else None}
+                print(f'{name:<14}{encoder:<13}{size:>12}{ms:>10.3f}{rate or 0:>10.1f}')
+        print(f"{name:<14}{'request':<13}{'':>12}{request_ms:>10.3f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'rounds': args.rounds, 'payloads': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Worker startup time: python -m benchmarks.startup
+
+Starts fresh interpreters one after another. Each one times importing the
+app package, create_app() and the first request to /api/health, which is
+what a restarted worker does before it can serve traffic. It uses the
+current environment, so point DATABASE_URL at the database to measure
+against. Exits with status 1 when the median readiness time exceeds
+--target-ms.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.__main__ import percentile
+
+PROBE = r'''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get('/api/health').status_code
+ready = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (ready - created) * 1000,
+    'ready_ms': (ready - start) * 1000,
+    'status': status,
+    'modules': len(__import__('sys').modules),
+}))
+'''
+
+
+def probe(backend_dir):
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=backend_dir, capture_output=True,
+                            text=True, check=True).stdout
+    sample = json.loads(output.strip().splitlines()[-1])
+    sample['process_ms'] = (time.perf_counter() - started) * 1000
+    return sample
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--target-ms', type=float, default=500, help='Median readiness budget')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probe(backend_dir)   # warm the filesystem and bytecode caches
+    samples = [probe(backend_dir) for _ in range(args.runs)]
+
+    print(f"{'phase':<18}{'p50 ms':>10}{'max ms':>10}")
+    result = {}
+    for phase in ('import_ms', 'create_app_ms', 'first_request_ms', 'ready_ms', 'process_ms'):
+        values = sorted(s[phase] for s in samples)
+        result[phase] = {'p50': round(percentile(values, 50), 1), 'max': round(values[-1], 1)}
+        print(f"{phase[:-3]:<18}{result[phase]['p50']:>10}{result[phase]['max']:>10}")
+    print(f"modules loaded: {samples[-1]['modules']}, health status: {samples[-1]['status']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'runs': args.runs, 'target_ms': args.target_ms, 'phases': result}, f, indent=2)
+
+    ready = result['ready_ms']['p50']
+    if ready > args.target_ms:
+        print(f'Median readiness {ready} ms is over the {args.target_ms:g} ms target')
+        return 1
+    print(f'Median readiness {ready} ms is within the {args.target_ms:g} ms target')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Where benchmark sessions send their requests
+
+Both targets hand out one client per virtual user, so each keeps its own
+session cookie. Query counts come from the X-Query-Count header, which the
+app adds when QUERY_STATS_HEADERS is on.
+"""
+import requests
+
+
+class ClientResponse:
+    __slots__ = ('status', 'data', 'queries')
+
+    def __init__(self, status, data, queries):
+        self.status = status
+        self.data = data
+        self.queries = queries
+
+
+def _query_count(headers):
+    value = headers.get('X-Query-Count')
+    return int(value) if value is not None else None
+
+
+class TestClientTarget:
+    """In-process requests through Flask's test client"""
+
+    name = 'testclient'
+
+    def __init__(self, app):
+        self.app = app
+
+    def client(self):
+        return _TestClient(self.app.test_client())
+
+
+class _TestClient:
+    def __init__(self, client):
+        self._client = client
+
+    def request(self, method, path, json=None):
+        response = self._client.open(path, method=method, json=json)
+        return ClientResponse(response.status_code, response.get_json(silent=True), _query_count(response.headers))
+
+
+class HttpTarget:
+    """Requests to a running server"""
+
+    def __init__(self, base_url, timeout=30):
+        self.name = base_url
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def client(self):
+        return _HttpClient(self.base_url, self.timeout)
+
+
+class _HttpClient:
+    def __init__(self, base_url, timeout):
+        self._base_url = base_url
+        self._timeout = timeout
+        self._session = requests.Session()
+
+    def request(self, method, path, json=None):
+        response = self._session.request(method, self._base_url + path, json=json, timeout=self._timeout)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return ClientResponse(response.status_code, data, _query_count(response.headers))
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Database initialization script for AuraChat
-Creates the database and tables if they don't exist
+Creates the tables or upgrades them to the latest migration
+(same as 'flask init-db')
 """
 
 import sys
@@ -12,7 +13,7 @@ backend_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, backend_dir)
 
 from app import create_app, db
-from app.models import User
+from app.cli import init_database as run_migrations
 
 def init_database():
     """Initialize the database with tables"""
@@ -29,10 +30,10 @@ def init_database():
                 connection.execute(db.text("SELECT 1"))
             print("✓ Database connection successful")
             
-            # Create all database tables
-            print("Creating database tables...")
-            db.create_all()
-            print("✓ Database tables created successfully")
+            # Create or upgrade the tables through the migrations
+            print("Applying database migrations...")
+            run_migrations(log=print)
+            print("✓ Database tables are up to date")
             
             print("\n🎉 Database initialization completed!")
             print("Your AuraChat database is ready to use.")
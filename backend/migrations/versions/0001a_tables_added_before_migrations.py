@@ -0,0 +1,93 @@
+"""tables added before migrations
+
+Server-side sessions, rate limit counters, cached Spotify tracks and
+backfill progress were created by db.create_all() while their features
+were being built, before the baseline was recorded. Tables that already
+exist are left alone, so databases built by db.create_all() at any point
+in between can be stamped at the baseline and upgraded.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-19 08:21:37.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'backfill_progress' not in existing:
+        op.create_table('backfill_progress',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('last_key', sa.BigInteger(), nullable=False),
+        sa.Column('rows_updated', sa.BigInteger(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+        )
+
+    if 'rate_limit_counter' not in existing:
+        op.create_table('rate_limit_counter',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('window_start', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('key', 'window_start')
+        )
+        with op.batch_alter_table('rate_limit_counter', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_rate_limit_counter_window_start'), ['window_start'], unique=False)
+
+    if 'spotify_track' not in existing:
+        op.create_table('spotify_track',
+        sa.Column('spotify_track_id', sa.String(length=100), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('artist', sa.String(length=255), nullable=True),
+        sa.Column('album', sa.String(length=255), nullable=True),
+        sa.Column('preview_url', sa.String(length=500), nullable=True),
+        sa.Column('image', sa.String(length=500), nullable=True),
+        sa.Column('spotify_url', sa.String(length=500), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('spotify_track_id')
+        )
+        with op.batch_alter_table('spotify_track', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_spotify_track_fetched_at'), ['fetched_at'], unique=False)
+
+    if 'user_session' not in existing:
+        op.create_table('user_session',
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('token_hash')
+        )
+        with op.batch_alter_table('user_session', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_user_session_expires_at'), ['expires_at'], unique=False)
+            batch_op.create_index(batch_op.f('ix_user_session_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_session', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_session_user_id'))
+        batch_op.drop_index(batch_op.f('ix_user_session_expires_at'))
+
+    op.drop_table('user_session')
+    with op.batch_alter_table('spotify_track', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_spotify_track_fetched_at'))
+
+    op.drop_table('spotify_track')
+    with op.batch_alter_table('rate_limit_counter', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_rate_limit_counter_window_start'))
+
+    op.drop_table('rate_limit_counter')
+    op.drop_table('backfill_progress')
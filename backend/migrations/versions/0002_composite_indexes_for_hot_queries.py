@@ -0,0 +1,42 @@
+"""composite indexes for hot queries
+
+Indexes found missing by the index advisor (app/index_advisor.py) on the
+feed, profile, comment, follower and messaging endpoints. They are built
+without blocking writes where the database supports it.
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-19 08:23:51.138729
+
+"""
+from alembic import op
+from app.online_migrations import create_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_post_user_id_created_at', 'post', ['user_id', 'created_at']),
+    ('ix_comment_post_id_created_at', 'comment', ['post_id', 'created_at']),
+    ('ix_like_post_id_user_id', 'like', ['post_id', 'user_id']),
+    ('ix_followers_followed_id_follower_id', 'followers', ['followed_id', 'follower_id']),
+    ('ix_follow_following_id_follower_id', 'follow', ['following_id', 'follower_id']),
+    ('ix_message_receiver_id_sender_id_is_read', 'message', ['receiver_id', 'sender_id', 'is_read']),
+    ('ix_message_sender_id_receiver_id_created_at', 'message', ['sender_id', 'receiver_id', 'created_at']),
+    ('ix_note_expires_at', 'note', ['expires_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        create_index_online(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,35 @@
+"""backfill post like_count
+
+Counts each post's likes into post.like_count in committed batches (see
+app/online_migrations.py). The count is recomputed from the like table, so
+rerunning a batch is harmless. Deploy the code that maintains the counter
+before this runs, or likes made during the backfill are lost from it.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 08:30:12.417306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.online_migrations import backfill
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+post = sa.table('post', sa.column('id', sa.Integer), sa.column('like_count', sa.Integer))
+like = sa.table('like', sa.column('post_id', sa.Integer))
+
+
+def upgrade():
+    like_count = sa.select(sa.func.count()).select_from(like).where(like.c.post_id == post.c.id).scalar_subquery()
+    backfill('post_like_count', post, {'like_count': like_count})
+
+
+def downgrade():
+    # Let a later upgrade count again
+    op.execute(sa.text("DELETE FROM backfill_progress WHERE name = 'post_like_count'"))
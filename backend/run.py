@@ -1,6 +1,10 @@
 from app import create_app, socketio
 
-app = create_app()
+# Password-hash worker processes (forkserver/spawn) re-import the main
+# script as __mp_main__; they must not build a second app with its own
+# engines, background threads and Socket.IO server
+if __name__ != '__mp_main__':
+    app = create_app()
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
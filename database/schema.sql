@@ -1,5 +1,11 @@
 -- Social Media Database Setup
 -- Run this script in your MySQL database
+--
+-- 'flask init-db' (Alembic migrations) is the supported way to create and
+-- upgrade the schema. This script builds the same schema as the latest
+-- revision and records that revision in alembic_version, so 'flask init-db'
+-- and 'flask db upgrade' continue from there. A revision that changes the
+-- schema must update this file and the stamped revision at the bottom.
 
 CREATE DATABASE IF NOT EXISTS socialmedia_db CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
@@ -8,16 +14,16 @@ USE socialmedia_db;
 -- Create users table
 CREATE TABLE IF NOT EXISTS user (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    email VARCHAR(120) NOT NULL UNIQUE,
-    username VARCHAR(80) NOT NULL UNIQUE,
-    password_hash VARCHAR(255),
-    profile_pic LONGTEXT DEFAULT 'default.jpg',
+    username VARCHAR(80) NOT NULL,
+    email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    profile_pic LONGTEXT,
     bio TEXT,
-    is_private BOOLEAN DEFAULT FALSE,
-    theme VARCHAR(20) DEFAULT 'light',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_email (email),
-    INDEX idx_username (username)
+    is_private BOOLEAN,
+    theme VARCHAR(20),
+    created_at DATETIME,
+    UNIQUE INDEX ix_user_email (email),
+    UNIQUE INDEX ix_user_username (username)
 ) ENGINE=InnoDB;
 
 -- Create posts table
@@ -25,38 +31,42 @@ CREATE TABLE IF NOT EXISTS post (
     id INT AUTO_INCREMENT PRIMARY KEY,
     content TEXT NOT NULL,
     image_url VARCHAR(500),
+    video_url VARCHAR(500),
     image_data LONGBLOB,
     image_mimetype VARCHAR(100),
+    created_at DATETIME,
     user_id INT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES user(id) ON DELETE CASCADE,
-    INDEX idx_user_id (user_id),
-    INDEX idx_created_at (created_at)
+    like_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES user(id),
+    INDEX ix_post_created_at (created_at),
+    -- Profile post listings: WHERE user_id = ? ORDER BY created_at DESC
+    INDEX ix_post_user_id_created_at (user_id, created_at)
 ) ENGINE=InnoDB;
 
 -- Create likes table
 CREATE TABLE IF NOT EXISTS `like` (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    created_at DATETIME,
     user_id INT NOT NULL,
     post_id INT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE KEY unique_like (user_id, post_id),
-    FOREIGN KEY (user_id) REFERENCES user(id) ON DELETE CASCADE,
-    FOREIGN KEY (post_id) REFERENCES post(id) ON DELETE CASCADE,
-    INDEX idx_post_id (post_id)
+    UNIQUE KEY (user_id, post_id),
+    FOREIGN KEY (user_id) REFERENCES user(id),
+    FOREIGN KEY (post_id) REFERENCES post(id),
+    -- Like counts and "liked by" lookups per post
+    INDEX ix_like_post_id_user_id (post_id, user_id)
 ) ENGINE=InnoDB;
 
 -- Create comments table
 CREATE TABLE IF NOT EXISTS comment (
     id INT AUTO_INCREMENT PRIMARY KEY,
     content TEXT NOT NULL,
+    created_at DATETIME,
     user_id INT NOT NULL,
     post_id INT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES user(id) ON DELETE CASCADE,
-    FOREIGN KEY (post_id) REFERENCES post(id) ON DELETE CASCADE,
-    INDEX idx_post_id (post_id),
-    INDEX idx_user_id (user_id)
+    FOREIGN KEY (user_id) REFERENCES user(id),
+    FOREIGN KEY (post_id) REFERENCES post(id),
+    -- Comments of a post in order
+    INDEX ix_comment_post_id_created_at (post_id, created_at)
 ) ENGINE=InnoDB;
 
 -- Create followers association table (self-referential many-to-many)
@@ -64,35 +74,115 @@ CREATE TABLE IF NOT EXISTS followers (
     follower_id INT NOT NULL,
     followed_id INT NOT NULL,
     PRIMARY KEY (follower_id, followed_id),
-    FOREIGN KEY (follower_id) REFERENCES user(id) ON DELETE CASCADE,
-    FOREIGN KEY (followed_id) REFERENCES user(id) ON DELETE CASCADE,
-    INDEX idx_follower (follower_id),
-    INDEX idx_followed (followed_id)
+    FOREIGN KEY (follower_id) REFERENCES user(id),
+    FOREIGN KEY (followed_id) REFERENCES user(id),
+    -- Follower lists; the primary key serves the following side
+    INDEX ix_followers_followed_id_follower_id (followed_id, follower_id)
 ) ENGINE=InnoDB;
 
--- Create follow table for future use
+-- Create follow table
 CREATE TABLE IF NOT EXISTS follow (
     id INT AUTO_INCREMENT PRIMARY KEY,
     follower_id INT NOT NULL,
     following_id INT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at DATETIME,
     UNIQUE KEY unique_follow (follower_id, following_id),
-    FOREIGN KEY (follower_id) REFERENCES user(id) ON DELETE CASCADE,
-    FOREIGN KEY (following_id) REFERENCES user(id) ON DELETE CASCADE,
-    INDEX idx_follower (follower_id),
-    INDEX idx_following (following_id)
+    FOREIGN KEY (follower_id) REFERENCES user(id),
+    FOREIGN KEY (following_id) REFERENCES user(id),
+    INDEX ix_follow_following_id_follower_id (following_id, follower_id)
 ) ENGINE=InnoDB;
+
+-- Create messages table
 CREATE TABLE IF NOT EXISTS message (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    sender_id INT NOT NULL,
-    recipient_id INT NOT NULL,
     content TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    is_read BOOLEAN DEFAULT FALSE,
-    FOREIGN KEY (sender_id) REFERENCES user(id) ON DELETE CASCADE,
-    FOREIGN KEY (recipient_id) REFERENCES user(id) ON DELETE CASCADE,
-    INDEX idx_sender (sender_id),
-    INDEX idx_recipient (recipient_id),
-    INDEX idx_conversation (sender_id, recipient_id),
-    INDEX idx_created_at (created_at)
-) ENGINE=InnoDB;
\ No newline at end of file
+    created_at DATETIME,
+    is_read BOOLEAN,
+    sender_id INT NOT NULL,
+    receiver_id INT NOT NULL,
+    FOREIGN KEY (sender_id) REFERENCES user(id),
+    FOREIGN KEY (receiver_id) REFERENCES user(id),
+    INDEX ix_message_created_at (created_at),
+    -- Unread counts per conversation
+    INDEX ix_message_receiver_id_sender_id_is_read (receiver_id, sender_id, is_read),
+    -- Conversation history in order
+    INDEX ix_message_sender_id_receiver_id_created_at (sender_id, receiver_id, created_at)
+) ENGINE=InnoDB;
+
+-- Create notes table
+CREATE TABLE IF NOT EXISTS note (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    content TEXT,
+    music_name VARCHAR(255),
+    music_artist VARCHAR(255),
+    music_preview_url VARCHAR(500),
+    music_image VARCHAR(500),
+    spotify_track_id VARCHAR(100),
+    spotify_url VARCHAR(500),
+    created_at DATETIME,
+    expires_at DATETIME,
+    FOREIGN KEY (user_id) REFERENCES user(id),
+    INDEX ix_note_expires_at (expires_at)
+) ENGINE=InnoDB;
+
+-- Create cached Spotify track metadata table
+CREATE TABLE IF NOT EXISTS spotify_track (
+    spotify_track_id VARCHAR(100) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    artist VARCHAR(255),
+    album VARCHAR(255),
+    preview_url VARCHAR(500),
+    image VARCHAR(500),
+    spotify_url VARCHAR(500),
+    duration_ms INT,
+    fetched_at DATETIME,
+    INDEX ix_spotify_track_fetched_at (fetched_at)
+) ENGINE=InnoDB;
+
+-- Create server-side sessions table
+CREATE TABLE IF NOT EXISTS user_session (
+    token_hash VARCHAR(64) PRIMARY KEY,
+    user_id INT,
+    data TEXT NOT NULL,
+    created_at DATETIME,
+    expires_at DATETIME NOT NULL,
+    INDEX ix_user_session_user_id (user_id),
+    INDEX ix_user_session_expires_at (expires_at)
+) ENGINE=InnoDB;
+
+-- Create rate limit counters table
+CREATE TABLE IF NOT EXISTS rate_limit_counter (
+    `key` VARCHAR(255) NOT NULL,
+    window_start INT NOT NULL,
+    count INT NOT NULL,
+    PRIMARY KEY (`key`, window_start),
+    INDEX ix_rate_limit_counter_window_start (window_start)
+) ENGINE=InnoDB;
+
+-- Create online backfill progress table
+CREATE TABLE IF NOT EXISTS backfill_progress (
+    name VARCHAR(100) PRIMARY KEY,
+    last_key BIGINT NOT NULL,
+    rows_updated BIGINT NOT NULL,
+    started_at DATETIME,
+    updated_at DATETIME,
+    finished_at DATETIME
+) ENGINE=InnoDB;
+
+-- Create hourly post impression rollups table
+CREATE TABLE IF NOT EXISTS post_impression_hourly (
+    post_id INT NOT NULL,
+    hour DATETIME NOT NULL,
+    impressions BIGINT NOT NULL,
+    PRIMARY KEY (post_id, hour),
+    FOREIGN KEY (post_id) REFERENCES post(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Record the migration this schema matches (only on a fresh database)
+CREATE TABLE IF NOT EXISTS alembic_version (
+    version_num VARCHAR(32) NOT NULL PRIMARY KEY
+) ENGINE=InnoDB;
+
+INSERT INTO alembic_version (version_num)
+SELECT '0005' FROM DUAL WHERE NOT EXISTS (SELECT * FROM alembic_version);